@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Non-interactive command line interface for scripted and scheduled runs.
+
+Every command prints a single JSON document to stdout and exits with:
+    0  success
+    1  the command ran, but some files failed or have conflicting targets (see the JSON output)
+    2  invalid command line (argparse)
+    3  the command could not run (e.g. unknown migration)
+
+Unlike main.py this never imports the rich prompt UI, so it is safe to run from cron.
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from datetime import date
+from pathlib import Path
+
+from database import DatabaseManager, FileDAO, MigrationDAO, ProjectDAO, SiteDAO, TransferScheduleDAO
+from database.inventory import FORMATS, INVENTORY_DAOS, export_inventory, import_inventory
+from engines import (
+    bundle_files, classify_files, copy_files, plan_targets, replay_metadata, run_preflight, scan_migration,
+    unbundle_files, verify_files,
+)
+from engines.analytics import DEFAULT_TOP, inventory_report
+from engines.bundle import DEFAULT_BUNDLE_SIZE, DEFAULT_MAX_FILE_SIZE
+from engines.copy import TRANSFER_MODES
+from engines.lease import DEFAULT_LEASE
+from engines.plan import DEFAULT_MAX_NAME, DEFAULT_MAX_PATH
+from engines.preflight import DEFAULT_HEADROOM
+from engines.priority import RATE_WINDOW, TRANSFER_ORDERS, forecast
+from engines.snapshot import diff_generations, list_snapshots, take_snapshot
+from helpers.metrics import DEFAULT_INTERVAL, MetricsExporter
+from engines.watch import watch_migration
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_ERROR = 3
+
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+class CLIError(Exception):
+    """Raised when a command cannot run; reported as JSON with exit code 3."""
+
+
+def parse_size(value):
+    """Parses sizes such as "512K", "20M" or "1G" (binary units) into bytes."""
+    value = value.strip().upper().removesuffix("B")
+    unit = value[-1] if value and value[-1] in SIZE_UNITS else ""
+    try:
+        return int(float(value[:len(value) - len(unit)]) * SIZE_UNITS[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value}")
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date (expected YYYY-MM-DD): {value}")
+
+
+def parse_positive(value):
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"invalid count (expected a whole number of at least 1): {value}")
+    return number
+
+
+def parse_hhmm(value):
+    hours, _, minutes = value.partition(":")
+    if not (hours.isdigit() and minutes.isdigit() and int(hours) < 24 and int(minutes) < 60):
+        raise argparse.ArgumentTypeError(f"invalid time (expected HH:MM): {value}")
+    return f"{int(hours):02d}:{int(minutes):02d}"
+
+
+def resolve_migration(value):
+    """Looks up a migration by id or name, defaulting to the active migration."""
+    if value is None:
+        migration = MigrationDAO.get_active_migration()
+        if migration is None:
+            raise CLIError("No active migration. Pass --migration or activate one.")
+        return migration
+    migration = MigrationDAO.get(int(value)) if value.isdigit() else None
+    migration = migration or MigrationDAO.get_by_name(value)
+    if migration is None:
+        raise CLIError(f"Migration not found: {value}")
+    return migration
+
+
+def cmd_migrations(args):
+    return {"migrations": [dict(row) for row in MigrationDAO.get_all()]}
+
+
+def cmd_clone(args):
+    source = resolve_migration(args.migration)
+    migration_id = MigrationDAO.clone(
+        source["id"], args.name, old_root=args.old_root, new_root=args.new_root, include_files=args.files
+    )
+    return {"source": source["name"], "migration": dict(MigrationDAO.get(migration_id))}
+
+
+def cmd_status(args):
+    migration = resolve_migration(args.migration)
+    counts = FileDAO.count_by_status(migration["id"])
+    return {
+        "migration": migration["name"],
+        "files": {status: {"files": files, "bytes": size} for status, (files, size) in counts.items()},
+    }
+
+
+def cmd_scan(args):
+    migration = resolve_migration(args.migration)
+    return scan_migration(
+        migration, workers=args.workers, batch_size=args.batch_size, snapshot=not args.no_snapshot,
+        xattrs=not args.no_xattrs,
+    )
+
+
+def cmd_snapshot(args):
+    migration = resolve_migration(args.migration)
+    return {"migration": migration["name"], **take_snapshot(migration, label=args.label)}
+
+
+def cmd_snapshots(args):
+    migration = resolve_migration(args.migration)
+    return {"migration": migration["name"], "snapshots": list_snapshots(migration)}
+
+
+def cmd_diff(args):
+    migration = resolve_migration(args.migration)
+    return {
+        "migration": migration["name"],
+        **diff_generations(migration, args.old, args.new, limit=args.limit, output=args.output),
+    }
+
+
+def cmd_watch(args):
+    migration = resolve_migration(args.migration)
+    return watch_migration(migration, interval=args.interval, batch_size=args.batch_size)
+
+
+def cmd_analyze(args):
+    migration = resolve_migration(args.migration)
+    return {"migration": migration["name"], **inventory_report(migration, top=args.top, refresh=args.refresh)}
+
+
+def cmd_classify(args):
+    migration = resolve_migration(args.migration)
+    return classify_files(migration, reclassify=args.reclassify)
+
+
+def cmd_plan(args):
+    migration = resolve_migration(args.migration)
+    return plan_targets(migration, batch_size=args.batch_size, max_path=args.max_path, max_name=args.max_name)
+
+
+def cmd_preflight(args):
+    migration = resolve_migration(args.migration)
+    return {
+        "migration": migration["name"],
+        **run_preflight(migration, workers=args.workers, batch_size=args.batch_size, headroom=args.headroom),
+    }
+
+
+def cmd_copy(args):
+    migration = resolve_migration(args.migration)
+    return copy_files(
+        migration, workers=args.workers, batch_size=args.batch_size, retry_failed=args.retry_failed, mode=args.mode,
+        order=args.order, lease=args.lease,
+    )
+
+
+def cmd_forecast(args):
+    migration = resolve_migration(args.migration)
+    return {"migration": migration["name"], **forecast(migration, window=args.window)}
+
+
+def cmd_prioritize(args):
+    migration = resolve_migration(args.migration)
+    project = next((p for p in ProjectDAO.get_all_for_migration(migration["id"]) if p["name"] == args.project), None)
+    if project is None:
+        raise CLIError(f"Project not found in {migration['name']}: {args.project}")
+    changes = {}
+    if args.priority is not None:
+        changes["priority"] = args.priority
+    if args.cutover is not None:
+        changes["cutover_date"] = args.cutover or None
+    if changes:
+        ProjectDAO.update(project["id"], **changes)
+    return {"project": dict(ProjectDAO.get(project["id"]))}
+
+
+def cmd_bundle(args):
+    migration = resolve_migration(args.migration)
+    return bundle_files(
+        migration, workers=args.workers, batch_size=args.batch_size, max_file_size=args.max_file_size,
+        bundle_size=args.bundle_size, extract=not args.no_extract,
+    )
+
+
+def cmd_unbundle(args):
+    migration = resolve_migration(args.migration)
+    return unbundle_files(migration, workers=args.workers)
+
+
+def cmd_verify(args):
+    migration = resolve_migration(args.migration)
+    return verify_files(
+        migration, workers=args.workers, batch_size=args.batch_size, use_hash=not args.size_only, lease=args.lease
+    )
+
+
+def cmd_metadata(args):
+    migration = resolve_migration(args.migration)
+    ownership = False if args.no_ownership else None
+    return replay_metadata(migration, workers=args.workers, batch_size=args.batch_size, ownership=ownership)
+
+
+def cmd_export(args):
+    migration = resolve_migration(args.migration)
+    tables = export_inventory(
+        migration, args.output, fmt=args.format, compress=args.gzip, chunk_rows=args.chunk_rows,
+        tables=args.tables, batch_size=args.batch_size,
+    )
+    return {"migration": migration["name"], "output": str(args.output), "tables": tables}
+
+
+def cmd_import(args):
+    migration = resolve_migration(args.migration)
+    tables = import_inventory(args.input, migration["id"])
+    return {"migration": migration["name"], "tables": tables}
+
+
+def cmd_schedule_list(args):
+    migration = resolve_migration(args.migration)
+    return {"schedules": [dict(row) for row in TransferScheduleDAO.get_all_for_migration(migration["id"])]}
+
+
+def cmd_schedule_add(args):
+    migration = resolve_migration(args.migration)
+    site_id = None
+    if args.site is not None:
+        site = next((s for s in SiteDAO.get_all_for_migration(migration["id"]) if s["name"] == args.site), None)
+        if site is None:
+            raise CLIError(f"Site not found in {migration['name']}: {args.site}")
+        site_id = site["id"]
+    TransferScheduleDAO.add_many([{
+        "site_id": site_id,
+        "start_time": args.start,
+        "end_time": args.end,
+        "bandwidth_limit": args.bandwidth,
+        "iops_limit": args.iops,
+        "max_workers": args.max_workers,
+    }], migration_id=migration["id"])
+    return cmd_schedule_list(args)
+
+
+def cmd_schedule_remove(args):
+    migration = resolve_migration(args.migration)
+    if not TransferScheduleDAO.delete_in_migration(migration["id"], args.id):
+        raise CLIError(f"Schedule not found in {migration['name']}: {args.id}")
+    return cmd_schedule_list(args)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="odie batch operations (JSON output, no prompts)")
+    parser.add_argument("--db", type=Path, help="path to the odie database (defaults to the built-in location)")
+    parser.add_argument("--migration", help="migration id or name (defaults to the active migration)")
+    parser.add_argument("--workers", type=parse_positive, default=4, help="worker threads for I/O bound steps")
+    parser.add_argument("--batch-size", type=parse_positive, default=500, help="rows per database transaction")
+    parser.add_argument("--metrics", action="store_true",
+                        help="write metrics as JSON lines and Prometheus text to metrics/ next to the database")
+    parser.add_argument("--metrics-port", type=int, help="also serve Prometheus metrics on 127.0.0.1:PORT")
+    parser.add_argument("--metrics-interval", type=float, default=DEFAULT_INTERVAL,
+                        help="seconds between metrics snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("migrations", help="list migrations").set_defaults(func=cmd_migrations)
+    commands.add_parser("status", help="file counts and bytes per status").set_defaults(func=cmd_status)
+
+    clone = commands.add_parser("clone", help="create a migration with the sites, clients and projects of this one")
+    clone.add_argument("name", help="name of the new migration")
+    clone.add_argument("--old-root", help="defaults to the source migration's old_root")
+    clone.add_argument("--new-root", help="defaults to the source migration's new_root")
+    clone.add_argument(
+        "--files", action="store_true", help="also copy the file inventory (as pending files) and directory metadata"
+    )
+    clone.set_defaults(func=cmd_clone)
+    scan = commands.add_parser("scan", help="inventory files under old_root")
+    scan.add_argument("--no-snapshot", action="store_true", help="do not keep this scan as a snapshot generation")
+    scan.add_argument("--no-xattrs", action="store_true", help="do not capture extended attributes and ACLs")
+    scan.set_defaults(func=cmd_scan)
+
+    snapshot = commands.add_parser("snapshot", help="keep the current inventory as a snapshot generation")
+    snapshot.add_argument("--label", help="name the generation for later diffs, e.g. signoff")
+    snapshot.set_defaults(func=cmd_snapshot)
+
+    commands.add_parser("snapshots", help="list snapshot generations").set_defaults(func=cmd_snapshots)
+
+    diff = commands.add_parser("diff", help="files added, removed and changed between two snapshot generations")
+    diff.add_argument("old", help="generation number or label")
+    diff.add_argument("new", nargs="?", help="generation number or label (defaults to the latest)")
+    diff.add_argument("--limit", type=int, default=100, help="changes to include in the output")
+    diff.add_argument("--output", type=Path, help="write every change to this file as JSON lines")
+    diff.set_defaults(func=cmd_diff)
+
+    watch = commands.add_parser("watch", help="keep the inventory current from inotify events until interrupted")
+    watch.add_argument("--interval", type=float, default=1.0, help="seconds to coalesce events before writing")
+    watch.set_defaults(func=cmd_watch)
+
+    analyze = commands.add_parser("analyze", help="size, extension, age and project breakdowns of the inventory")
+    analyze.add_argument("--top", type=parse_positive, default=DEFAULT_TOP, help="entries in the largest files/folders lists")
+    analyze.add_argument("--refresh", action="store_true", help="recompute even if the inventory did not change")
+    analyze.set_defaults(func=cmd_analyze)
+
+    classify = commands.add_parser("classify", help="assign files to projects by top-level folder")
+    classify.add_argument("--reclassify", action="store_true", help="also re-evaluate already classified files")
+    classify.set_defaults(func=cmd_classify)
+
+    plan = commands.add_parser("plan", help="compute target paths and record collisions and length problems")
+    plan.add_argument("--max-path", type=int, default=DEFAULT_MAX_PATH, help="longest allowed full target path")
+    plan.add_argument("--max-name", type=int, default=DEFAULT_MAX_NAME, help="longest allowed file or directory name")
+    plan.set_defaults(func=cmd_plan)
+
+    preflight = commands.add_parser("preflight", help="check target capacity and directory permissions before copying")
+    preflight.add_argument("--headroom", type=float, default=DEFAULT_HEADROOM,
+                           help="share of each target filesystem to keep free, e.g. 0.05")
+    preflight.set_defaults(func=cmd_preflight)
+
+    copy = commands.add_parser("copy", help="copy pending files to new_root")
+    copy.add_argument("--retry-failed", action="store_true", help="also retry files that failed before")
+    copy.add_argument("--mode", choices=TRANSFER_MODES, help="override the migration's transfer mode")
+    copy.add_argument("--order", choices=TRANSFER_ORDERS, help="override the migration's order of files per project")
+    copy.add_argument("--lease", type=float, nargs="?", const=DEFAULT_LEASE, metavar="SECONDS",
+                      help="share the files with other workers started with --lease (default lease: 300s)")
+    copy.set_defaults(func=cmd_copy)
+
+    forecast_ = commands.add_parser("forecast", help="throughput, remaining bytes and ETA per project and site")
+    forecast_.add_argument("--window", type=float, default=RATE_WINDOW, help="seconds of history for the rate")
+    forecast_.set_defaults(func=cmd_forecast)
+
+    prioritize = commands.add_parser("prioritize", help="set a project's transfer priority and cutover date")
+    prioritize.add_argument("project", help="project name")
+    prioritize.add_argument("--priority", type=int, help="higher transfers first (default 0)")
+    prioritize.add_argument("--cutover", type=lambda v: parse_date(v) if v else "", help="YYYY-MM-DD, '' to clear")
+    prioritize.set_defaults(func=cmd_prioritize)
+
+    bundle = commands.add_parser("bundle", help="copy small pending files as tar archives (run before copy)")
+    bundle.add_argument("--max-file-size", type=parse_size, default=DEFAULT_MAX_FILE_SIZE,
+                        help="only bundle files up to this size, e.g. 64K")
+    bundle.add_argument("--bundle-size", type=parse_size, default=DEFAULT_BUNDLE_SIZE,
+                        help="start a new archive after this many bytes, e.g. 256M")
+    bundle.add_argument("--no-extract", action="store_true", help="leave archives for a later unbundle")
+    bundle.set_defaults(func=cmd_bundle)
+
+    commands.add_parser("unbundle", help="extract archives left by bundle --no-extract").set_defaults(func=cmd_unbundle)
+
+    verify = commands.add_parser("verify", help="verify copied files against their source")
+    verify.add_argument("--size-only", action="store_true", help="compare sizes only, skip hashing")
+    verify.add_argument("--lease", type=float, nargs="?", const=DEFAULT_LEASE, metavar="SECONDS",
+                        help="share the files with other workers started with --lease (default lease: 300s)")
+    verify.set_defaults(func=cmd_verify)
+
+    metadata = commands.add_parser("metadata", help="restore timestamps, modes, owners and xattrs on copied files")
+    metadata.add_argument("--no-ownership", action="store_true", help="leave owners alone (the default unless root)")
+    metadata.set_defaults(func=cmd_metadata)
+
+    schedule = commands.add_parser("schedule", help="time-of-day transfer limits (applied to running copies)")
+    schedule_commands = schedule.add_subparsers(dest="schedule_command", required=True)
+    schedule_commands.add_parser("list").set_defaults(func=cmd_schedule_list)
+    schedule_add = schedule_commands.add_parser("add", help="add a window; site-specific windows override global ones")
+    schedule_add.add_argument("--start", type=parse_hhmm, required=True, help="window start, HH:MM local time")
+    schedule_add.add_argument("--end", type=parse_hhmm, required=True, help="window end, HH:MM (may wrap midnight)")
+    schedule_add.add_argument("--site", help="site name (defaults to all sites)")
+    schedule_add.add_argument("--bandwidth", type=parse_size, help="bytes per second, e.g. 20M")
+    schedule_add.add_argument("--iops", type=int, help="I/O operations per second")
+    schedule_add.add_argument("--max-workers", type=int, help="concurrent transfers per site")
+    schedule_add.set_defaults(func=cmd_schedule_add)
+    schedule_remove = schedule_commands.add_parser("remove")
+    schedule_remove.add_argument("id", type=int)
+    schedule_remove.set_defaults(func=cmd_schedule_remove)
+
+    export = commands.add_parser("export", help="export sites, clients, projects and files to a directory")
+    export.add_argument("output", type=Path, help="output directory")
+    export.add_argument("--format", choices=FORMATS, default="csv")
+    export.add_argument("--gzip", action="store_true", help="gzip-compress every part file")
+    export.add_argument("--chunk-rows", type=int, default=0, help="start a new part file every N rows")
+    export.add_argument("--tables", nargs="+", choices=list(INVENTORY_DAOS), help="only export these tables")
+    export.set_defaults(func=cmd_export)
+
+    import_ = commands.add_parser("import", help="import an inventory directory into the migration")
+    import_.add_argument("input", type=Path, help="directory written by export, or holding <table>.csv/.jsonl files")
+    import_.set_defaults(func=cmd_import)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db is not None:
+        DatabaseManager(args.db)
+
+    exporter = None
+    try:
+        if args.metrics or args.metrics_port is not None:
+            directory = Path(DatabaseManager().db_path).parent / "metrics"
+            exporter = MetricsExporter(directory, interval=args.metrics_interval, port=args.metrics_port).start()
+        try:
+            result = args.func(args)
+        finally:
+            if exporter is not None:
+                exporter.stop()
+    except (CLIError, ImportError, OSError, ValueError, sqlite3.Error) as e:
+        print(json.dumps({"ok": False, "command": args.command, "error": str(e)}))
+        return EXIT_ERROR
+
+    failed = (
+        result.get("failed", 0) or result.get("extract_errors", 0) or result.get("conflicts", 0)
+        or len(result.get("errors", []))
+    )
+    print(json.dumps({"ok": not failed, "command": args.command, **result}, default=str))
+    return EXIT_FAILURES if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,2 @@
-from .database import DatabaseManager, BaseDAO, MigrationDAO, ClientDAO, FileDAO, ProjectDAO, SiteDAO
\ No newline at end of file
+from .database import DatabaseManager, BaseDAO, AnalyticsReportDAO, ConflictError, MigrationDAO, ClientDAO, DirectoryDAO, FileDAO, FileRangeDAO, FileSignatureDAO, PathConflictDAO, PreflightFailureDAO, ProjectDAO, SiteDAO, TransferSampleDAO, TransferScheduleDAO
+from .instrumentation import QueryStats
@@ -0,0 +1,71 @@
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from . import database
+
+# One thread: a generator's connection must be advanced by the thread that opened it, and
+# SQLite runs one writer at a time anyway. The event loop never waits on a busy database.
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="odie-db")
+_DONE = object()
+
+
+async def run(function, *args, **kwargs):
+    """Runs a blocking database call on the DB executor and returns its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_EXECUTOR, functools.partial(function, *args, **kwargs))
+
+
+async def iterate(function, *args, **kwargs):
+    """Async iterator over the items of a blocking generator, advanced on the DB executor."""
+    iterator = await run(function, *args, **kwargs)
+    try:
+        while True:
+            item = await run(next, iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        await run(iterator.close)  # closes the generator's connection on its own thread
+
+
+class AsyncDAO:
+    """
+    A DAO whose methods are coroutines running on the DB executor, for asyncio callers:
+    `await aio.FileDAO.count_by_status(id)`. Generator methods such as `iter_batches`
+    become async iterators: `async for batch in aio.FileDAO.iter_batches(...)`.
+    """
+
+    def __init__(self, dao):
+        self.dao = dao
+
+    def __getattr__(self, name):
+        attribute = getattr(self.dao, name)
+        if not callable(attribute):
+            return attribute
+        if inspect.isgeneratorfunction(attribute):
+            wrapper = functools.partial(iterate, attribute)
+        else:
+            wrapper = functools.partial(run, attribute)
+        setattr(self, name, wrapper)  # resolved once per method
+        return wrapper
+
+    def __repr__(self):
+        return f"AsyncDAO({self.dao.__name__})"
+
+
+# Every DAO under its own name, so `from database import aio` mirrors `import database`.
+AnalyticsReportDAO = AsyncDAO(database.AnalyticsReportDAO)
+ClientDAO = AsyncDAO(database.ClientDAO)
+DirectoryDAO = AsyncDAO(database.DirectoryDAO)
+FileDAO = AsyncDAO(database.FileDAO)
+FileRangeDAO = AsyncDAO(database.FileRangeDAO)
+FileSignatureDAO = AsyncDAO(database.FileSignatureDAO)
+MigrationDAO = AsyncDAO(database.MigrationDAO)
+PathConflictDAO = AsyncDAO(database.PathConflictDAO)
+PreflightFailureDAO = AsyncDAO(database.PreflightFailureDAO)
+ProjectDAO = AsyncDAO(database.ProjectDAO)
+SiteDAO = AsyncDAO(database.SiteDAO)
+TransferSampleDAO = AsyncDAO(database.TransferSampleDAO)
+TransferScheduleDAO = AsyncDAO(database.TransferScheduleDAO)
@@ -0,0 +1,142 @@
+import csv
+from pathlib import Path
+
+from .database import ClientDAO, ProjectDAO, SiteDAO
+from .inventory import open_text
+
+# Accepted header names per field, compared case-insensitively.
+CLIENT_COLUMNS = {"name": ("name", "client", "client name")}
+PROJECT_COLUMNS = {
+    "name": ("name", "project", "project name"),
+    "site": ("site", "site name"),
+    "client": ("client", "client name"),
+}
+
+
+class BulkImportError(ValueError):
+    """Raised when a CSV has validation errors. Nothing has been imported."""
+
+    def __init__(self, errors):
+        self.errors = errors  # [(line number, message)]
+        super().__init__(f"{len(errors)} validation error(s); first: line {errors[0][0]}: {errors[0][1]}")
+
+
+def _read_csv(path, columns):
+    """
+    Yields (line number, {field: value}) for every data row, mapping headers onto `columns`.
+
+    Raises:
+        BulkImportError: If a required column is missing from the header.
+    """
+    with open_text(Path(path), "r") as f:
+        reader = csv.reader(f)
+        header = [name.strip().casefold() for name in next(reader, [])]
+        positions = {}
+        for field, aliases in columns.items():
+            position = next((i for i, name in enumerate(header) if name in aliases), None)
+            if position is None:
+                raise BulkImportError([(1, f"missing column '{field}' (accepted headers: {', '.join(aliases)})")])
+            positions[field] = position
+        for row in reader:
+            if not any(value.strip() for value in row):
+                continue  # blank line
+            values = {field: (row[i].strip() if i < len(row) else "") for field, i in positions.items()}
+            yield reader.line_num, values
+
+
+def _name_lookup(dao, migration_id):
+    """
+    Returns a resolver from names to ids for the migration's rows of `dao`, built from one query.
+
+    Exact names win; otherwise a case-insensitive match is used if it is unambiguous.
+    """
+    exact, folded = {}, {}
+    for row in dao.get_all_for_migration(migration_id):
+        exact.setdefault(row["name"], row["id"])
+        folded.setdefault(row["name"].casefold(), set()).add(row["id"])
+
+    def resolve(name):
+        if name in exact:
+            return exact[name]
+        ids = folded.get(name.casefold(), ())
+        return next(iter(ids)) if len(ids) == 1 else None
+    return resolve
+
+
+def import_clients(path, migration_id):
+    """
+    Imports clients from a CSV with a `name` column.
+
+    The whole file is validated first and every problem is reported; clients that already
+    exist in the migration are skipped. Valid files are inserted in one transaction.
+
+    Returns:
+        dict: Clients imported and skipped.
+
+    Raises:
+        BulkImportError: With all validation errors; nothing was imported.
+    """
+    existing = {row["name"].casefold() for row in ClientDAO.get_all_for_migration(migration_id)}
+    seen, rows, errors, skipped = {}, [], [], 0
+    for line, values in _read_csv(path, CLIENT_COLUMNS):
+        name = values["name"]
+        key = name.casefold()
+        if not name:
+            errors.append((line, "client name is empty"))
+        elif key in seen:
+            errors.append((line, f"duplicate client '{name}' (first on line {seen[key]})"))
+        elif key in existing:
+            skipped += 1
+        else:
+            rows.append({"name": name})
+        seen.setdefault(key, line)
+    if errors:
+        raise BulkImportError(errors)
+    return {"imported": ClientDAO.add_many(rows, migration_id=migration_id), "skipped": skipped}
+
+
+def import_projects(path, migration_id):
+    """
+    Imports projects from a CSV with `name`, `site` and `client` columns (names, not ids).
+
+    Site and client names are resolved with one query per table. The whole file is
+    validated first and every problem is reported; projects that already exist with the
+    same site and client are skipped. Valid files are inserted in one transaction.
+
+    Returns:
+        dict: Projects imported and skipped.
+
+    Raises:
+        BulkImportError: With all validation errors; nothing was imported.
+    """
+    site_id, client_id = _name_lookup(SiteDAO, migration_id), _name_lookup(ClientDAO, migration_id)
+    existing = {
+        (row["name"].casefold(), row["site_id"], row["client_id"])
+        for row in ProjectDAO.get_all_for_migration(migration_id)
+    }
+    seen, rows, errors, skipped = {}, [], [], 0
+    for line, values in _read_csv(path, PROJECT_COLUMNS):
+        line_errors = []
+        if not values["name"]:
+            line_errors.append("project name is empty")
+        site = site_id(values["site"]) if values["site"] else None
+        if site is None:
+            line_errors.append(f"unknown site '{values['site']}'" if values["site"] else "site is empty")
+        client = client_id(values["client"]) if values["client"] else None
+        if client is None:
+            line_errors.append(f"unknown client '{values['client']}'" if values["client"] else "client is empty")
+        errors.extend((line, message) for message in line_errors)
+        if line_errors:
+            continue
+
+        key = (values["name"].casefold(), site, client)
+        if key in seen:
+            errors.append((line, f"duplicate project '{values['name']}' (first on line {seen[key]})"))
+        elif key in existing:
+            skipped += 1
+        else:
+            rows.append({"name": values["name"], "site_id": site, "client_id": client})
+        seen.setdefault(key, line)
+    if errors:
+        raise BulkImportError(errors)
+    return {"imported": ProjectDAO.add_many(rows, migration_id=migration_id), "skipped": skipped}
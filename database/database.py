@@ -1,8 +1,103 @@
+import functools
+import os
+import random
 import sqlite3
+import time
 from pathlib import Path
 
+from helpers.metrics import counter, histogram
+
+from .instrumentation import InstrumentedConnection, QueryStats
+
 DB_PATH = Path(__file__).parent / ".odie" / "odie.db"
 
+# Set ODIE_SQL_TRACE=1 to record query statistics from start-up; ODIE_SLOW_QUERY_MS sets the slow-query threshold.
+SQL_TRACE_ENV = "ODIE_SQL_TRACE"
+SLOW_QUERY_MS_ENV = "ODIE_SLOW_QUERY_MS"
+DEFAULT_SLOW_QUERY_MS = 100.0
+
+# Several sessions and scripted jobs may share one database. SQLite waits up to BUSY_TIMEOUT seconds for a
+# lock; writes that still find the database locked are retried with exponential backoff.
+BUSY_TIMEOUT = 10.0
+WRITE_RETRIES = 5
+RETRY_BASE_DELAY = 0.05
+
+# Columns added after a table was first released. Missing ones are added to existing databases on start-up.
+COLUMN_UPGRADES = {
+    "migrations": {
+        "transfer_mode": "TEXT DEFAULT 'copy'",  # copy, move, link or delta; see helpers.transfer_options
+        "transfer_order": "TEXT DEFAULT 'priority'",  # priority, smallest or largest; see helpers.transfer_options
+        "version": "INTEGER NOT NULL DEFAULT 0",  # bumped by every update, for optimistic concurrency
+        "scan_generation": "INTEGER NOT NULL DEFAULT 0",  # bumped whenever scans, imports or classification change files
+    },
+    "sites": {
+        "version": "INTEGER NOT NULL DEFAULT 0",
+    },
+    "clients": {
+        "version": "INTEGER NOT NULL DEFAULT 0",
+    },
+    "projects": {
+        "version": "INTEGER NOT NULL DEFAULT 0",
+        "priority": "INTEGER NOT NULL DEFAULT 0",  # higher goes first
+        "cutover_date": "TEXT",                    # 'YYYY-MM-DD' promised to the client, for forecasts
+    },
+    "files": {
+        "path": "TEXT",             # path relative to the migration's old_root, '/'-separated
+        "size": "INTEGER",
+        "mtime": "REAL",
+        "digest": "TEXT",           # sha256 of the content, filled in by verification
+        "status": "TEXT DEFAULT 'pending'",
+        "error": "TEXT",
+        "scanned_at": "REAL",       # start time of the scan that last saw the file
+        "transfer_method": "TEXT",  # rename, hardlink, reflink, copy, range, delta or bundle
+        "bundle": "TEXT",           # tar archive holding the file while its status is 'bundled'
+        "target_path": "TEXT",      # path relative to new_root, filled in by the planner
+        "target_key": "TEXT",       # target_path as NTFS/SMB compare it (NFC, lowercase); see engines.plan
+        "mode": "INTEGER",          # permission bits, uid and gid at scan time, restored by engines.metadata
+        "uid": "INTEGER",
+        "gid": "INTEGER",
+        "xattrs": "BLOB",           # extended attributes incl. POSIX ACLs, packed by engines.metadata.pack_xattrs
+        "lease_owner": "TEXT",      # worker holding the file while it is copied or verified; see engines.lease
+        "lease_expires": "REAL",    # epoch seconds after which another worker may claim the file
+    },
+}
+
+
+class ConflictError(Exception):
+    """Raised when a row was changed by another session since it was read."""
+
+
+def _is_busy(error):
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(error) or "busy" in str(error)
+
+
+_RETRIES = counter("odie_db_retries_total", "Writes retried because the database was locked", ("operation",))
+_BATCH_SECONDS = histogram("odie_db_batch_seconds", "Duration of batched writes (executemany)", ("table",))
+
+
+def retry_on_busy(func):
+    """
+    Retries a write that failed because another connection held the lock.
+
+    The wrapped function must run its statements in one transaction (`with conn:`), so a
+    failed attempt has been rolled back and can simply run again. Delays double on every
+    attempt, with jitter so competing writers do not retry in lockstep.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(WRITE_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == WRITE_RETRIES - 1:
+                    raise
+                _RETRIES.labels(func.__name__).inc()
+                time.sleep(RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+    return wrapper
+
 
 class DatabaseManager:
     """Handles SQLite database connection and schema initialization."""
@@ -19,8 +114,32 @@ class DatabaseManager:
     def _init_db(self, db_path):
         """Initializes the database connection and ensures schema exists."""
         self.db_path = db_path
+        self.query_stats = None
+        if os.environ.get(SQL_TRACE_ENV, "").lower() in ("1", "true", "yes"):
+            self.enable_instrumentation(float(os.environ.get(SLOW_QUERY_MS_ENV, DEFAULT_SLOW_QUERY_MS)))
         self._ensure_database()
 
+    def enable_instrumentation(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS):
+        """
+        Starts recording per-statement counts, latencies and row counts for new connections.
+
+        Statements slower than `slow_query_ms` are kept in `query_stats.slow_queries`
+        and logged to the `odie.sql` logger.
+        """
+        if self.query_stats is None:
+            self.query_stats = QueryStats(slow_query_ms=slow_query_ms)
+        else:
+            self.query_stats.slow_query_ms = slow_query_ms
+        return self.query_stats
+
+    def disable_instrumentation(self):
+        """Stops recording query statistics. Already collected statistics are discarded."""
+        self.query_stats = None
+
+    @property
+    def is_instrumented(self):
+        return self.query_stats is not None
+
     def _ensure_database(self):
         """Ensures the database exists and initializes tables."""
         if not self.db_path.parent.exists():
@@ -28,12 +147,20 @@ class DatabaseManager:
 
         with self.get_connection() as conn:
             conn.execute("PRAGMA foreign_keys = ON;")  # Enforce foreign keys
+            # Write-ahead logging lets readers proceed while one writer commits. The mode is persistent.
+            conn.execute("PRAGMA journal_mode = WAL;")
             self.create_tables(conn)
 
     def get_connection(self):
         """Returns a new SQLite database connection."""
-        conn = sqlite3.connect(self.db_path)
+        if self.query_stats is not None:
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, factory=InstrumentedConnection)
+            conn.query_stats = self.query_stats
+            conn.set_trace_callback(self.query_stats.trace)
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)
         conn.execute("PRAGMA foreign_keys = ON;")  # Ensure FK enforcement
+        conn.execute("PRAGMA synchronous = NORMAL;")  # durable enough with WAL, and far fewer fsyncs
         conn.row_factory = sqlite3.Row
         return conn
 
@@ -51,8 +178,9 @@ class DatabaseManager:
 
                 CREATE TABLE IF NOT EXISTS sites (
                     id INTEGER PRIMARY KEY,
-                    name TEXT UNIQUE NOT NULL,
+                    name TEXT NOT NULL,
                     migration_id INTEGER NOT NULL,
+                    UNIQUE (migration_id, name),
                     FOREIGN KEY (migration_id) REFERENCES migrations(id) ON DELETE CASCADE
                 );
 
@@ -77,13 +205,188 @@ class DatabaseManager:
                 CREATE TABLE IF NOT EXISTS files (
                     id INTEGER PRIMARY KEY,
                     name TEXT NOT NULL,
-                    project_id INTEGER NOT NULL,
+                    project_id INTEGER,
                     flagged INTEGER DEFAULT 0,
                     migration_id INTEGER NOT NULL,
                     FOREIGN KEY (project_id) REFERENCES projects(id),
                     FOREIGN KEY (migration_id) REFERENCES migrations(id) ON DELETE CASCADE
                 );
+
+                CREATE TABLE IF NOT EXISTS transfer_schedules (
+                    id INTEGER PRIMARY KEY,
+                    migration_id INTEGER NOT NULL,
+                    site_id INTEGER,                -- NULL applies to every site of the migration
+                    start_time TEXT NOT NULL,       -- local time, 'HH:MM'
+                    end_time TEXT NOT NULL,         -- windows may wrap past midnight
+                    bandwidth_limit INTEGER,        -- bytes per second, NULL for unlimited
+                    iops_limit INTEGER,             -- I/O operations per second, NULL for unlimited
+                    max_workers INTEGER,            -- concurrent transfers per site, NULL for the job's maximum
+                    FOREIGN KEY (site_id) REFERENCES sites(id) ON DELETE CASCADE,
+                    FOREIGN KEY (migration_id) REFERENCES migrations(id) ON DELETE CASCADE
+                );
+
+                CREATE TABLE IF NOT EXISTS file_signatures (
+                    file_id INTEGER PRIMARY KEY,
+                    block_size INTEGER NOT NULL,
+                    target_size INTEGER NOT NULL,       -- size and mtime of the target file the blocks were
+                    target_mtime_ns INTEGER NOT NULL,   -- hashed from; any other value means the cache is stale
+                    weak BLOB NOT NULL,                 -- adler32 per block, packed unsigned 32-bit integers
+                    strong BLOB NOT NULL,               -- 16-byte blake2b digest per block, concatenated
+                    FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE
+                );
+
+                CREATE TABLE IF NOT EXISTS file_ranges (
+                    file_id INTEGER NOT NULL,
+                    start INTEGER NOT NULL,             -- byte offset of the range in the source and target
+                    length INTEGER NOT NULL,
+                    source_size INTEGER NOT NULL,       -- size and mtime of the source the ranges were
+                    source_mtime_ns INTEGER NOT NULL,   -- planned for; a changed source starts over
+                    done INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (file_id, start),
+                    FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE
+                );
+
+                CREATE TABLE IF NOT EXISTS path_conflicts (
+                    id INTEGER PRIMARY KEY,
+                    migration_id INTEGER NOT NULL,
+                    file_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,             -- see engines.plan.CONFLICT_KINDS
+                    other_file_id INTEGER,          -- the file it clashes with, for collisions
+                    target_path TEXT NOT NULL,
+                    detail TEXT,
+                    FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE,
+                    FOREIGN KEY (other_file_id) REFERENCES files(id) ON DELETE CASCADE,
+                    FOREIGN KEY (migration_id) REFERENCES migrations(id) ON DELETE CASCADE
+                );
+                CREATE INDEX IF NOT EXISTS idx_path_conflicts_migration ON path_conflicts (migration_id, id);
+
+                CREATE TABLE IF NOT EXISTS transfer_samples (
+                    id INTEGER PRIMARY KEY,
+                    migration_id INTEGER NOT NULL,
+                    site_id INTEGER NOT NULL,
+                    project_id INTEGER NOT NULL,
+                    recorded_at REAL NOT NULL,      -- epoch seconds when the batch finished
+                    elapsed REAL NOT NULL,          -- seconds the batch took
+                    files INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+                    FOREIGN KEY (migration_id) REFERENCES migrations(id) ON DELETE CASCADE
+                );
+                CREATE INDEX IF NOT EXISTS idx_transfer_samples_migration ON transfer_samples (migration_id, recorded_at);
+
+                CREATE TABLE IF NOT EXISTS preflight_failures (
+                    id INTEGER PRIMARY KEY,
+                    migration_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,             -- see engines.preflight.FAILURE_KINDS
+                    path TEXT NOT NULL,             -- the directory or filesystem the check failed for
+                    detail TEXT,
+                    checked_at REAL NOT NULL,
+                    FOREIGN KEY (migration_id) REFERENCES migrations(id) ON DELETE CASCADE
+                );
+                CREATE INDEX IF NOT EXISTS idx_preflight_failures_migration ON preflight_failures (migration_id, id);
+
+                CREATE TABLE IF NOT EXISTS directories (
+                    id INTEGER PRIMARY KEY,
+                    migration_id INTEGER NOT NULL,
+                    path TEXT NOT NULL,             -- relative to old_root, '/'-separated
+                    depth INTEGER NOT NULL,         -- number of '/' in path; metadata is replayed deepest first
+                    mtime REAL,
+                    mode INTEGER,
+                    uid INTEGER,
+                    gid INTEGER,
+                    xattrs BLOB,
+                    scanned_at REAL,
+                    UNIQUE (migration_id, path),
+                    FOREIGN KEY (migration_id) REFERENCES migrations(id) ON DELETE CASCADE
+                );
+                CREATE INDEX IF NOT EXISTS idx_directories_depth ON directories (migration_id, depth, path);
+
+                CREATE TABLE IF NOT EXISTS analytics_reports (
+                    migration_id INTEGER NOT NULL,
+                    name TEXT NOT NULL,             -- report and parameters, e.g. 'inventory:top=20'
+                    scan_generation INTEGER NOT NULL,  -- the migration's scan_generation the report was computed for
+                    computed_at REAL NOT NULL,
+                    report TEXT NOT NULL,           -- JSON
+                    PRIMARY KEY (migration_id, name),
+                    FOREIGN KEY (migration_id) REFERENCES migrations(id) ON DELETE CASCADE
+                );
             """)
+        self.upgrade_tables(conn)
+
+    def upgrade_tables(self, conn):
+        """Brings tables created by older versions up to date with the current schema."""
+        with conn:
+            for table, columns in COLUMN_UPGRADES.items():
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for column, definition in columns.items():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+            # Files are inventoried before they are classified, so project_id may no longer be NOT NULL.
+            project_id = next(row for row in conn.execute("PRAGMA table_info(files)") if row[1] == "project_id")
+            if project_id[3]:
+                self._rebuild_table(conn, "files", nullable=("project_id",), constraints=(
+                    "FOREIGN KEY (project_id) REFERENCES projects(id)",
+                    "FOREIGN KEY (migration_id) REFERENCES migrations(id) ON DELETE CASCADE",
+                ))
+
+            # Site names used to be unique across all migrations, which prevented reusing them per migration.
+            if self._has_unique_index(conn, "sites", ["name"]):
+                self._rebuild_table(conn, "sites", constraints=(
+                    "UNIQUE (migration_id, name)",
+                    "FOREIGN KEY (migration_id) REFERENCES migrations(id) ON DELETE CASCADE",
+                ))
+
+            conn.executescript("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_files_migration_path ON files (migration_id, path);
+                CREATE INDEX IF NOT EXISTS idx_files_migration_status ON files (migration_id, status);
+                CREATE INDEX IF NOT EXISTS idx_files_migration_target_key ON files (migration_id, target_key);
+                CREATE INDEX IF NOT EXISTS idx_files_project_status ON files (project_id, status);
+                CREATE INDEX IF NOT EXISTS idx_files_project_status_size ON files (project_id, status, size);
+                CREATE INDEX IF NOT EXISTS idx_files_lease_owner ON files (lease_owner) WHERE lease_owner IS NOT NULL;
+            """)
+
+    @staticmethod
+    def _has_unique_index(conn, table, columns):
+        for index in conn.execute(f"PRAGMA index_list({table})"):
+            if index[2]:
+                indexed = [row[2] for row in conn.execute(f"PRAGMA index_info({index[1]})")]
+                if indexed == columns:
+                    return True
+        return False
+
+    @staticmethod
+    def _rebuild_table(conn, table, nullable=(), constraints=()):
+        """
+        Recreates `table` with the given table constraints, keeping its columns and rows.
+
+        Column-level UNIQUE constraints are dropped and columns listed in `nullable` lose
+        NOT NULL. Follows SQLite's create-copy-drop-rename procedure so foreign keys in
+        other tables keep pointing at `table`.
+        """
+        columns, definitions = [], []
+        for row in conn.execute(f"PRAGMA table_info({table})"):
+            _, name, col_type, not_null, default, pk = tuple(row)
+            definition = f"{name} {col_type}"
+            if pk:
+                definition += " PRIMARY KEY"
+            elif not_null and name not in nullable:
+                definition += " NOT NULL"
+            if default is not None:
+                definition += f" DEFAULT {default}"
+            columns.append(name)
+            definitions.append(definition)
+        column_list = ", ".join(columns)
+        conn.execute("PRAGMA foreign_keys = OFF;")
+        conn.executescript(f"""
+            CREATE TABLE {table}_new (
+                {", ".join(definitions + list(constraints))}
+            );
+            INSERT INTO {table}_new ({column_list}) SELECT {column_list} FROM {table};
+            DROP TABLE {table};
+            ALTER TABLE {table}_new RENAME TO {table};
+        """)
+        conn.execute("PRAGMA foreign_keys = ON;")
 
 
 class BaseDAO:
@@ -127,6 +430,7 @@ class BaseDAO:
             raise ValueError(f"Invalid column(s) for {cls._table}: {', '.join(invalid_keys)}")
 
     @classmethod
+    @retry_on_busy
     def add(cls, **kwargs):
         """
         Inserts a new row into the table dynamically.
@@ -172,6 +476,63 @@ class BaseDAO:
         with cls.get_connection() as conn:
             conn.execute(query, values)
 
+    @classmethod
+    def add_many(cls, rows, migration_id=None):
+        """
+        Inserts many rows in a single transaction.
+
+        All rows must provide the same columns. If `_requires_migration` is `True`,
+        `migration_id` (or the active migration) is injected into every row.
+
+        Args:
+            rows (list[dict]): Rows to insert, keyed by column name.
+            migration_id (int, optional): Migration to insert into. Defaults to the active migration.
+
+        Returns:
+            int: Number of rows inserted.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        columns = list(rows[0].keys())
+        cls.validate_columns(dict.fromkeys(columns))
+
+        if cls._requires_migration and "migration_id" not in columns:
+            migration_id = migration_id or MigrationDAO.get_active_migration_id()
+            if migration_id is None:
+                raise ValueError("No active migration found! Cannot insert without a migration_id.")
+            columns.append("migration_id")
+            values = [tuple(row[c] for c in columns[:-1]) + (migration_id,) for row in rows]
+        else:
+            values = [tuple(row[c] for c in columns) for row in rows]
+
+        placeholders = ", ".join("?" for _ in columns)
+        query = f"INSERT INTO {cls._table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+        cls._executemany(query, values)
+        return len(values)
+
+    @classmethod
+    @retry_on_busy
+    def _executemany(cls, query, values):
+        """Runs `query` for every parameter tuple in `values` (a list, so a retry can replay it) in one transaction."""
+        with _BATCH_SECONDS.labels(cls._table).time(), cls.get_connection() as conn:
+            return conn.executemany(query, values).rowcount
+
+    @classmethod
+    def _versioned(cls):
+        """True if the table has a `version` column for optimistic concurrency."""
+        cls._initialize_columns()
+        return "version" in cls._columns
+
+    @classmethod
+    def get(cls, _id):
+        """Retrieves a single row by primary key, or None if it does not exist."""
+        query = f"SELECT * FROM {cls._table} WHERE {cls._pk} = ?"
+
+        with cls.get_connection() as conn:
+            return conn.execute(query, (_id,)).fetchone()
+
     @classmethod
     def get_all(cls):
         """Retrieves all rows from the table."""
@@ -181,7 +542,30 @@ class BaseDAO:
             return conn.execute(query).fetchall()
 
     @classmethod
-    def update(cls, _id, **kwargs):
+    def get_all_for_migration(cls, migration_id):
+        """Retrieves all rows belonging to the given migration."""
+        query = f"SELECT * FROM {cls._table} WHERE migration_id = ?"
+
+        with cls.get_connection() as conn:
+            return conn.execute(query, (migration_id,)).fetchall()
+
+    @classmethod
+    def iter_for_migration(cls, migration_id, batch_size=1000):
+        """
+        Yields the migration's rows one at a time, fetching `batch_size` rows per round trip.
+
+        Unlike `get_all_for_migration` this never holds more than one batch in memory.
+        """
+        query = f"SELECT * FROM {cls._table} WHERE migration_id = ? ORDER BY {cls._pk}"
+
+        with cls.get_connection() as conn:
+            cursor = conn.execute(query, (migration_id,))
+            while batch := cursor.fetchmany(batch_size):
+                yield from batch
+
+    @classmethod
+    @retry_on_busy
+    def update(cls, _id, expected_version=None, **kwargs):
         """
         Updates an existing row by primary key (`id`), modifying only the specified fields.
 
@@ -189,8 +573,13 @@ class BaseDAO:
         the keys represent the column names to update, and the values are the corresponding
         new values.
 
+        Tables with a `version` column get it incremented on every update. Pass the
+        version the caller read as `expected_version` to update only if nobody else has
+        changed the row since (optimistic concurrency).
+
         Args:
             _id (int): The primary key of the record to update.
+            expected_version (int, optional): Version the caller's copy of the row has.
             **kwargs: Dictionary where keys represent column names and values represent
                       the new data to update.
 
@@ -203,6 +592,7 @@ class BaseDAO:
 
         Raises:
             ValueError: If `kwargs` is empty, preventing an invalid SQL statement.
+            ConflictError: If the row no longer has `expected_version`.
 
         Notes:
             - This method does NOT allow changing the primary key (`id`).
@@ -212,13 +602,49 @@ class BaseDAO:
 
         set_clause = ", ".join(f"{key} = ?" for key in kwargs.keys())
         values = tuple(kwargs.values()) + (_id,)
+        if cls._versioned():
+            set_clause += ", version = version + 1"
 
         query = f"UPDATE {cls._table} SET {set_clause} WHERE {cls._pk} = ?"
+        if expected_version is not None:
+            query += " AND version = ?"
+            values += (expected_version,)
 
         with cls.get_connection() as conn:
-            conn.execute(query, values)
+            updated = conn.execute(query, values).rowcount
+        if expected_version is not None and not updated:
+            raise ConflictError(
+                f"{cls._table} row {_id} was changed or deleted by another session. Reload and try again."
+            )
+
+    @classmethod
+    def update_many(cls, rows):
+        """
+        Updates many rows by primary key in a single transaction.
+
+        Each row is a dict holding the primary key plus the columns to update; all rows
+        must provide the same columns.
+
+        Returns:
+            int: Number of rows updated.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        columns = [key for key in rows[0].keys() if key != cls._pk]
+        cls.validate_columns(dict.fromkeys(columns))
+
+        set_clause = ", ".join(f"{key} = ?" for key in columns)
+        if cls._versioned():
+            set_clause += ", version = version + 1"
+        values = [tuple(row[c] for c in columns) + (row[cls._pk],) for row in rows]
+        query = f"UPDATE {cls._table} SET {set_clause} WHERE {cls._pk} = ?"
+
+        cls._executemany(query, values)
+        return len(values)
 
     @classmethod
+    @retry_on_busy
     def delete(cls, _id):
         """Deletes a row by primary key."""
         query = f"DELETE FROM {cls._table} WHERE {cls._pk} = ?"
@@ -233,6 +659,7 @@ class MigrationDAO(BaseDAO):
     _requires_migration = False  # No migration_id needed for migrations
 
     @classmethod
+    @retry_on_busy
     def set_active_migration(cls, migration_id):
         """Marks a migration as active and ensures all others are inactive."""
         with cls.get_connection() as conn:
@@ -246,6 +673,144 @@ class MigrationDAO(BaseDAO):
             result = conn.execute("SELECT id FROM migrations WHERE is_active = 1").fetchone()
             return result[0] if result else None
 
+    @classmethod
+    def get_active_migration(cls):
+        """Returns the active migration row, or None if no migration is active."""
+        with cls.get_connection() as conn:
+            return conn.execute("SELECT * FROM migrations WHERE is_active = 1").fetchone()
+
+    @classmethod
+    @retry_on_busy
+    def bump_scan_generation(cls, migration_id):
+        """Marks the migration's inventory as changed, invalidating reports computed from it."""
+        with cls.get_connection() as conn:
+            conn.execute("UPDATE migrations SET scan_generation = scan_generation + 1 WHERE id = ?", (migration_id,))
+
+    @classmethod
+    def get_scan_generation(cls, migration_id):
+        with cls.get_connection() as conn:
+            row = conn.execute("SELECT scan_generation FROM migrations WHERE id = ?", (migration_id,)).fetchone()
+        return row[0] if row else None
+
+    # Settings a clone takes over from its source migration.
+    _CLONED_SETTINGS = ("transfer_mode", "transfer_order")
+    # File columns a clone keeps; status, errors, bundles and target paths start over in the new migration.
+    _CLONED_FILE_COLUMNS = (
+        "name", "path", "size", "mtime", "digest", "flagged", "scanned_at", "mode", "uid", "gid", "xattrs",
+    )
+
+    @staticmethod
+    def _copied_columns(conn, table, skip):
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] not in skip]
+
+    @staticmethod
+    def _map_ids(conn, table, source_id):
+        """
+        Reserves new ids for the source migration's rows of `table` in the temp clone_map
+        table: the next free ids, in the order of the old ones.
+        """
+        conn.execute(f"""
+            INSERT INTO clone_map (kind, old_id, new_id)
+            SELECT '{table}', id, (SELECT COALESCE(MAX(id), 0) FROM {table}) + ROW_NUMBER() OVER (ORDER BY id)
+            FROM {table} WHERE migration_id = ?
+        """, (source_id,))
+
+    @classmethod
+    @retry_on_busy
+    def clone(cls, source_id, name, old_root=None, new_root=None, include_files=False):
+        """
+        Creates a migration set up like an existing one, in a single transaction.
+
+        Sites, clients, projects (with their priorities and cutover dates, which drive
+        classification and transfer order), transfer schedules and the migration's
+        transfer settings are copied; with `include_files` the file inventory is too, as
+        pending files of the cloned projects (without one if unclassified), together with
+        the captured file and directory metadata that replay_metadata restores. Every table
+        is copied with one INSERT ... SELECT; new ids are assigned up front in a temp table
+        that the copies of referencing rows join against.
+
+        Args:
+            source_id (int): Migration to copy.
+            name (str): Name of the new migration.
+            old_root (str, optional): Defaults to the source's old_root.
+            new_root (str, optional): Defaults to the source's new_root.
+            include_files (bool): Also copy the file inventory.
+
+        Returns:
+            int: Id of the new migration.
+
+        Raises:
+            ValueError: If the source migration does not exist.
+        """
+        with cls.get_connection() as conn:
+            source = conn.execute("SELECT * FROM migrations WHERE id = ?", (source_id,)).fetchone()
+            if source is None:
+                raise ValueError(f"Migration {source_id} does not exist.")
+            settings = {column: source[column] for column in cls._CLONED_SETTINGS}
+            migration_id = conn.execute(
+                f"INSERT INTO migrations (name, old_root, new_root, {', '.join(settings)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' for _ in settings)})",
+                (name, old_root or source["old_root"], new_root or source["new_root"], *settings.values()),
+            ).lastrowid
+
+            conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS clone_map (
+                    kind TEXT NOT NULL, old_id INTEGER NOT NULL, new_id INTEGER NOT NULL, PRIMARY KEY (kind, old_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("DELETE FROM clone_map")
+            for table in ("sites", "clients"):
+                cls._map_ids(conn, table, source_id)
+                columns = cls._copied_columns(conn, table, skip={"id", "migration_id", "version"})
+                conn.execute(f"""
+                    INSERT INTO {table} (id, migration_id, {", ".join(columns)})
+                    SELECT m.new_id, ?, {", ".join(f"t.{c}" for c in columns)}
+                    FROM {table} t JOIN clone_map m ON m.kind = '{table}' AND m.old_id = t.id
+                """, (migration_id,))
+
+            cls._map_ids(conn, "projects", source_id)
+            skip = {"id", "migration_id", "version", "site_id", "client_id"}
+            columns = cls._copied_columns(conn, "projects", skip=skip)
+            conn.execute(f"""
+                INSERT INTO projects (id, migration_id, site_id, client_id, {", ".join(columns)})
+                SELECT m.new_id, ?, s.new_id, c.new_id, {", ".join(f"p.{c}" for c in columns)}
+                FROM projects p
+                JOIN clone_map m ON m.kind = 'projects' AND m.old_id = p.id
+                JOIN clone_map s ON s.kind = 'sites' AND s.old_id = p.site_id
+                JOIN clone_map c ON c.kind = 'clients' AND c.old_id = p.client_id
+            """, (migration_id,))
+
+            columns = cls._copied_columns(conn, "transfer_schedules", skip={"id", "migration_id", "site_id"})
+            conn.execute(f"""
+                INSERT INTO transfer_schedules (migration_id, site_id, {", ".join(columns)})
+                SELECT ?, s.new_id, {", ".join(f"t.{c}" for c in columns)}
+                FROM transfer_schedules t LEFT JOIN clone_map s ON s.kind = 'sites' AND s.old_id = t.site_id
+                WHERE t.migration_id = ?
+            """, (migration_id, source_id))
+
+            if include_files:
+                columns = ", ".join(cls._CLONED_FILE_COLUMNS)
+                conn.execute(f"""
+                    INSERT INTO files (migration_id, project_id, status, {columns})
+                    SELECT ?, p.new_id, 'pending',
+                           {", ".join(f"f.{c}" for c in cls._CLONED_FILE_COLUMNS)}
+                    FROM files f LEFT JOIN clone_map p ON p.kind = 'projects' AND p.old_id = f.project_id
+                    WHERE f.migration_id = ? ORDER BY f.path
+                """, (migration_id, source_id))
+                columns = cls._copied_columns(conn, "directories", skip={"id", "migration_id"})
+                conn.execute(f"""
+                    INSERT INTO directories (migration_id, {", ".join(columns)})
+                    SELECT ?, {", ".join(columns)} FROM directories WHERE migration_id = ? ORDER BY path
+                """, (migration_id, source_id))
+            conn.execute("DROP TABLE clone_map")
+        return migration_id
+
+    @classmethod
+    def get_by_name(cls, name):
+        """Returns the migration with the given name, or None."""
+        with cls.get_connection() as conn:
+            return conn.execute("SELECT * FROM migrations WHERE name = ?", (name,)).fetchone()
+
 class ClientDAO(BaseDAO):
     """Data Access Object for the clients table."""
     _table = "clients"
@@ -254,10 +819,729 @@ class ProjectDAO(BaseDAO):
     """Data Access Object for the projects table."""
     _table = "projects"
 
+    @classmethod
+    def get_target_directories(cls, migration_id):
+        """Returns {project_id: "Site/Client/Project"}, the directory each project is re-homed to under new_root."""
+        with cls.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT p.id, s.name AS site, c.name AS client, p.name AS project
+                FROM projects p
+                JOIN sites s ON s.id = p.site_id
+                JOIN clients c ON c.id = p.client_id
+                WHERE p.migration_id = ?
+            """, (migration_id,)).fetchall()
+        return {row["id"]: f"{row['site']}/{row['client']}/{row['project']}" for row in rows}
+
+    @classmethod
+    def get_transfer_order(cls, migration_id):
+        """
+        Returns the migration's projects in the order their files are transferred: highest
+        priority first, then earliest cutover date, then creation order.
+        """
+        with cls.get_connection() as conn:
+            return conn.execute("""
+                SELECT id, name, site_id, priority, cutover_date FROM projects
+                WHERE migration_id = ?
+                ORDER BY priority DESC, COALESCE(NULLIF(cutover_date, ''), '9999-12-31'), id
+            """, (migration_id,)).fetchall()
+
+    @classmethod
+    def get_site_ids(cls, migration_id):
+        """Returns {project_id: site_id} for the migration's projects."""
+        with cls.get_connection() as conn:
+            rows = conn.execute("SELECT id, site_id FROM projects WHERE migration_id = ?", (migration_id,)).fetchall()
+        return {row["id"]: row["site_id"] for row in rows}
+
 class FileDAO(BaseDAO):
     """Data Access Object for the files table."""
     _table = "files"
 
+    @classmethod
+    def upsert_scanned(cls, migration_id, rows, scanned_at):
+        """
+        Records files seen by a scan. Known paths keep their state unless size or mtime
+        changed, in which case they go back to `pending`.
+
+        Args:
+            migration_id (int): The migration the files belong to.
+            rows (list[tuple]): (name, path, size, mtime, mode, uid, gid, xattrs) tuples.
+            scanned_at (float): Start time of the scan, used to detect files that disappeared.
+        """
+        query = """
+            INSERT INTO files (name, path, size, mtime, mode, uid, gid, xattrs, scanned_at, migration_id, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending')
+            ON CONFLICT (migration_id, path) DO UPDATE SET
+                status = CASE WHEN files.size IS NOT excluded.size OR files.mtime IS NOT excluded.mtime
+                              THEN 'pending' ELSE files.status END,
+                digest = CASE WHEN files.size IS NOT excluded.size OR files.mtime IS NOT excluded.mtime
+                              THEN NULL ELSE files.digest END,
+                size = excluded.size,
+                mtime = excluded.mtime,
+                mode = excluded.mode,
+                uid = excluded.uid,
+                gid = excluded.gid,
+                xattrs = excluded.xattrs,
+                scanned_at = excluded.scanned_at
+        """
+        cls._executemany(query, [row + (scanned_at, migration_id) for row in rows])
+
+    @classmethod
+    @retry_on_busy
+    def delete_unseen(cls, migration_id, scanned_at):
+        """
+        Removes inventoried files that the scan started at `scanned_at` did not see.
+        Files moved away by a rename transfer are expected to be missing and are kept.
+        """
+        query = """
+            DELETE FROM files
+            WHERE migration_id = ? AND path IS NOT NULL AND scanned_at < ?
+              AND transfer_method IS NOT 'rename'
+        """
+        with cls.get_connection() as conn:
+            return conn.execute(query, (migration_id, scanned_at)).rowcount
+
+    @classmethod
+    def delete_paths(cls, migration_id, paths):
+        """Removes the given paths from the inventory (except files moved away by a rename transfer)."""
+        query = """
+            DELETE FROM files WHERE migration_id = ? AND path = ? AND transfer_method IS NOT 'rename'
+        """
+        return cls._executemany(query, [(migration_id, path) for path in paths]) if paths else 0
+
+    @classmethod
+    @retry_on_busy
+    def delete_under(cls, migration_id, directory):
+        """Removes every inventoried file below `directory` (a path relative to old_root)."""
+        # '0' sorts right after '/', so this is an index range scan over "directory/...".
+        query = """
+            DELETE FROM files
+            WHERE migration_id = ? AND path >= ? AND path < ? AND transfer_method IS NOT 'rename'
+        """
+        with cls.get_connection() as conn:
+            return conn.execute(query, (migration_id, directory + "/", directory + "0")).rowcount
+
+    @classmethod
+    @retry_on_busy
+    def delete_unseen_in_directory(cls, migration_id, directory, scanned_at):
+        """Like `delete_unseen`, restricted to the files directly inside `directory` ("" for old_root)."""
+        prefix = directory + "/" if directory else ""
+        query = """
+            DELETE FROM files
+            WHERE migration_id = ? AND path >= ? AND path < ? AND instr(substr(path, ?), '/') = 0
+              AND scanned_at < ? AND transfer_method IS NOT 'rename'
+        """
+        upper = directory + "0" if directory else "\U0010ffff"
+        with cls.get_connection() as conn:
+            return conn.execute(query, (migration_id, prefix, upper, len(prefix) + 1, scanned_at)).rowcount
+
+    @classmethod
+    @retry_on_busy
+    def classify(cls, migration_id, reclassify=False):
+        """
+        Assigns files to projects by matching the first component of their path against
+        project names (case-insensitive).
+
+        Args:
+            migration_id (int): The migration whose files are classified.
+            reclassify (bool): Also re-evaluate files that already have a project.
+
+        Returns:
+            int: Number of files that were evaluated.
+        """
+        query = """
+            UPDATE files SET project_id = (
+                SELECT p.id FROM projects p
+                WHERE p.migration_id = files.migration_id
+                  AND instr(files.path, '/') > 0
+                  AND lower(p.name) = lower(substr(files.path, 1, instr(files.path, '/') - 1))
+                ORDER BY p.id LIMIT 1
+            )
+            WHERE migration_id = ? AND path IS NOT NULL
+        """
+        if not reclassify:
+            query += " AND project_id IS NULL"
+        with cls.get_connection() as conn:
+            return conn.execute(query, (migration_id,)).rowcount
+
+    @classmethod
+    def iter_batches(cls, migration_id, statuses, batch_size=500, classified_only=True):
+        """
+        Yields lists of at most `batch_size` file rows with one of the given statuses, in id order.
+
+        Uses keyset pagination so rows updated between batches are neither skipped nor repeated.
+        Pass `statuses=None` to iterate over the whole inventory.
+        """
+        statuses = tuple(statuses or ())
+        status_filter = f"AND status IN ({', '.join('?' for _ in statuses)})" if statuses else ""
+        # Without a status, walk the primary key: a (migration_id, ...) index would sort the rest of the table per batch.
+        migration_filter = "migration_id = ?" if statuses else "+migration_id = ?"
+        query = f"""
+            SELECT * FROM files
+            WHERE {migration_filter} AND path IS NOT NULL AND id > ? {status_filter}
+            {"AND project_id IS NOT NULL" if classified_only else ""}
+            ORDER BY id LIMIT ?
+        """
+        last_id = 0
+        while True:
+            with cls.get_connection() as conn:
+                batch = conn.execute(query, (migration_id, last_id, *statuses, batch_size)).fetchall()
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]["id"]
+
+    @classmethod
+    def iter_project_files(cls, project_id, status, order="priority", batch_size=500):
+        """
+        Yields the project's files with `status`, fetching `batch_size` rows per query.
+
+        `order` is "priority" (inventory order), "smallest" or "largest" (by size, files of
+        unknown size after the others). Keyset pagination on the (project_id, status, size)
+        and (project_id, status) indexes, so every query reads one batch.
+        """
+        base = "SELECT * FROM files WHERE project_id = ? AND status = ? AND path IS NOT NULL"
+        unsized = (f"{base} AND size IS NULL AND id > ? ORDER BY id LIMIT ?", lambda row: (row["id"],), (0,))
+        phases = {
+            "priority": [(f"{base} AND id > ? ORDER BY id LIMIT ?", lambda row: (row["id"],), (0,))],
+            "smallest": [
+                (f"{base} AND size IS NOT NULL AND (size, id) > (?, ?) ORDER BY size, id LIMIT ?",
+                 lambda row: (row["size"], row["id"]), (-1, 0)),
+                unsized,
+            ],
+            "largest": [
+                (f"{base} AND size IS NOT NULL AND (size, id) < (?, ?) ORDER BY size DESC, id DESC LIMIT ?",
+                 lambda row: (row["size"], row["id"]), (2 ** 63 - 1, 0)),
+                unsized,
+            ],
+        }[order]
+        for query, key, last in phases:
+            while True:
+                with cls.get_connection() as conn:
+                    batch = conn.execute(query, (project_id, status, *last, batch_size)).fetchall()
+                yield from batch
+                if len(batch) < batch_size:
+                    break
+                last = key(batch[-1])
+
+    @classmethod
+    @retry_on_busy
+    def claim_batch(cls, migration_id, statuses, owner, expires, batch_size=500):
+        """
+        Leases up to `batch_size` classified files with one of `statuses` to `owner` until
+        `expires`, taking files that are not leased or whose lease has expired, in id order
+        per status. Each UPDATE is atomic, so concurrent workers never claim the same file.
+
+        Returns:
+            list[sqlite3.Row]: The claimed rows, in id order.
+        """
+        query = """
+            UPDATE files SET lease_owner = ?, lease_expires = ?
+            WHERE id IN (
+                SELECT id FROM files
+                WHERE migration_id = ? AND status = ? AND path IS NOT NULL AND project_id IS NOT NULL
+                  AND (lease_expires IS NULL OR lease_expires < ?)
+                ORDER BY id LIMIT ?
+            )
+            RETURNING *
+        """
+        now = time.time()
+        rows = []
+        with cls.get_connection() as conn:
+            for status in statuses:  # one status at a time, so the (migration_id, status) index yields id order
+                rows += conn.execute(query, (owner, expires, migration_id, status, now, batch_size - len(rows))).fetchall()
+                if len(rows) == batch_size:
+                    break
+        return sorted(rows, key=lambda row: row["id"])
+
+    @classmethod
+    @retry_on_busy
+    def renew_leases(cls, owner, expires):
+        """Extends every lease `owner` holds to `expires`. Returns the number of files still leased."""
+        with cls.get_connection() as conn:
+            return conn.execute(
+                "UPDATE files SET lease_expires = ? WHERE lease_owner = ?", (expires, owner)
+            ).rowcount
+
+    @classmethod
+    @retry_on_busy
+    def complete_leased(cls, owner, rows, hold_statuses=()):
+        """
+        Like `update_many`, but only for files `owner` still holds, and releases their leases.
+        Results for files whose lease expired and was claimed by another worker are dropped.
+
+        Files whose new status is in `hold_statuses` stay leased to `owner` (until
+        `release_leases`), so a worker claiming those statuses does not take a file it has
+        just failed straight back.
+
+        Returns:
+            int: Number of rows updated.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        columns = [key for key in rows[0].keys() if key != cls._pk]
+        cls.validate_columns(dict.fromkeys(columns))
+        set_clause = ", ".join(f"{key} = ?" for key in columns)
+        if cls._versioned():
+            set_clause += ", version = version + 1"
+        query = f"""
+            UPDATE files SET {set_clause},
+                lease_owner = CASE WHEN ? THEN lease_owner END, lease_expires = CASE WHEN ? THEN lease_expires END
+            WHERE id = ? AND lease_owner = ?
+        """
+        values = []
+        for row in rows:
+            hold = row.get("status") in hold_statuses
+            values.append(tuple(row[c] for c in columns) + (hold, hold, row[cls._pk], owner))
+        with cls.get_connection() as conn:
+            return conn.executemany(query, values).rowcount
+
+    @classmethod
+    @retry_on_busy
+    def release_leases(cls, owner):
+        """Gives up every lease `owner` still holds. Returns the number released."""
+        with cls.get_connection() as conn:
+            return conn.execute(
+                "UPDATE files SET lease_owner = NULL, lease_expires = NULL WHERE lease_owner = ?", (owner,)
+            ).rowcount
+
+    @classmethod
+    def remaining_by_project(cls, migration_id, statuses=("pending", "failed")):
+        """Returns {project_id: (files, bytes)} of classified files not yet transferred."""
+        placeholders = ", ".join("?" for _ in statuses)
+        with cls.get_connection() as conn:
+            rows = conn.execute(f"""
+                SELECT project_id, COUNT(*) AS files, COALESCE(SUM(size), 0) AS bytes FROM files
+                WHERE project_id IN (SELECT id FROM projects WHERE migration_id = ?) AND status IN ({placeholders})
+                GROUP BY project_id
+            """, (migration_id, *statuses)).fetchall()
+        return {row["project_id"]: (row["files"], row["bytes"]) for row in rows}
+
+    @classmethod
+    def iter_columns(cls, migration_id, columns, chunk_rows=100000):
+        """
+        Yields lists of plain tuples (id, *columns) for the migration's inventoried files, in
+        id order, `chunk_rows` at a time. `columns` are SQL expressions over files. Skips
+        sqlite3.Row construction, for bulk analytics.
+        """
+        query = f"""
+            SELECT id, {", ".join(columns)} FROM files
+            WHERE +migration_id = ? AND path IS NOT NULL AND id > ?
+            ORDER BY id LIMIT ?
+        """
+        last_id = 0
+        while True:
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = None
+                chunk = cursor.execute(query, (migration_id, last_id, chunk_rows)).fetchall()
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1][0]
+
+    @classmethod
+    def iter_path_order(cls, migration_id, columns, chunk_rows=100000):
+        """
+        Yields lists of plain tuples (path, *columns) for the migration's inventoried files,
+        in path order (walking the migration/path index, so nothing is sorted), `chunk_rows`
+        at a time.
+        """
+        query = f"""
+            SELECT path, {", ".join(columns)} FROM files
+            WHERE migration_id = ? AND path > ?
+            ORDER BY path LIMIT ?
+        """
+        last_path = ""
+        while True:
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = None
+                chunk = cursor.execute(query, (migration_id, last_path, chunk_rows)).fetchall()
+            if not chunk:
+                return
+            yield chunk
+            last_path = chunk[-1][0]
+
+    @classmethod
+    def get_paths(cls, file_ids):
+        """Returns {file_id: path} for the given files."""
+        file_ids = list(file_ids)
+        if not file_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in file_ids)
+        with cls.get_connection() as conn:
+            rows = conn.execute(f"SELECT id, path FROM files WHERE id IN ({placeholders})", file_ids).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    @classmethod
+    def iter_small_batches(cls, migration_id, max_size, batch_size=500):
+        """
+        Yields batches of pending, classified files no larger than `max_size` bytes,
+        grouped by project (ordered by project_id, id).
+        """
+        query = """
+            SELECT * FROM files
+            WHERE migration_id = ? AND path IS NOT NULL AND status = 'pending'
+              AND project_id IS NOT NULL AND size <= ? AND (project_id, id) > (?, ?)
+            ORDER BY project_id, id LIMIT ?
+        """
+        last = (0, 0)
+        while True:
+            with cls.get_connection() as conn:
+                batch = conn.execute(query, (migration_id, max_size, *last, batch_size)).fetchall()
+            if not batch:
+                return
+            yield batch
+            last = (batch[-1]["project_id"], batch[-1]["id"])
+
+    @classmethod
+    def pending_bundles(cls, migration_id):
+        """Returns the names of archives whose files are waiting to be extracted."""
+        with cls.get_connection() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT bundle FROM files WHERE migration_id = ? AND status = 'bundled' ORDER BY bundle",
+                (migration_id,),
+            ).fetchall()
+        return [row["bundle"] for row in rows]
+
+    @classmethod
+    @retry_on_busy
+    def complete_bundle(cls, migration_id, bundle):
+        """Marks every file of an extracted archive as copied. Returns the number of files."""
+        with cls.get_connection() as conn:
+            return conn.execute("""
+                UPDATE files SET status = 'copied', transfer_method = 'bundle', bundle = NULL, error = NULL
+                WHERE migration_id = ? AND bundle = ? AND status = 'bundled'
+            """, (migration_id, bundle)).rowcount
+
+    @classmethod
+    @retry_on_busy
+    def fail_bundle(cls, migration_id, bundle, error):
+        """Records an extraction error on the archive's files, keeping them bundled for a retry."""
+        with cls.get_connection() as conn:
+            conn.execute(
+                "UPDATE files SET error = ? WHERE migration_id = ? AND bundle = ? AND status = 'bundled'",
+                (error, migration_id, bundle),
+            )
+
+    @classmethod
+    def iter_target_groups(cls, migration_id, batch_size=1000):
+        """
+        Yields lists of files that share a target_key, i.e. would land on the same path
+        on a case-insensitive destination. Found by grouping on the target_key index.
+        """
+        query = """
+            SELECT id, path, target_path, target_key FROM files
+            WHERE migration_id = ? AND target_key IN (
+                SELECT target_key FROM files WHERE migration_id = ? AND target_key IS NOT NULL
+                GROUP BY target_key HAVING COUNT(*) > 1
+            )
+            ORDER BY target_key, id
+        """
+        group = []
+        with cls.get_connection() as conn:
+            cursor = conn.execute(query, (migration_id, migration_id))
+            while batch := cursor.fetchmany(batch_size):
+                for row in batch:
+                    if group and row["target_key"] != group[0]["target_key"]:
+                        yield group
+                        group = []
+                    group.append(row)
+        if group:
+            yield group
+
+    @classmethod
+    def iter_target_directory_clashes(cls, migration_id, batch_size=1000):
+        """
+        Yields (file row, id of another file) for files whose target_key is also a directory
+        of another file's target, e.g. "a/b" and "a/B/c". One index probe per file.
+        """
+        # '0' sorts right after '/', so the probe is an index range scan over "key/...".
+        query = """
+            SELECT * FROM (
+                SELECT f.id, f.path, f.target_path, (
+                    SELECT d.id FROM files d
+                    WHERE d.migration_id = f.migration_id
+                      AND d.target_key >= f.target_key || '/' AND d.target_key < f.target_key || '0'
+                    LIMIT 1
+                ) AS other_file_id
+                FROM files f WHERE f.migration_id = ? AND f.target_key IS NOT NULL
+            ) WHERE other_file_id IS NOT NULL
+        """
+        with cls.get_connection() as conn:
+            cursor = conn.execute(query, (migration_id,))
+            while batch := cursor.fetchmany(batch_size):
+                for row in batch:
+                    yield row, row["other_file_id"]
+
+    @classmethod
+    def count_by_status(cls, migration_id):
+        """Returns {status: (files, bytes)} for the migration's inventory, plus unclassified files."""
+        with cls.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT status, project_id IS NULL AS unclassified, COUNT(*) AS files, COALESCE(SUM(size), 0) AS bytes
+                FROM files WHERE migration_id = ? AND path IS NOT NULL
+                GROUP BY status, unclassified
+            """, (migration_id,)).fetchall()
+        counts = {}
+        for row in rows:
+            key = "unclassified" if row["unclassified"] else row["status"]
+            files, size = counts.get(key, (0, 0))
+            counts[key] = (files + row["files"], size + row["bytes"])
+        return counts
+
+class DirectoryDAO(BaseDAO):
+    """Data Access Object for the directories table: the metadata of the directories under old_root."""
+    _table = "directories"
+
+    @classmethod
+    def upsert_scanned(cls, migration_id, rows, scanned_at):
+        """Records directories seen by a scan, as (path, mtime, mode, uid, gid, xattrs) tuples."""
+        query = """
+            INSERT INTO directories (path, depth, mtime, mode, uid, gid, xattrs, scanned_at, migration_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (migration_id, path) DO UPDATE SET
+                mtime = excluded.mtime,
+                mode = excluded.mode,
+                uid = excluded.uid,
+                gid = excluded.gid,
+                xattrs = excluded.xattrs,
+                scanned_at = excluded.scanned_at
+        """
+        values = [(row[0], row[0].count("/"), *row[1:], scanned_at, migration_id) for row in rows]
+        return cls._executemany(query, values) if values else 0
+
+    @classmethod
+    @retry_on_busy
+    def delete_unseen(cls, migration_id, scanned_at):
+        """Removes directories that the scan started at `scanned_at` did not see."""
+        with cls.get_connection() as conn:
+            return conn.execute(
+                "DELETE FROM directories WHERE migration_id = ? AND scanned_at < ?", (migration_id, scanned_at)
+            ).rowcount
+
+    @classmethod
+    @retry_on_busy
+    def delete_under(cls, migration_id, directory):
+        """Removes `directory` and every directory below it."""
+        query = """
+            DELETE FROM directories WHERE migration_id = ? AND (path = ? OR (path >= ? AND path < ?))
+        """
+        with cls.get_connection() as conn:
+            return conn.execute(query, (migration_id, directory, directory + "/", directory + "0")).rowcount
+
+    @classmethod
+    def iter_deepest_first(cls, migration_id, batch_size=500):
+        """
+        Yields lists of at most `batch_size` directory rows, deepest first (then by path,
+        descending), walking the (migration_id, depth, path) index backwards with keyset pagination.
+        """
+        query = """
+            SELECT * FROM directories
+            WHERE migration_id = ? AND (depth, path) < (?, ?)
+            ORDER BY depth DESC, path DESC LIMIT ?
+        """
+        last = (float("inf"), "")
+        while True:
+            with cls.get_connection() as conn:
+                batch = conn.execute(query, (migration_id, *last, batch_size)).fetchall()
+            if not batch:
+                return
+            yield batch
+            last = (batch[-1]["depth"], batch[-1]["path"])
+
 class SiteDAO(BaseDAO):
     """Data Access Object for the sites table."""
-    _table = "sites"
\ No newline at end of file
+    _table = "sites"
+
+class TransferScheduleDAO(BaseDAO):
+    """Data Access Object for the transfer_schedules table (time-of-day transfer limits)."""
+    _table = "transfer_schedules"
+
+    @classmethod
+    @retry_on_busy
+    def delete_in_migration(cls, migration_id, schedule_id):
+        """Removes one of the migration's schedules. Returns the number removed (0 if it is not the migration's)."""
+        with cls.get_connection() as conn:
+            return conn.execute(
+                "DELETE FROM transfer_schedules WHERE id = ? AND migration_id = ?", (schedule_id, migration_id)
+            ).rowcount
+
+class PathConflictDAO(BaseDAO):
+    """Data Access Object for the path_conflicts table (target path problems found by the planner)."""
+    _table = "path_conflicts"
+
+    @classmethod
+    @retry_on_busy
+    def delete_for_migration(cls, migration_id):
+        """Removes the migration's conflicts before they are planned again. Returns the number removed."""
+        with cls.get_connection() as conn:
+            return conn.execute("DELETE FROM path_conflicts WHERE migration_id = ?", (migration_id,)).rowcount
+
+    @classmethod
+    def count_by_kind(cls, migration_id):
+        """Returns {kind: conflicts} for the migration."""
+        with cls.get_connection() as conn:
+            rows = conn.execute(
+                "SELECT kind, COUNT(*) AS conflicts FROM path_conflicts WHERE migration_id = ? GROUP BY kind",
+                (migration_id,),
+            ).fetchall()
+        return {row["kind"]: row["conflicts"] for row in rows}
+
+    @classmethod
+    def get_page(cls, migration_id, offset, limit):
+        """Returns `limit` conflicts from `offset` in id order, with the source paths of both files."""
+        with cls.get_connection() as conn:
+            return conn.execute("""
+                SELECT c.*, f.path AS path, o.path AS other_path
+                FROM path_conflicts c
+                JOIN files f ON f.id = c.file_id
+                LEFT JOIN files o ON o.id = c.other_file_id
+                WHERE c.migration_id = ?
+                ORDER BY c.id LIMIT ? OFFSET ?
+            """, (migration_id, limit, offset)).fetchall()
+
+class PreflightFailureDAO(BaseDAO):
+    """Data Access Object for the preflight_failures table (problems found by the last preflight run)."""
+    _table = "preflight_failures"
+
+    @classmethod
+    @retry_on_busy
+    def delete_for_migration(cls, migration_id):
+        """Removes the migration's failures before preflight runs again. Returns the number removed."""
+        with cls.get_connection() as conn:
+            return conn.execute("DELETE FROM preflight_failures WHERE migration_id = ?", (migration_id,)).rowcount
+
+    @classmethod
+    def count_by_kind(cls, migration_id):
+        """Returns {kind: failures} for the migration."""
+        with cls.get_connection() as conn:
+            rows = conn.execute(
+                "SELECT kind, COUNT(*) AS failures FROM preflight_failures WHERE migration_id = ? GROUP BY kind",
+                (migration_id,),
+            ).fetchall()
+        return {row["kind"]: row["failures"] for row in rows}
+
+    @classmethod
+    def get_page(cls, migration_id, offset, limit):
+        """Returns `limit` failures from `offset` in id order."""
+        with cls.get_connection() as conn:
+            return conn.execute(
+                "SELECT * FROM preflight_failures WHERE migration_id = ? ORDER BY id LIMIT ? OFFSET ?",
+                (migration_id, limit, offset),
+            ).fetchall()
+
+class TransferSampleDAO(BaseDAO):
+    """Data Access Object for the transfer_samples table (bytes copied per project and batch, for rate estimates)."""
+    _table = "transfer_samples"
+
+    @classmethod
+    def get_since(cls, migration_id, since):
+        """Returns the migration's samples recorded at or after `since` (epoch seconds)."""
+        with cls.get_connection() as conn:
+            return conn.execute(
+                "SELECT * FROM transfer_samples WHERE migration_id = ? AND recorded_at >= ? ORDER BY recorded_at",
+                (migration_id, since),
+            ).fetchall()
+
+    @classmethod
+    @retry_on_busy
+    def delete_before(cls, migration_id, before):
+        """Drops samples too old to matter for rate estimates. Returns the number removed."""
+        with cls.get_connection() as conn:
+            return conn.execute(
+                "DELETE FROM transfer_samples WHERE migration_id = ? AND recorded_at < ?", (migration_id, before)
+            ).rowcount
+
+class AnalyticsReportDAO(BaseDAO):
+    """Data Access Object for the analytics_reports table (cached inventory reports, one per name)."""
+    _table = "analytics_reports"
+    _pk = "migration_id"
+
+    @classmethod
+    def get_current(cls, migration_id, name, scan_generation):
+        """Returns the cached report row if it was computed for `scan_generation`, else None."""
+        with cls.get_connection() as conn:
+            return conn.execute(
+                "SELECT * FROM analytics_reports WHERE migration_id = ? AND name = ? AND scan_generation = ?",
+                (migration_id, name, scan_generation),
+            ).fetchone()
+
+    @classmethod
+    @retry_on_busy
+    def save(cls, migration_id, name, scan_generation, computed_at, report):
+        """Stores a report, replacing the one previously cached under `name`."""
+        with cls.get_connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analytics_reports (migration_id, name, scan_generation, computed_at, report) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (migration_id, name, scan_generation, computed_at, report),
+            )
+
+class FileSignatureDAO(BaseDAO):
+    """Data Access Object for the file_signatures table (block signatures of copied files for delta transfers)."""
+    _table = "file_signatures"
+    _pk = "file_id"
+    _requires_migration = False
+
+    @classmethod
+    def get_many(cls, file_ids):
+        """Returns {file_id: row} for the given files that have a cached signature."""
+        file_ids = list(file_ids)
+        if not file_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in file_ids)
+        with cls.get_connection() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM {cls._table} WHERE file_id IN ({placeholders})", file_ids
+            ).fetchall()
+        return {row["file_id"]: row for row in rows}
+
+    @classmethod
+    def save_many(cls, rows):
+        """Inserts or replaces signatures in a single transaction. Returns the number of rows written."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        columns = list(rows[0].keys())
+        cls.validate_columns(dict.fromkeys(columns))
+        placeholders = ", ".join("?" for _ in columns)
+        query = f"INSERT OR REPLACE INTO {cls._table} ({', '.join(columns)}) VALUES ({placeholders})"
+        cls._executemany(query, [tuple(row[c] for c in columns) for row in rows])
+        return len(rows)
+
+class FileRangeDAO(BaseDAO):
+    """Data Access Object for the file_ranges table (progress of large files copied range by range)."""
+    _table = "file_ranges"
+    _pk = "file_id"
+    _requires_migration = False
+
+    @classmethod
+    def get_for_file(cls, file_id):
+        """Returns the file's ranges in offset order."""
+        with cls.get_connection() as conn:
+            return conn.execute("SELECT * FROM file_ranges WHERE file_id = ? ORDER BY start", (file_id,)).fetchall()
+
+    @classmethod
+    @retry_on_busy
+    def replace_for_file(cls, file_id, source_size, source_mtime_ns, ranges):
+        """Plans the file afresh: replaces its ranges with `ranges`, (start, length) pairs, none done."""
+        with cls.get_connection() as conn:
+            conn.execute("DELETE FROM file_ranges WHERE file_id = ?", (file_id,))
+            conn.executemany(
+                "INSERT INTO file_ranges (file_id, start, length, source_size, source_mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                [(file_id, start, length, source_size, source_mtime_ns) for start, length in ranges],
+            )
+
+    @classmethod
+    @retry_on_busy
+    def mark_done(cls, file_id, start):
+        with cls.get_connection() as conn:
+            conn.execute("UPDATE file_ranges SET done = 1 WHERE file_id = ? AND start = ?", (file_id, start))
+
+    @classmethod
+    @retry_on_busy
+    def delete_for_file(cls, file_id):
+        with cls.get_connection() as conn:
+            conn.execute("DELETE FROM file_ranges WHERE file_id = ?", (file_id,))
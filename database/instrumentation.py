@@ -0,0 +1,184 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger("odie.sql")
+
+# Upper bounds (in milliseconds) of the latency histogram buckets.
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float("inf"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Collapses whitespace so the same statement always maps to the same key."""
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class StatementStats:
+    """Accumulated timings for a single (normalized) SQL statement."""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.histogram = [0] * len(LATENCY_BUCKETS_MS)
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def record(self, elapsed_ms, rows=0):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.histogram[index] += 1
+                break
+
+    def as_dict(self):
+        return {
+            "sql": self.sql,
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.avg_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "histogram": dict(zip((str(b) for b in LATENCY_BUCKETS_MS), self.histogram)),
+        }
+
+
+class QueryStats:
+    """
+    Thread-safe collector for SQL statement counts, latencies and row counts.
+
+    Statements executed through an `InstrumentedConnection` are timed individually.
+    Everything SQLite runs (including `executescript` bodies and implicit
+    BEGIN/COMMIT) is additionally counted by verb via `set_trace_callback`.
+    """
+
+    def __init__(self, slow_query_ms=100.0, slow_log_size=200):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._verbs = {}
+        self.slow_queries = deque(maxlen=slow_log_size)
+
+    def record(self, sql, elapsed_ms, rows=0):
+        """Records one execution. Returns the statement's key, for `add_rows`."""
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = StatementStats(key)
+            stats.record(elapsed_ms, rows)
+            if elapsed_ms >= self.slow_query_ms:
+                self.slow_queries.append((time.time(), key, elapsed_ms))
+        if elapsed_ms >= self.slow_query_ms:
+            logger.info("Slow query (%.1f ms): %s", elapsed_ms, key)
+        return key
+
+    def add_rows(self, key, rows, elapsed_ms=0.0):
+        """Attributes rows (and fetch time) returned after the statement with `key` was executed."""
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is not None:
+                stats.rows += rows
+                stats.total_ms += elapsed_ms
+
+    def trace(self, statement):
+        """Callback for `sqlite3.Connection.set_trace_callback`."""
+        verb = statement.lstrip().split(" ", 1)[0].upper() if statement else ""
+        with self._lock:
+            self._verbs[verb] = self._verbs.get(verb, 0) + 1
+
+    def top(self, limit=None, key="total_ms"):
+        """Returns statement stats sorted by `key`, slowest first."""
+        with self._lock:
+            ordered = sorted(self._statements.values(), key=lambda s: getattr(s, key), reverse=True)
+        return ordered[:limit] if limit else ordered
+
+    @property
+    def verb_counts(self):
+        with self._lock:
+            return dict(self._verbs)
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._verbs.clear()
+            self.slow_queries.clear()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports timings and returned rows to the connection's `QueryStats`."""
+
+    def _stats(self):
+        return self.connection.query_stats
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        # Normalized once here; every row fetched afterwards is attributed by this key.
+        self._last_key = self._stats().record(sql, elapsed_ms, max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._last_key = self._stats().record(sql, elapsed_ms, max(self.rowcount, 0))
+        return self
+
+    def _timed_fetch(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        key = getattr(self, "_last_key", None)
+        if key is not None:
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+            self._stats().add_rows(key, rows, elapsed_ms)
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._timed_fetch(super().fetchmany)
+        return self._timed_fetch(super().fetchmany, size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose shortcut `execute*` methods go through `InstrumentedCursor`."""
+
+    query_stats = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
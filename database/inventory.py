@@ -0,0 +1,315 @@
+import base64
+import csv
+import gzip
+import json
+import os
+from pathlib import Path
+
+from .database import BaseDAO, ClientDAO, DirectoryDAO, FileDAO, MigrationDAO, ProjectDAO, SiteDAO
+
+# Export/import order: every table only references tables listed before it.
+INVENTORY_DAOS = {
+    "sites": SiteDAO,
+    "clients": ClientDAO,
+    "projects": ProjectDAO,
+    "files": FileDAO,
+    "directories": DirectoryDAO,  # their metadata, replayed onto new_root after the copy
+}
+FORMATS = ("csv", "jsonl")
+MANIFEST = "manifest.json"
+_CONVERTERS = {"INTEGER": int, "REAL": float}
+# BLOB columns (packed xattrs) are written as base64 text in both formats.
+_BLOB = "BLOB"
+
+
+def open_text(path, mode):
+    """Opens a part file for text I/O, transparently (de)compressing `.gz` files."""
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", newline="", encoding="utf-8")
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def _part_name(table, fmt, compress, part=None):
+    suffix = f".{fmt}" + (".gz" if compress else "")
+    return f"{table}{suffix}" if part is None else f"{table}-{part:05d}{suffix}"
+
+
+class _PartWriter:
+    """Writes rows to one or more part files, starting a new part every `chunk_rows` rows."""
+
+    def __init__(self, directory, table, columns, fmt, compress, chunk_rows, blobs=()):
+        self.directory = directory
+        self.table = table
+        self.columns = columns
+        self.blobs = set(blobs)
+        self.fmt = fmt
+        self.compress = compress
+        self.chunk_rows = chunk_rows
+        self.parts = []
+        self.rows = 0
+        self._file = None
+        self._writer = None
+        self._rows_in_part = 0
+
+    def _next_part(self):
+        self.close()
+        part = len(self.parts) + 1 if self.chunk_rows else None
+        name = _part_name(self.table, self.fmt, self.compress, part)
+        self.parts.append(name)
+        self._file = open_text(self.directory / name, "w")
+        self._rows_in_part = 0
+        if self.fmt == "csv":
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.columns)
+
+    def write(self, row):
+        if self._file is None or (self.chunk_rows and self._rows_in_part >= self.chunk_rows):
+            self._next_part()
+        values = [
+            base64.b64encode(row[column]).decode("ascii") if column in self.blobs and row[column] is not None
+            else row[column]
+            for column in self.columns
+        ]
+        if self.fmt == "csv":
+            self._writer.writerow(["" if value is None else value for value in values])
+        else:
+            self._file.write(json.dumps(dict(zip(self.columns, values))) + "\n")
+        self._rows_in_part += 1
+        self.rows += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def export_inventory(migration, directory, fmt="csv", compress=False, chunk_rows=0, tables=None, batch_size=1000):
+    """
+    Streams a migration's inventory into `directory`, one file (or chunked part files) per table.
+
+    Rows are read with `fetchmany(batch_size)` and written as they arrive, so memory use
+    does not depend on the size of the inventory. A manifest.json describes the parts.
+
+    Args:
+        migration (Row | dict): The migration to export.
+        directory (str | Path): Output directory; created if missing.
+        fmt (str): "csv" or "jsonl".
+        compress (bool): gzip every part file.
+        chunk_rows (int): Start a new part file every `chunk_rows` rows (0 = one file per table).
+        tables (list[str], optional): Subset of sites, clients, projects, files, directories.
+        batch_size (int): Rows fetched per database round trip.
+
+    Returns:
+        dict: Rows and part files written per table.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}. Expected one of: {', '.join(FORMATS)}")
+    tables = list(tables or INVENTORY_DAOS)
+    unknown = set(tables) - set(INVENTORY_DAOS)
+    if unknown:
+        raise ValueError(f"Unknown inventory table(s): {', '.join(sorted(unknown))}")
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        "format": fmt,
+        "compressed": compress,
+        "migration": {key: migration[key] for key in ("name", "old_root", "new_root")},
+        "tables": {},
+    }
+
+    for table in tables:
+        dao = INVENTORY_DAOS[table]
+        dao._initialize_columns()
+        columns = sorted(dao._columns - {"migration_id"}, key=lambda c: (c != dao._pk, c))
+        with dao.get_connection() as conn:
+            types = _column_types(conn, table)
+        blobs = [column for column in columns if types.get(column) == _BLOB]
+        writer = _PartWriter(directory, table, columns, fmt, compress, chunk_rows, blobs)
+        try:
+            for row in dao.iter_for_migration(migration["id"], batch_size):
+                writer.write(row)
+        finally:
+            writer.close()
+        manifest["tables"][table] = {"columns": columns, "rows": writer.rows, "parts": writer.parts}
+
+    with open(directory / MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return {table: {"rows": info["rows"], "parts": info["parts"]} for table, info in manifest["tables"].items()}
+
+
+def _discover_parts(directory, table):
+    """Finds a table's part files when there is no manifest (e.g. inventories produced by other tools)."""
+    parts = []
+    for fmt in FORMATS:
+        for compress in (False, True):
+            single = directory / _part_name(table, fmt, compress)
+            if single.exists():
+                parts.append(single.name)
+            parts.extend(sorted(p.name for p in directory.glob(f"{table}-[0-9]*{_part_name('', fmt, compress)}")))
+    return parts
+
+
+def _read_rows(path, types):
+    """Lazily yields rows of a CSV or JSONL part as dicts, converting CSV text to column types."""
+    name = path.name[:-3] if path.name.endswith(".gz") else path.name
+    blobs = [column for column, type_ in types.items() if type_ == _BLOB]
+    with open_text(path, "r") as f:
+        if name.endswith(".jsonl"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = (
+                {
+                    column: (None if value == "" else _CONVERTERS.get(types.get(column), str)(value))
+                    for column, value in row.items()
+                }
+                for row in csv.DictReader(f)
+            )
+        for row in rows:
+            for column in blobs:
+                if row.get(column) is not None:
+                    row[column] = base64.b64decode(row[column])
+            yield row
+
+
+def _column_types(conn, table):
+    return {row[1]: row[2].upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def import_inventory(directory, migration_id):
+    """
+    Loads an exported (or externally produced) inventory into `migration_id` in one transaction.
+
+    Sites, clients and projects are matched by name to the migration's existing rows or
+    inserted, and ids in the input are remapped to the target migration's ids. Projects
+    may only reference sites and clients that are imported too or that already belong to
+    the migration; anything else is an error. Files are
+    streamed from disk straight into `executemany`, so memory stays constant regardless of
+    inventory size; paths that already exist are updated in place. Either everything is
+    imported or, on error, nothing is.
+
+    Returns:
+        dict: Rows read per table.
+    """
+    directory = Path(directory)
+    manifest_path = directory / MANIFEST
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {"tables": {}}
+    id_maps = {table: {} for table in INVENTORY_DAOS}
+    summary = {}
+
+    conn = BaseDAO.get_connection()
+    with conn:
+        for table in INVENTORY_DAOS:
+            info = manifest["tables"].get(table)
+            parts = info["parts"] if info else _discover_parts(directory, table)
+            if not parts:
+                continue
+            types = _column_types(conn, table)
+            rows = (row for part in parts for row in _read_rows(directory / part, types))
+            if table == "files":
+                summary[table] = _import_files(conn, rows, migration_id, id_maps["projects"], set(types))
+            elif table == "directories":
+                summary[table] = _import_directories(conn, rows, migration_id)
+            else:
+                summary[table] = _import_named(conn, table, rows, migration_id, id_maps)
+    MigrationDAO.bump_scan_generation(migration_id)
+    return summary
+
+
+def _referenced_id(conn, table, id_maps, old_id, migration_id, count):
+    """
+    The target migration's id for a site or client id in a projects row: remapped if the
+    row was imported, kept if it already is one of the migration's own rows.
+    """
+    if old_id is None or old_id in id_maps[table]:
+        return id_maps[table].get(old_id)
+    if conn.execute(f"SELECT 1 FROM {table} WHERE id = ? AND migration_id = ?", (old_id, migration_id)).fetchone():
+        return old_id
+    raise ValueError(
+        f"projects row {count} references {table} id {old_id}, which is neither imported nor part of the migration"
+    )
+
+
+def _import_named(conn, table, rows, migration_id, id_maps):
+    """Imports sites, clients or projects row by row, recording old id -> new id."""
+    count = 0
+    for row in rows:
+        count += 1
+        name = row["name"]
+        if table == "projects":
+            site_id = _referenced_id(conn, "sites", id_maps, row.get("site_id"), migration_id, count)
+            client_id = _referenced_id(conn, "clients", id_maps, row.get("client_id"), migration_id, count)
+            existing = conn.execute(
+                "SELECT id FROM projects WHERE migration_id = ? AND name = ? AND site_id = ? AND client_id = ?",
+                (migration_id, name, site_id, client_id),
+            ).fetchone()
+            new_id = existing[0] if existing else conn.execute(
+                "INSERT INTO projects (name, site_id, client_id, priority, cutover_date, migration_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, site_id, client_id, row.get("priority") or 0, row.get("cutover_date"), migration_id),
+            ).lastrowid
+        else:
+            existing = conn.execute(
+                f"SELECT id FROM {table} WHERE migration_id = ? AND name = ? ORDER BY id LIMIT 1",
+                (migration_id, name),
+            ).fetchone()
+            new_id = existing[0] if existing else conn.execute(
+                f"INSERT INTO {table} (name, migration_id) VALUES (?, ?)", (name, migration_id)
+            ).lastrowid
+        if row.get("id") is not None:
+            id_maps[table][row["id"]] = new_id
+    return count
+
+
+def _import_files(conn, rows, migration_id, project_ids, table_columns):
+    """Streams file rows into an upsert on (migration_id, path)."""
+    columns = [
+        "name", "path", "size", "mtime", "project_id", "flagged", "digest", "status", "error",
+        "mode", "uid", "gid", "xattrs",
+    ]
+    columns = [column for column in columns if column in table_columns]
+    placeholders = ", ".join("?" for _ in columns)
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != "path")
+    query = f"""
+        INSERT INTO files ({", ".join(columns)}, migration_id) VALUES ({placeholders}, ?)
+        ON CONFLICT (migration_id, path) DO UPDATE SET {updates}
+    """
+    defaults = {"flagged": 0, "status": "pending"}
+    count = 0
+
+    def values():
+        nonlocal count
+        for row in rows:
+            count += 1
+            row = {**defaults, **{k: v for k, v in row.items() if v is not None}}
+            if not row.get("path"):
+                raise ValueError(f"files row {count} has no path")
+            row.setdefault("name", os.path.basename(row["path"]))
+            row["project_id"] = project_ids.get(row.get("project_id")) if project_ids else None
+            yield tuple(row.get(column) for column in columns) + (migration_id,)
+
+    # executemany pulls from the generator one row at a time, so no batch is ever materialized.
+    conn.executemany(query, values())
+    return count
+
+
+def _import_directories(conn, rows, migration_id):
+    """Streams directory rows into an upsert on (migration_id, path)."""
+    columns = ["path", "mtime", "mode", "uid", "gid", "xattrs", "scanned_at"]
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != "path")
+    query = f"""
+        INSERT INTO directories ({", ".join(columns)}, depth, migration_id) VALUES ({", ".join("?" for _ in columns)}, ?, ?)
+        ON CONFLICT (migration_id, path) DO UPDATE SET {updates}
+    """
+    count = 0
+
+    def values():
+        nonlocal count
+        for row in rows:
+            count += 1
+            if not row.get("path"):
+                raise ValueError(f"directories row {count} has no path")
+            yield tuple(row.get(column) for column in columns) + (row["path"].count("/"), migration_id)
+
+    conn.executemany(query, values())
+    return count
@@ -0,0 +1,8 @@
+from .bundle import bundle_files, unbundle_files
+from .classify import classify_files
+from .copy import copy_files
+from .metadata import replay_metadata
+from .plan import plan_targets
+from .preflight import run_preflight
+from .scan import scan_migration
+from .verify import verify_files
\ No newline at end of file
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+from database import aio
+from engines.copy import copy_files
+from engines.scan import scan_migration
+from engines.verify import verify_files
+
+PROGRESS_INTERVAL = 5.0  # seconds between progress updates of a job
+
+ENGINES = {"scan": scan_migration, "copy": copy_files, "verify": verify_files}
+
+
+class MigrationJob:
+    """
+    A scan, copy or verify of one migration, run on its own thread so that one event
+    loop can drive many of them at once. Await the job for the engine's summary (or its
+    exception); iterate `progress()` for updates while it runs.
+
+    The engine itself is unchanged and keeps its own worker pools and database writes.
+    Cancelling a task that awaits the job does not stop the engine: the thread runs to the
+    end of the stage, and an interrupted copy or verify resumes from the files table.
+    """
+
+    def __init__(self, stage, migration, interval=PROGRESS_INTERVAL, **options):
+        if stage not in ENGINES:
+            raise ValueError(f"Unknown stage: {stage}. Expected one of: {', '.join(ENGINES)}")
+        self.stage = stage
+        self.migration = migration
+        self.interval = interval
+        self.options = options
+        self.started = None
+        self._future = None
+
+    def start(self):
+        """Starts the engine on a new thread; must be called from the event loop."""
+        loop = asyncio.get_running_loop()
+        self._future = loop.create_future()
+        self.started = time.time()
+
+        def run():
+            try:
+                summary = ENGINES[self.stage](self.migration, **self.options)
+            except BaseException as e:
+                loop.call_soon_threadsafe(self._settle, None, e)
+            else:
+                loop.call_soon_threadsafe(self._settle, summary, None)
+
+        name = f"odie-{self.stage}-{self.migration['id']}"
+        threading.Thread(target=run, name=name, daemon=True).start()
+        return self
+
+    def _settle(self, summary, error):
+        if self._future.cancelled():
+            return
+        if error is not None:
+            self._future.set_exception(error)
+        else:
+            self._future.set_result(summary)
+
+    def done(self):
+        return self._future is not None and self._future.done()
+
+    def __await__(self):
+        return asyncio.shield(self._future).__await__()
+
+    async def progress(self):
+        """
+        Yields an update every `interval` seconds until the job ends, then a last one with
+        the engine's `summary` (or `error`). Updates carry the stage, the seconds elapsed
+        and the migration's {status: (files, bytes)} counts, read on the DB executor.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._future), self.interval)
+            except Exception:
+                pass  # still running, or failed: the final update carries the error
+            update = {
+                "stage": self.stage,
+                "migration_id": self.migration["id"],
+                "elapsed": time.time() - self.started,
+                "counts": await aio.FileDAO.count_by_status(self.migration["id"]),
+            }
+            if not self._future.done():
+                yield update
+                continue
+            if self._future.exception() is not None:
+                update["error"] = self._future.exception()
+            else:
+                update["summary"] = self._future.result()
+            yield update
+            return
+
+
+def start_scan(migration, interval=PROGRESS_INTERVAL, **options):
+    """Starts `scan_migration(migration, **options)` as a MigrationJob."""
+    return MigrationJob("scan", migration, interval, **options).start()
+
+
+def start_copy(migration, interval=PROGRESS_INTERVAL, **options):
+    """Starts `copy_files(migration, **options)` as a MigrationJob."""
+    return MigrationJob("copy", migration, interval, **options).start()
+
+
+def start_verify(migration, interval=PROGRESS_INTERVAL, **options):
+    """Starts `verify_files(migration, **options)` as a MigrationJob."""
+    return MigrationJob("verify", migration, interval, **options).start()
@@ -0,0 +1,178 @@
+import json
+import time
+
+from database import AnalyticsReportDAO, FileDAO, MigrationDAO, ProjectDAO
+
+try:
+    import numpy
+except ImportError:  # optional; only inventory reports need it
+    numpy = None
+
+CHUNK_ROWS = 200000
+DEFAULT_TOP = 20
+
+# Upper bounds (bytes) of the size histogram buckets; the last bucket is open-ended.
+SIZE_BUCKETS = (0, 4 * 1024, 64 * 1024, 1024 ** 2, 16 * 1024 ** 2, 256 * 1024 ** 2, 1024 ** 3, 16 * 1024 ** 3)
+# Upper bounds (days since last modification) of the age buckets; the last bucket is open-ended.
+AGE_BUCKETS = (30, 90, 365, 3 * 365, 7 * 365)
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def _extension(name):
+    stem, dot, extension = name.rpartition(".")
+    return extension.lower() if dot and stem else ""
+
+
+def load_columns(migration_id, chunk_rows=CHUNK_ROWS):
+    """
+    Loads id, size, mtime, extension, directory and project of every inventoried file
+    into NumPy arrays, `chunk_rows` rows per query. Extensions and directories become
+    integer codes into the returned label lists.
+
+    Returns:
+        tuple: (dict of arrays, extension labels, directory labels)
+    """
+    extensions, directories = {}, {}  # label -> code, in order of first appearance
+    chunks = {"id": [], "size": [], "mtime": [], "extension": [], "directory": [], "project_id": []}
+    selected = ("COALESCE(size, 0)", "COALESCE(mtime, 0.0)", "COALESCE(project_id, -1)", "name", "path")
+    for rows in FileDAO.iter_columns(migration_id, selected, chunk_rows):
+        ids, sizes, mtimes, projects, names, paths = zip(*rows)
+        chunks["id"].append(numpy.array(ids, dtype=numpy.int64))
+        chunks["size"].append(numpy.array(sizes, dtype=numpy.int64))
+        chunks["mtime"].append(numpy.array(mtimes, dtype=numpy.float64))
+        chunks["project_id"].append(numpy.array(projects, dtype=numpy.int64))
+        chunks["extension"].append(numpy.array(
+            [extensions.setdefault(_extension(name), len(extensions)) for name in names], dtype=numpy.int32
+        ))
+        chunks["directory"].append(numpy.array(
+            [directories.setdefault(path.rpartition("/")[0], len(directories)) for path in paths], dtype=numpy.int32
+        ))
+    columns = {
+        name: numpy.concatenate(parts) if parts else numpy.zeros(0, dtype=numpy.int64)
+        for name, parts in chunks.items()
+    }
+    return columns, list(extensions), list(directories)
+
+
+def _bucketed(values, edges, weights, labels):
+    """Counts and sums `weights` per bucket of `values` (right-closed upper bounds in `edges`)."""
+    index = numpy.searchsorted(numpy.asarray(edges), values, side="left")
+    counts = numpy.bincount(index, minlength=len(edges) + 1)
+    totals = numpy.bincount(index, weights=weights, minlength=len(edges) + 1)
+    return [
+        {"bucket": label, "files": int(count), "bytes": int(total)}
+        for label, count, total in zip(labels, counts, totals)
+    ]
+
+
+def _size_label(size):
+    for unit in ("B", "K", "M", "G", "T"):
+        if size < 1024 or unit == "T":
+            return f"{size:g}{unit}"
+        size /= 1024
+
+
+def _bucket_labels(edges, label):
+    names = [f"<= {label(edges[0])}"]
+    names += [f"{label(low)} - {label(high)}" for low, high in zip(edges, edges[1:])]
+    return names + [f"> {label(edges[-1])}"]
+
+
+def _top_folders(directory_codes, sizes, directory_labels, top):
+    """Largest folders by the total size of everything below them."""
+    direct = numpy.bincount(directory_codes, weights=sizes, minlength=len(directory_labels))
+    counts = numpy.bincount(directory_codes, minlength=len(directory_labels))
+    totals = {}
+    for label, size, count in zip(directory_labels, direct, counts):
+        # Credit the files of each directory to it and to every ancestor.
+        parts = label.split("/") if label else []
+        for depth in range(1, len(parts) + 1):
+            ancestor = "/".join(parts[:depth])
+            subtotal = totals.setdefault(ancestor, [0, 0])
+            subtotal[0] += size
+            subtotal[1] += count
+    largest = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    return [{"path": path, "files": int(count), "bytes": int(size)} for path, (size, count) in largest]
+
+
+def compute_report(migration_id, top=DEFAULT_TOP, now=None):
+    """
+    Size, extension, age and project breakdowns of the migration's inventory.
+
+    Columns are loaded once into NumPy arrays and every figure is a vectorized
+    operation over them (bincount, searchsorted, percentile, argpartition).
+    """
+    if numpy is None:
+        raise ImportError("Inventory analytics need NumPy (pip install numpy).")
+    now = time.time() if now is None else now
+    columns, extension_labels, directory_labels = load_columns(migration_id)
+    sizes, total = columns["size"], len(columns["size"])
+    report = {
+        "files": total,
+        "bytes": int(sizes.sum()),
+        "as_of": now,
+        "size_histogram": _bucketed(sizes, SIZE_BUCKETS, sizes, _bucket_labels(SIZE_BUCKETS, _size_label)),
+        "size_percentiles": {},
+        "age_buckets": [],
+        "extensions": [],
+        "projects": [],
+        "largest_files": [],
+        "largest_folders": [],
+    }
+    if not total:
+        return report
+
+    report["size_percentiles"] = {
+        f"p{p:g}": int(value) for p, value in zip(PERCENTILES, numpy.percentile(sizes, PERCENTILES))
+    }
+    report["size_percentiles"]["max"] = int(sizes.max())
+
+    ages = (now - columns["mtime"]) / 86400
+    report["age_buckets"] = _bucketed(ages, AGE_BUCKETS, sizes, _bucket_labels(AGE_BUCKETS, lambda d: f"{d}d"))
+
+    extension_counts = numpy.bincount(columns["extension"], minlength=len(extension_labels))
+    extension_bytes = numpy.bincount(columns["extension"], weights=sizes, minlength=len(extension_labels))
+    report["extensions"] = [
+        {"extension": extension_labels[i], "files": int(extension_counts[i]), "bytes": int(extension_bytes[i])}
+        for i in numpy.argsort(-extension_bytes, kind="stable")[:top]
+    ]
+
+    project_ids, project_index = numpy.unique(columns["project_id"], return_inverse=True)
+    project_counts = numpy.bincount(project_index)
+    project_bytes = numpy.bincount(project_index, weights=sizes)
+    names = {project["id"]: project["name"] for project in ProjectDAO.get_all_for_migration(migration_id)}
+    report["projects"] = sorted((
+        {"project": names.get(int(pid)) if pid >= 0 else None, "files": int(count), "bytes": int(size)}
+        for pid, count, size in zip(project_ids, project_counts, project_bytes)
+    ), key=lambda row: row["bytes"], reverse=True)
+
+    largest = numpy.argpartition(sizes, -min(top, total))[-top:] if total > top else numpy.arange(total)
+    largest = largest[numpy.argsort(-sizes[largest], kind="stable")]
+    paths = FileDAO.get_paths(int(file_id) for file_id in columns["id"][largest])
+    report["largest_files"] = [
+        {"path": paths.get(int(columns["id"][i])), "bytes": int(sizes[i])} for i in largest
+    ]
+    report["largest_folders"] = _top_folders(columns["directory"], sizes, directory_labels, top)
+    return report
+
+
+def inventory_report(migration, top=DEFAULT_TOP, refresh=False):
+    """
+    Returns the inventory report of `migration`, from the cache if nothing changed since.
+
+    Reports are cached in analytics_reports per migration and `top`, tagged with the
+    migration's scan_generation, which scans, watcher flushes, imports and classification
+    bump. A cached report is reused until the generation moves on (ages are as of the
+    report's `as_of` time); `refresh` recomputes it regardless.
+
+    Returns:
+        dict: The report, plus `cached` (bool) and the `scan_generation` it describes.
+    """
+    name = f"inventory:top={top}"
+    generation = MigrationDAO.get_scan_generation(migration["id"])
+    cached = None if refresh else AnalyticsReportDAO.get_current(migration["id"], name, generation)
+    if cached is not None:
+        return {**json.loads(cached["report"]), "cached": True, "scan_generation": generation}
+    report = compute_report(migration["id"], top)
+    AnalyticsReportDAO.save(migration["id"], name, generation, report["as_of"], json.dumps(report))
+    return {**report, "cached": False, "scan_generation": generation}
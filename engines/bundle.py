@@ -0,0 +1,183 @@
+import io
+import os
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from database import FileDAO, ProjectDAO
+from engines.paths import project_directories, source_path, target_relpath
+from engines.throttle import TransferScheduler
+
+BUNDLE_DIR = ".odie-bundles"
+DEFAULT_MAX_FILE_SIZE = 64 * 1024
+DEFAULT_BUNDLE_SIZE = 256 * 1024 * 1024
+
+
+def bundle_directory(migration):
+    """Staging directory for archives, on the destination share so each archive is one sequential write."""
+    return Path(migration["new_root"]) / BUNDLE_DIR
+
+
+class _BundleWriter:
+    """Streams one project's small files into sequentially written, size-capped tar archives."""
+
+    def __init__(self, directory, bundle_size):
+        self.directory = directory
+        self.bundle_size = bundle_size
+        self._tar = None
+        self._name = None
+        self._bytes = 0
+        self._ids = []
+
+    def add(self, row, source, arcname, project_id, throttle):
+        """
+        Appends one file. Returns the archive closed to make room for it, if any.
+
+        The file is read completely before anything is written (files are small), so a
+        read error never leaves a truncated member in the stream.
+        """
+        with open(source, "rb") as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        info = tarfile.TarInfo(arcname)
+        info.size = len(data)
+        info.mtime = stat.st_mtime
+        info.mode = stat.st_mode & 0o7777
+
+        closed = None
+        if self._tar is not None and (self._project_id != project_id or self._bytes >= self.bundle_size):
+            closed = self.close()
+        if self._tar is None:
+            self._open(project_id, row["id"])
+        throttle.io(info.size)
+        self._tar.addfile(info, io.BytesIO(data))
+        self._bytes += info.size
+        self._ids.append(row["id"])
+        return closed
+
+    def _open(self, project_id, first_id):
+        self._project_id = project_id
+        self._name = f"project{project_id}-{first_id}.tar"
+        self._tar = tarfile.open(self.directory / f"{self._name}.partial", "w|")
+        self._bytes = 0
+        self._ids = []
+
+    def close(self):
+        """Finishes the current archive. Returns (archive name, file ids) or None if none is open."""
+        if self._tar is None:
+            return None
+        self._tar.close()
+        os.replace(self.directory / f"{self._name}.partial", self.directory / self._name)
+        closed = (self._name, self._ids)
+        self._tar = None
+        return closed
+
+
+def extract_bundle(archive, new_root):
+    """Unpacks one archive under new_root, then removes it. Member names are paths relative to new_root."""
+    data_filter = getattr(tarfile, "data_filter", None)
+    options = {"filter": "data"} if data_filter else {}
+    root = os.path.realpath(new_root)
+    with tarfile.open(archive, "r|") as tar:
+        for member in tar:
+            # Validate the name before creating anything for it.
+            if data_filter:
+                member = data_filter(member, root)
+            path = os.path.realpath(os.path.join(root, member.name))
+            if os.path.commonpath([root, path]) != root:
+                raise tarfile.TarError(f"Archive member {member.name!r} is outside {new_root}")
+            # Archives are extracted concurrently and share parent directories; tarfile's own
+            # exists-then-makedirs check races with the other extractors.
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tar.extract(member, root, **options)
+    os.unlink(archive)
+
+
+def _record_extraction(migration, name, future, summary):
+    try:
+        future.result()
+    except (OSError, tarfile.TarError) as e:
+        FileDAO.fail_bundle(migration["id"], name, str(e))
+        summary["extract_errors"] += 1
+        return
+    summary["extracted"] += FileDAO.complete_bundle(migration["id"], name)
+
+
+def bundle_files(migration, workers=4, batch_size=500, max_file_size=DEFAULT_MAX_FILE_SIZE,
+                 bundle_size=DEFAULT_BUNDLE_SIZE, extract=True, scheduler=None):
+    """
+    Transfers small files as tar streams instead of one open/close/metadata round trip each.
+
+    Pending files of at most `max_file_size` bytes are read in project order and appended
+    to archives of about `bundle_size` bytes in the staging directory under new_root. Once
+    an archive is complete its files are marked `bundled`. With `extract`, every finished
+    archive is handed to a pool of `workers` extractor threads while the next one is being
+    written; extracted files become `copied` with transfer_method `bundle`. Without it,
+    run `unbundle_files` later, e.g. on a host local to new_root.
+
+    Returns:
+        dict: Files bundled and failed, archives written, and files extracted.
+    """
+    project_dirs = project_directories(migration["id"])
+    project_sites = ProjectDAO.get_site_ids(migration["id"])
+    scheduler = scheduler or TransferScheduler(migration["id"], workers)
+    directory = bundle_directory(migration)
+    directory.mkdir(parents=True, exist_ok=True)
+    writer = _BundleWriter(directory, bundle_size)
+    summary = {"bundled": 0, "failed": 0, "bundles": 0, "extracted": 0, "extract_errors": 0}
+    extractions = []
+
+    def finish(closed):
+        name, ids = closed
+        FileDAO.update_many({"id": i, "status": "bundled", "bundle": name, "error": None} for i in ids)
+        summary["bundles"] += 1
+        summary["bundled"] += len(ids)
+        if extract:
+            extractions.append((name, pool.submit(extract_bundle, directory / name, migration["new_root"])))
+        # Record extractions that finished meanwhile, from this thread.
+        for name, future in [e for e in extractions if e[1].done()]:
+            extractions.remove((name, future))
+            _record_extraction(migration, name, future, summary)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in FileDAO.iter_small_batches(migration["id"], max_file_size, batch_size):
+            scheduler.refresh()
+            failures = []
+            for row in batch:
+                project_id = row["project_id"]
+                throttle = scheduler.for_site(project_sites[project_id])
+                arcname = target_relpath(project_dirs[project_id], row["path"])
+                try:
+                    closed = writer.add(row, source_path(migration, row["path"]), arcname, project_id, throttle)
+                except OSError as e:
+                    failures.append({"id": row["id"], "status": "failed", "error": str(e)})
+                    continue
+                if closed:
+                    finish(closed)
+            FileDAO.update_many(failures)
+            summary["failed"] += len(failures)
+        closed = writer.close()
+        if closed:
+            finish(closed)
+        for name, future in extractions:
+            _record_extraction(migration, name, future, summary)
+    return summary
+
+
+def unbundle_files(migration, workers=4):
+    """
+    Extracts every archive still waiting in the staging directory, `workers` at a time.
+
+    Returns:
+        dict: Files extracted and archives that failed.
+    """
+    directory = bundle_directory(migration)
+    summary = {"extracted": 0, "extract_errors": 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (name, pool.submit(extract_bundle, directory / name, migration["new_root"]))
+            for name in FileDAO.pending_bundles(migration["id"])
+        ]
+        for name, future in futures:
+            _record_extraction(migration, name, future, summary)
+    return summary
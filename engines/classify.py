@@ -0,0 +1,17 @@
+from database import FileDAO, MigrationDAO
+
+
+def classify_files(migration, reclassify=False):
+    """
+    Assigns inventoried files to projects by their top-level folder.
+
+    Returns:
+        dict: Number of files evaluated and the resulting per-status counts.
+    """
+    evaluated = FileDAO.classify(migration["id"], reclassify=reclassify)
+    MigrationDAO.bump_scan_generation(migration["id"])
+    counts = FileDAO.count_by_status(migration["id"])
+    return {
+        "evaluated": evaluated,
+        "unclassified": counts.get("unclassified", (0, 0))[0],
+    }
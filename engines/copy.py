@@ -0,0 +1,230 @@
+import os
+import shutil
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from database import FileDAO, FileSignatureDAO, ProjectDAO
+from engines.delta import DELTA_BLOCK_SIZE, DELTA_MIN_SIZE, Signature, block_checksums, delta_transfer
+from engines.fastpath import DeviceCache, try_hardlink, try_reflink, try_rename
+from engines.lease import WorkLease
+from engines.paths import project_directories, source_path, target_path
+from engines.priority import TransferQueue, record_samples
+from engines.ranges import RANGE_MIN_SIZE, copy_ranges
+from engines.throttle import TransferScheduler
+from helpers.metrics import COPIED_BYTES, ERRORS, QUEUE_DEPTH, counter
+from helpers.transfer_options import TRANSFER_MODES
+
+CHUNK_SIZE = 1024 * 1024  # a multiple of DELTA_BLOCK_SIZE, so signed copies hash whole blocks
+
+# Byte copies of files of at least RANGE_MIN_SIZE are split into ranges copied in parallel ("range").
+
+_FILES = counter("odie_copy_files_total", "Files transferred, by method", ("method",))
+_ERRORS = ERRORS.labels("copy")
+_IN_FLIGHT = QUEUE_DEPTH.labels("copy")
+
+
+def transfer_file(source, destination, throttle, sign=False):
+    """
+    Copies `source` to `destination` chunk by chunk, charging every read/write to the site's
+    bandwidth and IOPS buckets and reporting per-chunk latency to its AIMD controller.
+
+    With `sign`, the chunks are also hashed as they are written and the delta Signature of
+    the new destination is returned, so a later delta sync need not read it back; the
+    source's timestamps are copied to keep that signature valid.
+    """
+    weak, strong = array("I"), []
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        throttle.io(0)  # opening the pair costs an operation even for empty files
+        while True:
+            start = time.monotonic()
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            read_time = time.monotonic() - start
+            throttled = throttle.io(len(chunk))
+            start = time.monotonic()
+            dst.write(chunk)
+            COPIED_BYTES.inc(len(chunk))
+            throttle.record(len(chunk), read_time + time.monotonic() - start, throttled)
+            if sign:
+                chunk_weak, chunk_strong = block_checksums(chunk)
+                weak.extend(chunk_weak)
+                strong.extend(chunk_strong)
+    if not sign:
+        return None
+    shutil.copystat(source, destination)
+    info = os.stat(destination)
+    return Signature(DELTA_BLOCK_SIZE, info.st_size, info.st_mtime_ns, weak, strong)
+
+
+def place_file(source, destination, mode, throttle, devices, copy=True):
+    """
+    Puts `source` at `destination` using the cheapest method the mode and filesystems allow.
+
+    Returns:
+        str: The method used: "rename", "hardlink", "reflink" or "copy"; None if no fast
+             path applied and `copy` is False, leaving the byte copy to the caller.
+    """
+    if devices.same_filesystem(source, destination):
+        throttle.io(0)  # metadata-only operations cost IOPS but no bandwidth
+        if mode == "move" and try_rename(source, destination):
+            return "rename"
+        if mode == "link" and try_hardlink(source, destination):
+            return "hardlink"
+        if try_reflink(source, destination, devices):
+            return "reflink"
+    if not copy:
+        return None
+    transfer_file(source, destination, throttle)
+    return "copy"
+
+
+def _delta_signature(destination, cached):
+    """The cached signature if it still describes `destination`, None to hash the target afresh."""
+    signature = Signature.from_row(cached) if cached is not None else None
+    return signature if signature is not None and signature.matches(destination.stat()) else None
+
+
+def _copy_one(migration, project_dir, throttle, devices, mode, row, cached_signature=None):
+    """
+    Returns the row's result and, in delta mode, the signature row to cache for the next
+    round (or None). Database writes are left to the calling thread, and so are byte copies
+    of files of at least RANGE_MIN_SIZE: for those the result is None.
+    """
+    try:
+        destination = target_path(migration, project_dir, row["path"])
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        source = source_path(migration, row["path"])
+        signature = None
+        with throttle.slots:
+            if mode == "delta" and (row["size"] or 0) >= DELTA_MIN_SIZE and destination.is_file():
+                signature, _ = delta_transfer(
+                    source, destination, _delta_signature(destination, cached_signature), throttle
+                )
+                method = "delta"
+            else:
+                small = (row["size"] or 0) < RANGE_MIN_SIZE
+                # A first delta-mode copy is signed while it is written; range copies stay in the kernel.
+                sign = small and mode == "delta" and (row["size"] or 0) >= DELTA_MIN_SIZE
+                method = place_file(source, destination, mode, throttle, devices, copy=small and not sign)
+                if method is None and sign:
+                    signature = transfer_file(source, destination, throttle, sign=True)
+                    method = "copy"
+        if method is None:
+            return None, None
+        result = {"id": row["id"], "status": "copied", "error": None, "transfer_method": method}
+        return result, signature.to_row(row["id"]) if signature is not None else None
+    except OSError as e:
+        return {"id": row["id"], "status": "failed", "error": str(e), "transfer_method": None}, None
+
+
+def _copy_large(migration, project_dir, throttle, row, pool):
+    """Copies one large file as parallel ranges on `pool` (see engines.ranges) and returns its result."""
+    try:
+        destination = target_path(migration, project_dir, row["path"])
+        copy_ranges(row["id"], source_path(migration, row["path"]), destination, throttle, pool)
+        return {"id": row["id"], "status": "copied", "error": None, "transfer_method": "range"}
+    except OSError as e:
+        return {"id": row["id"], "status": "failed", "error": str(e), "transfer_method": None}
+
+
+def copy_files(migration, workers=4, batch_size=500, retry_failed=False, scheduler=None, mode=None, order=None,
+               lease=None):
+    """
+    Copies classified, pending files from old_root to their target under new_root.
+
+    `mode` (default: the migration's transfer_mode) selects rename/hardlink/reflink fast
+    paths for files whose source and target directories share a filesystem; the method
+    actually used is recorded per file. In `delta` mode, files of at least DELTA_MIN_SIZE
+    that already exist under new_root are synced block by block (see engines.delta); their
+    block signatures are cached in file_signatures so later rounds need not re-read the target.
+    Such files copied whole for the first time are hashed as they are written and cached too.
+
+    Files of at least RANGE_MIN_SIZE that need a byte copy are copied after the rest of
+    their batch has been recorded, one at a time, as ranges spread over the whole pool
+    (see engines.ranges.copy_ranges), and each is recorded as soon as it is done. Finished
+    ranges are recorded in file_ranges, so an interrupted copy of such a file resumes with
+    the ranges still missing.
+
+    Files are taken in the order of a `TransferQueue`: projects by priority, sites
+    interleaved, and within a project by `order` (default: the migration's transfer_order).
+    The bytes copied per project and batch are recorded for throughput and ETA forecasts.
+
+    With `lease` (seconds), batches are instead claimed from the files table shared with
+    other worker processes (see engines.lease.WorkLease), in id order; run every worker of
+    a migration that way so they split the files between them.
+
+    Each batch of `batch_size` files is handed to a pool of `workers` threads and its
+    results are recorded in one transaction (large files apart). How many of those threads copy to a site at
+    once, and how fast, is governed by the migration's `TransferScheduler`: bandwidth and
+    IOPS caps from the active time-of-day schedule, and an AIMD controller that adapts the
+    concurrency to observed latency and throughput.
+
+    Only contents are copied; timestamps, modes, owners and extended attributes are
+    restored afterwards from the scan by engines.metadata.replay_metadata.
+
+    Returns:
+        dict: Number of files copied and failed, the bytes copied, files per transfer method
+              and the final per-site concurrency; with `lease`, also this worker's name and
+              the results dropped because their lease was lost.
+    """
+    mode = mode or migration["transfer_mode"] or "copy"
+    if mode not in TRANSFER_MODES:
+        raise ValueError(f"Unknown transfer mode: {mode}. Expected one of: {', '.join(TRANSFER_MODES)}")
+    devices = DeviceCache()
+    project_dirs = project_directories(migration["id"])
+    project_sites = ProjectDAO.get_site_ids(migration["id"])
+    scheduler = scheduler or TransferScheduler(migration["id"], workers)
+    statuses = ("pending", "failed") if retry_failed else ("pending",)
+    queue = TransferQueue(migration["id"], statuses, order or migration["transfer_order"] or "priority", batch_size)
+    leased = WorkLease(migration["id"], statuses, batch_size, lease) if lease else None
+    summary = {"copied": 0, "failed": 0, "bytes": 0, "methods": {}}
+
+    def copy_row(row, cached_signature):
+        throttle = scheduler.for_site(project_sites[row["project_id"]])
+        try:
+            return _copy_one(migration, project_dirs[row["project_id"]], throttle, devices, mode, row, cached_signature)
+        finally:
+            _IN_FLIGHT.dec()
+
+    def record(rows, outcomes, started):
+        results = [result for result, _ in outcomes]
+        if leased:
+            leased.complete(results)
+        else:
+            FileDAO.update_many(results)
+        record_samples(migration["id"], project_sites, rows, results, started, time.time())
+        FileSignatureDAO.save_many(signature for _, signature in outcomes if signature is not None)
+        for row, result in zip(rows, results):
+            summary[result["status"]] += 1
+            if result["status"] == "copied":
+                summary["bytes"] += row["size"] or 0
+                method = result["transfer_method"]
+                summary["methods"][method] = summary["methods"].get(method, 0) + 1
+                _FILES.labels(method).inc()
+            else:
+                _ERRORS.inc()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, leased or nullcontext():
+        for batch in leased.batches() if leased else queue.batches():
+            scheduler.refresh()
+            started = time.time()
+            cached = FileSignatureDAO.get_many(row["id"] for row in batch) if mode == "delta" else {}
+            _IN_FLIGHT.inc(len(batch))
+            outcomes = list(pool.map(copy_row, batch, [cached.get(row["id"]) for row in batch]))
+            done = [(row, outcome) for row, outcome in zip(batch, outcomes) if outcome[0] is not None]
+            if done:
+                record(*zip(*done), started)
+            # Large files take long; each result is recorded as soon as its file is done.
+            for row, (result, _) in zip(batch, outcomes):
+                if result is None:
+                    started = time.time()
+                    throttle = scheduler.for_site(project_sites[row["project_id"]])
+                    result = _copy_large(migration, project_dirs[row["project_id"]], throttle, row, pool)
+                    record([row], [(result, None)], started)
+    summary["workers"] = scheduler.workers()
+    if leased:
+        summary.update(worker=leased.owner, lost=leased.lost)
+    return summary
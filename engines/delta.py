@@ -0,0 +1,299 @@
+import hashlib
+import mmap
+import os
+import shutil
+import time
+import zlib
+from array import array
+
+from engines.fastpath import replace_via_temp
+
+try:
+    import numpy
+except ImportError:  # optional; without it the rolling search runs byte by byte in Python
+    numpy = None
+
+DELTA_BLOCK_SIZE = 64 * 1024
+DELTA_MIN_SIZE = 8 * 1024 * 1024  # smaller files are cheaper to copy whole
+STRONG_SIZE = 16
+ADLER_MOD = 65521
+SEARCH_CHUNK = 1024 * 1024  # window offsets checksummed per NumPy pass
+
+
+def _strong(block):
+    return hashlib.blake2b(block, digest_size=STRONG_SIZE).digest()
+
+
+def block_checksums(data, block_size=DELTA_BLOCK_SIZE):
+    """Weak and strong checksums of each `block_size` block of `data`; only the last block may be short."""
+    blocks = [data[i:i + block_size] for i in range(0, len(data), block_size)]
+    return array("I", map(zlib.adler32, blocks)), [_strong(block) for block in blocks]
+
+
+class Signature:
+    """
+    Weak (adler32, rollable) and strong (blake2b) checksums of every block of a target file.
+
+    `size` and `mtime_ns` identify the version of the target the blocks were hashed from;
+    a cached signature is only trusted while the target still has both.
+    """
+
+    def __init__(self, block_size, size, mtime_ns, weak, strong):
+        self.block_size = block_size
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.weak = weak
+        self.strong = strong
+        self._index = None
+
+    @classmethod
+    def from_row(cls, row):
+        weak = array("I")
+        weak.frombytes(row["weak"])
+        strong = [row["strong"][i:i + STRONG_SIZE] for i in range(0, len(row["strong"]), STRONG_SIZE)]
+        return cls(row["block_size"], row["target_size"], row["target_mtime_ns"], weak, strong)
+
+    @classmethod
+    def of_file(cls, path, block_size=DELTA_BLOCK_SIZE):
+        weak, strong = array("I"), []
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            while block := f.read(block_size):
+                weak.append(zlib.adler32(block))
+                strong.append(_strong(block))
+        return cls(block_size, stat.st_size, stat.st_mtime_ns, weak, strong)
+
+    def to_row(self, file_id):
+        return {
+            "file_id": file_id,
+            "block_size": self.block_size,
+            "target_size": self.size,
+            "target_mtime_ns": self.mtime_ns,
+            "weak": self.weak.tobytes(),
+            "strong": b"".join(self.strong),
+        }
+
+    def matches(self, stat):
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+    def find(self, weak, block, offset):
+        """
+        Returns the index of a target block equal to `block`, or None. A block at the same
+        offset is preferred, since that is what allows the target to be patched in place.
+        """
+        if self._index is None:
+            self._index = {}
+            for i, value in enumerate(self.weak):
+                self._index.setdefault(value, []).append(i)
+        indexes = self._index.get(weak)
+        if not indexes:
+            return None
+        strong = _strong(block)
+        same_offset = offset // self.block_size if offset % self.block_size == 0 else None
+        matching = [i for i in indexes if self.strong[i] == strong and self.block_length(i) == len(block)]
+        if not matching:
+            return None
+        return same_offset if same_offset in matching else matching[0]
+
+    def block_length(self, index):
+        return min(self.block_size, self.size - index * self.block_size)
+
+
+class _RollingSearch:
+    """Finds offsets whose block-sized window has a weak checksum present in the target signature."""
+
+    def __init__(self, data, block_size, weak_values):
+        self.data = data
+        self.block_size = block_size
+        self.weak_values = weak_values
+        self._chunk_start = None
+        self._chunk_hits = None
+        if numpy is not None:
+            self._weak_array = numpy.unique(numpy.array(sorted(weak_values), dtype=numpy.int64))
+
+    def next_candidate(self, start):
+        """Smallest offset >= `start` with a weak hit, or None if there is none."""
+        last = len(self.data) - self.block_size
+        if numpy is None:
+            return self._roll(start, last)
+        offset = start
+        while offset <= last:
+            chunk_start = offset - offset % SEARCH_CHUNK
+            if chunk_start != self._chunk_start:
+                self._chunk_start = chunk_start
+                self._chunk_hits = self._weak_hits(chunk_start, min(chunk_start + SEARCH_CHUNK, last + 1))
+            position = numpy.searchsorted(self._chunk_hits, offset)
+            if position < len(self._chunk_hits):
+                return int(self._chunk_hits[position])
+            offset = chunk_start + SEARCH_CHUNK
+        return None
+
+    def _weak_hits(self, start, stop):
+        """
+        adler32 of every window starting in [start, stop), from prefix sums:
+        a = 1 + sum(x), b = L + sum((L - i) * x_i), both mod 65521.
+        """
+        length = self.block_size
+        x = numpy.frombuffer(self.data, dtype=numpy.uint8, count=stop - start + length - 1, offset=start)
+        x = x.astype(numpy.int64)
+        s1 = numpy.concatenate(([0], numpy.cumsum(x)))
+        s2 = numpy.concatenate(([0], numpy.cumsum(numpy.arange(len(x), dtype=numpy.int64) * x)))
+        k = numpy.arange(stop - start, dtype=numpy.int64)
+        window = s1[k + length] - s1[k]
+        a = (1 + window) % ADLER_MOD
+        b = (length + (k + length) * window - (s2[k + length] - s2[k])) % ADLER_MOD
+        hits = numpy.isin((b << 16) | a, self._weak_array, assume_unique=False)
+        return numpy.flatnonzero(hits) + start
+
+    def _roll(self, start, last):
+        if start > last:
+            return None
+        data, length, weak_values = self.data, self.block_size, self.weak_values
+        weak = zlib.adler32(data[start:start + length])
+        a, b = weak & 0xFFFF, weak >> 16
+        offset = start
+        while True:
+            if (b << 16) | a in weak_values:
+                return offset
+            if offset == last:
+                return None
+            out, new = data[offset], data[offset + length]
+            a = (a - out + new) % ADLER_MOD
+            b = (b - length * out + a - 1) % ADLER_MOD
+            offset += 1
+
+
+def compute_delta(data, signature):
+    """
+    Matches `data` (the new source content) against the target's signature, rsync style.
+
+    Each block-sized window is first checked where the previous match ended; only when
+    that fails does the rolling search look for the next offset at which any target block
+    starts. Unchanged files and in-place edits therefore cost one checksum per block.
+
+    Returns:
+        list[tuple]: (offset, length, target block index) in source order; the index is
+                     None for literal data that has to be sent.
+    """
+    length = signature.block_size
+    total = len(data)
+    search = _RollingSearch(data, length, set(signature.weak)) if signature.weak else None
+    ops = []
+    literal_start = offset = 0
+
+    def emit_match(at, size, index):
+        if at > literal_start:
+            ops.append((literal_start, at - literal_start, None))
+        ops.append((at, size, index))
+
+    while offset + length <= total and search is not None:
+        block = data[offset:offset + length]
+        index = signature.find(zlib.adler32(block), block, offset)
+        if index is None:
+            candidate = search.next_candidate(offset + 1)
+            while candidate is not None:
+                block = data[candidate:candidate + length]
+                index = signature.find(zlib.adler32(block), block, candidate)
+                if index is not None:
+                    break
+                candidate = search.next_candidate(candidate + 1)
+            if candidate is None:
+                break
+            offset = candidate
+        emit_match(offset, length, index)
+        offset += length
+        literal_start = offset
+
+    # A short last block can only match the target's (equally short) last block.
+    tail = data[literal_start:] if literal_start < total else b""
+    if tail and len(tail) < length and signature.weak:
+        index = signature.find(zlib.adler32(tail), tail, literal_start)
+        if index is not None:
+            emit_match(literal_start, len(tail), index)
+            literal_start = total
+    if literal_start < total:
+        ops.append((literal_start, total - literal_start, None))
+    return ops
+
+
+def _new_signature(data, ops, signature, block_size):
+    """Signature of the new content; blocks that matched at an aligned offset reuse the target's checksums."""
+    known = {
+        offset // block_size: index
+        for offset, size, index in ops
+        if index is not None and offset % block_size == 0 and size == signature.block_length(index)
+    }
+    weak, strong = array("I"), []
+    for i, offset in enumerate(range(0, len(data), block_size)):
+        if i in known:
+            weak.append(signature.weak[known[i]])
+            strong.append(signature.strong[known[i]])
+        else:
+            block = data[offset:offset + block_size]
+            weak.append(zlib.adler32(block))
+            strong.append(_strong(block))
+    return weak, strong
+
+
+def _write_literal(dst, data, offset, size, throttle):
+    """Writes source bytes, charged to the site's bandwidth and reported to its AIMD controller."""
+    chunk_size = 1024 * 1024
+    for start in range(offset, offset + size, chunk_size):
+        chunk = data[start:min(start + chunk_size, offset + size)]
+        throttled = throttle.io(len(chunk))
+        began = time.monotonic()
+        dst.seek(start)
+        dst.write(chunk)
+        throttle.record(len(chunk), time.monotonic() - began, throttled)
+
+
+def delta_transfer(source, destination, signature, throttle):
+    """
+    Brings the existing `destination` up to date with `source`, writing only changed blocks.
+
+    If every matched block is still at its original offset (edits in place, appended or
+    truncated data) the target is patched in place. Otherwise (data was inserted or removed
+    and later blocks moved) a new file is assembled in a temporary sibling from target
+    blocks and source literals, then swapped in.
+
+    Args:
+        signature (Signature): Signature of the current destination; computed if None.
+
+    Returns:
+        tuple[Signature, int]: Signature of the updated destination and the literal bytes written.
+    """
+    signature = signature or Signature.of_file(destination)
+    block_size = signature.block_size
+    with open(source, "rb") as src:
+        size = os.fstat(src.fileno()).st_size
+        data = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        try:
+            ops = compute_delta(data, signature)
+            literal_bytes = sum(length for _, length, index in ops if index is None)
+            throttle.io(0)
+            if all(index is None or index * block_size == offset for offset, _, index in ops):
+                with open(destination, "r+b") as dst:
+                    for offset, length, index in ops:
+                        if index is None:
+                            _write_literal(dst, data, offset, length, throttle)
+                    dst.truncate(size)
+            else:
+                def assemble(temp):
+                    with open(destination, "rb") as old, open(temp, "wb") as dst:
+                        for offset, length, index in ops:
+                            if index is None:
+                                _write_literal(dst, data, offset, length, throttle)
+                            else:
+                                old.seek(index * block_size)
+                                throttle.io(length)
+                                dst.seek(offset)
+                                dst.write(old.read(length))
+
+                replace_via_temp(destination, assemble)
+            weak, strong = _new_signature(data, ops, signature, block_size)
+        finally:
+            if size:
+                data.close()
+    shutil.copystat(source, destination)
+    stat = os.stat(destination)
+    return Signature(block_size, stat.st_size, stat.st_mtime_ns, weak, strong), literal_bytes
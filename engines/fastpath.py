@@ -0,0 +1,99 @@
+import errno
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; reflinks are Linux-only anyway
+    fcntl = None
+
+# ioctl request number of FICLONE (_IOW(0x94, 9, int)), supported by btrfs, XFS and other CoW filesystems.
+FICLONE = 0x40049409
+# FICLONE errors meaning the filesystem cannot clone at all (rather than this one file).
+_NO_REFLINK = (errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV, errno.ENOTTY)
+
+
+class DeviceCache:
+    """
+    Caches `st_dev` per directory so same-filesystem detection costs one stat per
+    directory (subtree) rather than per file, and remembers the devices that turned out
+    not to support reflinks.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices = {}
+        self._no_reflink = set()
+
+    def device(self, directory):
+        directory = os.fspath(directory)
+        with self._lock:
+            device = self._devices.get(directory)
+        if device is None:
+            device = os.stat(directory).st_dev
+            with self._lock:
+                self._devices[directory] = device
+        return device
+
+    def same_filesystem(self, source, destination):
+        """True if `source` and the (existing) directory of `destination` are on the same device."""
+        return self.device(os.path.dirname(source)) == self.device(os.path.dirname(destination))
+
+    def reflinks(self, directory):
+        """False once a reflink into `directory`'s filesystem has failed as unsupported."""
+        return self.device(directory) not in self._no_reflink
+
+    def disable_reflinks(self, directory):
+        device = self.device(directory)
+        with self._lock:
+            self._no_reflink.add(device)
+
+
+def replace_via_temp(destination, create):
+    """Creates the destination through a temporary sibling so existing targets are replaced atomically."""
+    temp = os.path.join(os.path.dirname(destination), f".{os.path.basename(destination)}.odie-tmp")
+    try:
+        create(temp)
+        os.replace(temp, destination)
+    except OSError:
+        if os.path.lexists(temp):
+            os.unlink(temp)
+        raise
+
+
+def try_rename(source, destination):
+    try:
+        os.rename(source, destination)
+        return True
+    except OSError:
+        return False
+
+
+def try_hardlink(source, destination):
+    try:
+        replace_via_temp(destination, lambda temp: os.link(source, temp))
+        return True
+    except OSError:
+        return False
+
+
+def try_reflink(source, destination, devices=None):
+    """
+    Clones `source` into `destination` sharing extents (copy-on-write). False if unsupported;
+    with `devices`, a filesystem that cannot clone is not tried again.
+    """
+    directory = os.path.dirname(destination)
+    if fcntl is None or (devices is not None and not devices.reflinks(directory)):
+        return False
+
+    def clone(temp):
+        with open(source, "rb") as src, open(temp, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+    try:
+        replace_via_temp(destination, clone)
+        return True
+    except OSError as e:
+        if devices is not None and e.errno in _NO_REFLINK:
+            devices.disable_reflinks(directory)
+        return False
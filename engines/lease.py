@@ -0,0 +1,82 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from database import FileDAO
+from helpers.metrics import counter
+
+DEFAULT_LEASE = 300.0  # seconds a claimed batch stays reserved without a heartbeat
+
+_CLAIMED = counter("odie_leases_claimed_total", "Files claimed from the shared work queue")
+_LOST = counter("odie_leases_lost_total", "Results dropped because the file's lease had expired and was reclaimed")
+
+
+def worker_id():
+    """A name for this worker that is unique across processes and hosts sharing the database."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class WorkLease:
+    """
+    Takes batches of files from the files table, used as a work queue shared by any
+    number of worker processes.
+
+    A batch is claimed atomically by writing this worker's name and an expiry into the
+    rows (FileDAO.claim_batch), so concurrent workers never get the same file. While the
+    lease is open, a heartbeat thread pushes the expiry of everything this worker holds
+    `duration` ahead every `duration` / 3 seconds. If a worker dies, its files become
+    claimable again once their leases expire; results it might still report for them
+    are ignored (`complete`). Files that end up in one of `statuses` again (a failed copy
+    retried with `failed` among the statuses) stay held, so a worker tries each file at
+    most once per lease. Closing the lease releases whatever it still holds.
+    """
+
+    def __init__(self, migration_id, statuses, batch_size=500, duration=DEFAULT_LEASE, owner=None):
+        self.migration_id = migration_id
+        self.statuses = tuple(statuses)
+        self.batch_size = batch_size
+        self.duration = duration
+        self.owner = owner or worker_id()
+        self.lost = 0
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def __enter__(self):
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._heartbeat.join()
+        self._heartbeat = None
+        FileDAO.release_leases(self.owner)
+
+    def _beat(self):
+        while not self._stop.wait(self.duration / 3):
+            try:
+                FileDAO.renew_leases(self.owner, time.time() + self.duration)
+            except sqlite3.Error:
+                pass  # the next beat retries; a lease only lapses after several missed beats
+
+    def batches(self):
+        """Yields claimed batches of file rows until no claimable file is left."""
+        while True:
+            batch = FileDAO.claim_batch(
+                self.migration_id, self.statuses, self.owner, time.time() + self.duration, self.batch_size
+            )
+            if not batch:
+                return
+            _CLAIMED.inc(len(batch))
+            yield batch
+
+    def complete(self, results):
+        """Records results (like FileDAO.update_many) for the files this worker still holds."""
+        results = list(results)
+        lost = len(results) - FileDAO.complete_leased(self.owner, results, self.statuses)
+        self.lost += lost
+        _LOST.inc(lost)
@@ -0,0 +1,165 @@
+import os
+import stat
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+
+from database import DirectoryDAO, FileDAO
+from engines.paths import project_directories, project_directories_by_name, target_path
+from helpers.metrics import ERRORS, counter
+
+# Methods that leave the source inode at new_root, so its metadata is already in place.
+_SAME_INODE_METHODS = ("rename", "hardlink")
+_XATTR = struct.Struct("<HI")  # name length, value length
+
+XATTRS_SUPPORTED = hasattr(os, "listxattr")
+# Namespaces an unprivileged owner may set; security.* (e.g. SELinux labels) and trusted.* need root.
+UNPRIVILEGED_XATTRS = ("user.", "system.posix_acl_")
+
+_APPLIED = counter("odie_metadata_applied_total", "Files and directories whose metadata was restored")
+_ERRORS = ERRORS.labels("metadata")
+
+
+def pack_xattrs(attributes):
+    """Packs {name: value} extended attributes (POSIX ACLs are system.posix_acl_*) into one blob, None if empty."""
+    if not attributes:
+        return None
+    parts = []
+    for name, value in sorted(attributes.items()):
+        encoded = name.encode("utf-8", "surrogateescape")
+        parts += [_XATTR.pack(len(encoded), len(value)), encoded, value]
+    return b"".join(parts)
+
+
+def unpack_xattrs(blob):
+    """Yields (name, value) pairs of a blob written by pack_xattrs."""
+    offset = 0
+    while offset < len(blob or b""):
+        name_length, value_length = _XATTR.unpack_from(blob, offset)
+        offset += _XATTR.size
+        name = blob[offset:offset + name_length].decode("utf-8", "surrogateescape")
+        offset += name_length
+        yield name, blob[offset:offset + value_length]
+        offset += value_length
+
+
+def read_xattrs(path):
+    """The packed extended attributes of `path` (not following symlinks); None if it has none or they are unsupported."""
+    if not XATTRS_SUPPORTED:
+        return None
+    try:
+        names = os.listxattr(path, follow_symlinks=False)
+        return pack_xattrs({name: os.getxattr(path, name, follow_symlinks=False) for name in names})
+    except OSError:
+        return None  # filesystems without xattr support, or attributes we may not read
+
+
+def capture(path, info, xattrs=True):
+    """Returns the (mode, uid, gid, xattrs) columns of a file or directory from its stat result."""
+    return stat.S_IMODE(info.st_mode), info.st_uid, info.st_gid, read_xattrs(path) if xattrs else None
+
+
+def _is_root():
+    return hasattr(os, "geteuid") and os.geteuid() == 0
+
+
+def apply_metadata(path, row, ownership, privileged=None):
+    """
+    Restores the captured metadata of one file or directory: owner, extended attributes
+    (including ACLs), then the mode (chown clears setuid bits, and ACLs are set before the
+    mode so the ACL mask ends up matching it), and finally atime and mtime (both to mtime).
+
+    Unless `privileged` (default: running as root), only user.* attributes and ACLs are
+    set. An attribute that cannot be set does not stop the rest from being restored.
+
+    Returns:
+        list[str]: The attributes that could not be set, with their errors.
+    """
+    if privileged is None:
+        privileged = _is_root()
+    if ownership and row["uid"] is not None:
+        os.chown(path, row["uid"], row["gid"], follow_symlinks=False)
+    failed = []
+    for name, value in unpack_xattrs(row["xattrs"]):
+        if not privileged and not name.startswith(UNPRIVILEGED_XATTRS):
+            continue
+        try:
+            os.setxattr(path, name, value, follow_symlinks=False)
+        except OSError as e:
+            failed.append(f"{name}: {e}")
+    if row["mode"] is not None:
+        os.chmod(path, row["mode"])
+    if row["mtime"] is not None:
+        os.utime(path, (row["mtime"], row["mtime"]))
+    return failed
+
+
+def replay_metadata(migration, workers=8, batch_size=500, ownership=None):
+    """
+    Applies the metadata captured by the scan to everything copied under new_root.
+
+    Copies only write contents; this separate stage restores mtimes, modes, ownership
+    and extended attributes (POSIX ACLs included) from the files and directories tables,
+    so the source is not read again. Rows are applied `batch_size` at a time by `workers`
+    threads: first every copied file, then the directories one depth at a time, deepest
+    first, so that nothing written afterwards bumps a parent's restored mtime. Replaying
+    is idempotent and can be re-run on its own, e.g. after a later copy round.
+
+    `ownership` defaults to whether the process runs as root, the only case chown works
+    for arbitrary owners.
+
+    Returns:
+        dict: Files and directories updated, directories skipped (no target or not
+              created under new_root), failures and their errors. Files and directories
+              restored except for some extended attributes count as updated; the
+              attributes are counted in `xattrs_failed` and listed in the errors.
+    """
+    privileged = _is_root()
+    if ownership is None:
+        ownership = privileged
+    migration_id = migration["id"]
+    project_dirs = project_directories(migration_id)
+    summary = {"files": 0, "directories": 0, "skipped": 0, "failed": 0, "xattrs_failed": 0, "errors": []}
+
+    def apply(item):
+        path, row = item
+        try:
+            return apply_metadata(path, row, ownership, privileged), None
+        except OSError as e:
+            return [], {"path": row["path"], "error": str(e)}
+
+    def run(items, kind):
+        for (path, row), (xattr_errors, error) in zip(items, pool.map(apply, items)):
+            if xattr_errors:
+                summary["xattrs_failed"] += len(xattr_errors)
+                summary["errors"].append({"path": row["path"], "error": "; ".join(xattr_errors)})
+            if error is None:
+                summary[kind] += 1
+                _APPLIED.inc()
+            else:
+                summary["failed"] += 1
+                summary["errors"].append(error)
+                _ERRORS.inc()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in FileDAO.iter_batches(migration_id, ("copied", "verified"), batch_size):
+            run([
+                (target_path(migration, project_dirs[row["project_id"]], row["path"]), row)
+                for row in batch if row["transfer_method"] not in _SAME_INODE_METHODS
+            ], "files")
+
+        projects = project_directories_by_name(migration_id)
+        root = migration["new_root"]
+        for batch in DirectoryDAO.iter_deepest_first(migration_id, batch_size):
+            for _, level in groupby(batch, key=lambda row: row["depth"]):
+                items = []
+                for row in level:
+                    top, _, rest = row["path"].partition("/")
+                    project_dir = projects.get(top.lower())
+                    path = os.path.join(root, project_dir, rest) if project_dir else None
+                    if path is None or not os.path.isdir(path):
+                        summary["skipped"] += 1
+                    else:
+                        items.append((path, row))
+                run(items, "directories")
+    return summary
@@ -0,0 +1,42 @@
+import os
+from pathlib import Path
+
+from database import ProjectDAO
+
+
+def project_directories(migration_id):
+    """Returns {project_id: "Site/Client/Project"} for the migration's projects."""
+    return ProjectDAO.get_target_directories(migration_id)
+
+
+def project_directories_by_name(migration_id):
+    """{lowercase project folder name: "Site/Client/Project"}, matching folders the way FileDAO.classify does."""
+    targets = project_directories(migration_id)
+    by_name = {}
+    for project in sorted(ProjectDAO.get_all_for_migration(migration_id), key=lambda project: project["id"]):
+        by_name.setdefault(project["name"].lower(), targets[project["id"]])
+    return by_name
+
+
+def target_relpath(project_dir, path):
+    """
+    Maps a file's path relative to old_root onto its path relative to new_root.
+
+    The first component of `path` is the project folder, which is replaced by the
+    project's Site/Client/Project directory.
+    """
+    _, _, rest = path.partition("/")
+    return f"{project_dir}/{rest}"
+
+
+def source_path(migration, path):
+    return Path(migration["old_root"]) / Path(*path.split("/"))
+
+
+def target_path(migration, project_dir, path):
+    return Path(migration["new_root"]) / Path(*target_relpath(project_dir, path).split("/"))
+
+
+def to_relpath(root, full_path):
+    """Converts an absolute path below `root` into the '/'-separated form stored in the files table."""
+    return os.path.relpath(full_path, root).replace(os.sep, "/")
@@ -0,0 +1,147 @@
+import functools
+import re
+import unicodedata
+
+from database import FileDAO, PathConflictDAO
+from engines.paths import project_directories, target_relpath
+
+# Win32 MAX_PATH and the NTFS component limit, both counted in UTF-16 code units.
+DEFAULT_MAX_PATH = 260
+DEFAULT_MAX_NAME = 255
+
+CONFLICT_KINDS = (
+    "collision",      # two files map to exactly the same target path
+    "case",           # targets differ only by letter case
+    "normalization",  # targets differ only by Unicode normalization (e.g. NFC vs NFD accents)
+    "directory",      # a file's target is also a directory on another file's target path
+    "path_length",    # the full target path exceeds the path limit
+    "name_length",    # a component of the target path exceeds the name limit
+    "invalid_name",   # a component cannot be created on NTFS/SMB
+)
+
+_INVALID_CHARS = re.compile(r'[<>:"\\|?*\x00-\x1f]')
+_RESERVED_NAMES = {"con", "prn", "aux", "nul"} | {f"{d}{i}" for d in ("com", "lpt") for i in range(1, 10)}
+
+
+def target_key(path):
+    """The form of a target path NTFS and SMB compare names by: NFC normalized and lowercase."""
+    return unicodedata.normalize("NFC", path).lower()
+
+
+def _utf16_length(text):
+    return len(text.encode("utf-16-le")) // 2
+
+
+@functools.lru_cache(maxsize=65536)
+def name_problem(name, max_name=DEFAULT_MAX_NAME):
+    """Returns (kind, detail) if `name` cannot be used as a file or directory name on NTFS/SMB, else None."""
+    length = _utf16_length(name)
+    if length > max_name:
+        return "name_length", f"'{name[:40]}...' is {length} characters (limit {max_name})"
+    match = _INVALID_CHARS.search(name)
+    if match:
+        return "invalid_name", f"'{name}' contains {match.group()!r}"
+    if name.endswith((".", " ")):
+        return "invalid_name", f"'{name}' ends with a dot or space"
+    if name.partition(".")[0].lower() in _RESERVED_NAMES:
+        return "invalid_name", f"'{name}' is a reserved device name"
+    return None
+
+
+def _path_problems(root_length, target, max_path, max_name, skip=0):
+    """Yields (kind, detail) for the length and naming problems of one target path, ignoring its first `skip` names."""
+    length = root_length + 1 + _utf16_length(target)
+    if length > max_path:
+        yield "path_length", f"{length} characters (limit {max_path})"
+    for name in target.split("/")[skip:]:
+        problem = name_problem(name, max_name)
+        if problem:
+            yield problem
+
+
+def _collision_kind(path, other):
+    if path == other:
+        return "collision"
+    if unicodedata.normalize("NFC", path) == unicodedata.normalize("NFC", other):
+        return "normalization"
+    return "case"
+
+
+def plan_targets(migration, batch_size=500, max_path=DEFAULT_MAX_PATH, max_name=DEFAULT_MAX_NAME):
+    """
+    Computes the target path of every classified file and records the ones that cannot be
+    copied as planned in the path_conflicts table, replacing the previous plan.
+
+    One streaming pass over the inventory stores each file's target path and its
+    normalized key and checks path lengths and names. Files sharing a key (same target,
+    or only differing by case or Unicode normalization) and files whose target is a
+    directory of another target are then found from the target_key index, so memory use
+    does not grow with the inventory.
+
+    Path lengths are measured from new_root as mounted here; pass the limit of the
+    destination (e.g. a larger `max_path` for shares with long path support).
+
+    Returns:
+        dict: Files planned, files left without a target (unclassified) and conflicts per kind.
+    """
+    migration_id = migration["id"]
+    project_dirs = project_directories(migration_id)
+    summary = {"planned": 0, "unplanned": 0, "conflicts": 0, "kinds": {}}
+
+    # A bad Site/Client/Project name is reported once, on the project's first file.
+    project_problems = {
+        project_id: [problem for name in project_dir.split("/") if (problem := name_problem(name, max_name))]
+        for project_id, project_dir in project_dirs.items()
+    }
+    root_length = _utf16_length(migration["new_root"])
+    project_depth = {project_id: project_dir.count("/") + 1 for project_id, project_dir in project_dirs.items()}
+
+    PathConflictDAO.delete_for_migration(migration_id)
+    for batch in FileDAO.iter_batches(migration_id, None, batch_size, classified_only=False):
+        targets, conflicts = [], []
+        for row in batch:
+            project_dir = project_dirs.get(row["project_id"])
+            if project_dir is None:
+                targets.append({"id": row["id"], "target_path": None, "target_key": None})
+                summary["unplanned"] += 1
+                continue
+            target = target_relpath(project_dir, row["path"])
+            targets.append({"id": row["id"], "target_path": target, "target_key": target_key(target)})
+            summary["planned"] += 1
+            problems = list(_path_problems(root_length, target, max_path, max_name, project_depth[row["project_id"]]))
+            problems += project_problems.pop(row["project_id"], [])
+            conflicts.extend(
+                {"file_id": row["id"], "kind": kind, "other_file_id": None, "target_path": target, "detail": detail}
+                for kind, detail in problems
+            )
+        FileDAO.update_many(targets)
+        PathConflictDAO.add_many(conflicts, migration_id=migration_id)
+
+    conflicts = []
+    for group in FileDAO.iter_target_groups(migration_id, batch_size):
+        for i, row in enumerate(group[1:], start=1):
+            # Report the closest clash: an identical target before one differing in normalization or case.
+            kind, other = min(
+                ((_collision_kind(row["target_path"], earlier["target_path"]), earlier) for earlier in group[:i]),
+                key=lambda clash: ("collision", "normalization", "case").index(clash[0]),
+            )
+            conflicts.append({
+                "file_id": row["id"], "kind": kind, "other_file_id": other["id"], "target_path": row["target_path"],
+                "detail": f"same target as {other['path']}",
+            })
+        if len(conflicts) >= batch_size:
+            PathConflictDAO.add_many(conflicts, migration_id=migration_id)
+            conflicts = []
+    for row, other_file_id in FileDAO.iter_target_directory_clashes(migration_id, batch_size):
+        conflicts.append({
+            "file_id": row["id"], "kind": "directory", "other_file_id": other_file_id,
+            "target_path": row["target_path"], "detail": "another file's target is inside this path",
+        })
+        if len(conflicts) >= batch_size:
+            PathConflictDAO.add_many(conflicts, migration_id=migration_id)
+            conflicts = []
+    PathConflictDAO.add_many(conflicts, migration_id=migration_id)
+
+    summary["kinds"] = PathConflictDAO.count_by_kind(migration_id)
+    summary["conflicts"] = sum(summary["kinds"].values())
+    return summary
@@ -0,0 +1,175 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DirectoryDAO, FileDAO, PreflightFailureDAO, ProjectDAO
+from engines.paths import project_directories, project_directories_by_name
+
+# Share of each target filesystem's space and inodes that must remain free after the copy.
+DEFAULT_HEADROOM = 0.05
+
+FAILURE_KINDS = (
+    "missing",     # old_root or new_root does not exist
+    "space",       # a target filesystem has too little free space for the bytes still to copy
+    "inodes",      # a target filesystem has too few free inodes for the files and directories to create
+    "unreadable",  # a source directory cannot be listed
+    "unwritable",  # a target directory, or the nearest existing parent of a planned one, cannot be written
+)
+
+
+def _existing_ancestor(path, root):
+    """`path` or its nearest existing parent, not above `root`."""
+    while path != root and not os.path.isdir(path):
+        path = os.path.dirname(path)
+    return path
+
+
+def check_readable(path):
+    """None if the directory can be opened and listed, else the error."""
+    try:
+        with os.scandir(path) as entries:
+            next(entries, None)
+    except OSError as e:
+        return str(e)
+    return None
+
+
+def check_writable(path):
+    """None if a file can be created (and removed again) in the directory, else the error."""
+    try:
+        fd, probe = tempfile.mkstemp(prefix=".odie-preflight-", dir=path)
+        os.close(fd)
+        os.unlink(probe)
+    except OSError as e:
+        return str(e)
+    return None
+
+
+def _capacity(migration, directories_per_target, headroom):
+    """Yields the required and free space and inodes of every target filesystem, as summary entries."""
+    migration_id = migration["id"]
+    new_root = migration["new_root"]
+    source_device = os.stat(migration["old_root"]).st_dev
+    in_place = migration["transfer_mode"] if migration["transfer_mode"] in ("move", "link") else None
+    remaining = FileDAO.remaining_by_project(migration_id)
+    targets = project_directories(migration_id)
+    filesystems = {}
+
+    def filesystem(project_dir):
+        anchor = _existing_ancestor(os.path.join(new_root, *project_dir.split("/")), new_root)
+        device = os.stat(anchor).st_dev
+        return device, filesystems.setdefault(device, {"path": anchor, "required_bytes": 0, "required_inodes": 0})
+
+    for project in ProjectDAO.get_all_for_migration(migration_id):
+        device, entry = filesystem(targets[project["id"]])
+        files, size = remaining.get(project["id"], (0, 0))
+        if in_place and device == source_device:
+            size = files = 0  # renamed or hardlinked: no data is written and the source inode is reused
+        entry["required_bytes"] += size
+        entry["required_inodes"] += files
+    for project_dir, count in directories_per_target.items():
+        filesystem(project_dir)[1]["required_inodes"] += count
+
+    for entry in filesystems.values():
+        stats = os.statvfs(entry["path"])
+        entry["free_bytes"] = stats.f_bavail * stats.f_frsize
+        entry["spare_bytes"] = int(stats.f_blocks * stats.f_frsize * headroom)
+        # Filesystems without a fixed inode table (e.g. btrfs) report no inodes at all.
+        entry["free_inodes"] = stats.f_favail if stats.f_files else None
+        entry["spare_inodes"] = int(stats.f_files * headroom)
+        yield entry
+
+
+def run_preflight(migration, workers=8, batch_size=500, headroom=DEFAULT_HEADROOM):
+    """
+    Checks, before any data moves, that the migration can run to the end. The failures
+    replace the previous run's in the preflight_failures table, for paging in the UI.
+
+    - Capacity: for every filesystem the project targets live on, the bytes still to copy
+      and the inodes for those files and their directories are compared with statvfs free
+      space and free inodes, keeping `headroom` of the filesystem spare. Moves and
+      hardlinks within one filesystem need neither space nor inodes.
+    - Source readability: every scanned directory of a classified project folder is opened
+      and listed.
+    - Target writability: a probe file is created in every existing target directory and,
+      for directories not created yet, in their nearest existing parent.
+
+    The directory checks stream the directories table `batch_size` rows at a time through
+    a pool of `workers` threads, so they cost one round trip per directory in parallel
+    rather than a crawl of the tree.
+
+    Returns:
+        dict: Directories checked, the capacity of each target filesystem, and the number
+              of failures per kind.
+    """
+    if not 0 <= headroom < 1:
+        raise ValueError(f"Headroom must be a fraction between 0 and 1, got {headroom}")
+    migration_id = migration["id"]
+    old_root, new_root = migration["old_root"], migration["new_root"]
+    checked_at = time.time()
+    PreflightFailureDAO.delete_for_migration(migration_id)
+    summary = {"source_directories": 0, "target_directories": 0, "filesystems": [], "failed": 0}
+    failures = []
+
+    def fail(kind, path, detail):
+        failures.append({"kind": kind, "path": path, "detail": detail, "checked_at": checked_at})
+        summary["failed"] += 1
+        if len(failures) >= batch_size:
+            PreflightFailureDAO.add_many(failures, migration_id=migration_id)
+            failures.clear()
+
+    for key in ("old_root", "new_root"):
+        if not os.path.isdir(migration[key]):
+            fail("missing", migration[key], f"{key} does not exist")
+
+    if not summary["failed"]:
+        by_name = project_directories_by_name(migration_id)
+        directories_per_target = dict.fromkeys(by_name.values(), 0)
+        probed = set()
+
+        def check(pool, kind, paths, function):
+            for path, error in zip(paths, pool.map(function, paths)):
+                if error is not None:
+                    fail(kind, path, error)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            check(pool, "unreadable", [old_root], check_readable)
+            for batch in DirectoryDAO.iter_deepest_first(migration_id, batch_size):
+                sources, targets = [], []
+                for row in batch:
+                    top, _, rest = row["path"].partition("/")
+                    project_dir = by_name.get(top.lower())
+                    if project_dir is None:
+                        continue  # not part of any project, so never copied
+                    directories_per_target[project_dir] += 1
+                    sources.append(os.path.join(old_root, *row["path"].split("/")))
+                    target = os.path.join(new_root, *project_dir.split("/"), *filter(None, rest.split("/")))
+                    target = _existing_ancestor(target, new_root)
+                    if target not in probed:
+                        probed.add(target)
+                        targets.append(target)
+                check(pool, "unreadable", sources, check_readable)
+                check(pool, "unwritable", targets, check_writable)
+                summary["source_directories"] += len(sources)
+                summary["target_directories"] += len(targets)
+            roots = {_existing_ancestor(os.path.join(new_root, *d.split("/")), new_root) for d in by_name.values()}
+            targets = sorted((roots | {new_root}) - probed)
+            check(pool, "unwritable", targets, check_writable)
+            summary["target_directories"] += len(targets)
+
+        for entry in _capacity(migration, directories_per_target, headroom):
+            summary["filesystems"].append(entry)
+            available = entry["free_bytes"] - entry["spare_bytes"]
+            if entry["required_bytes"] > available:
+                fail("space", entry["path"], f"{entry['required_bytes']} bytes to copy, {max(available, 0)} "
+                                             f"available ({entry['free_bytes']} free, {headroom:.0%} kept spare)")
+            if entry["free_inodes"] is not None:
+                available = entry["free_inodes"] - entry["spare_inodes"]
+                if entry["required_inodes"] > available:
+                    fail("inodes", entry["path"], f"{entry['required_inodes']} inodes needed, {max(available, 0)} "
+                                                  f"available ({entry['free_inodes']} free, {headroom:.0%} kept spare)")
+
+    PreflightFailureDAO.add_many(failures, migration_id=migration_id)
+    summary["kinds"] = PreflightFailureDAO.count_by_kind(migration_id)
+    return summary
@@ -0,0 +1,172 @@
+import math
+import time
+from collections import deque
+from datetime import date, datetime
+from itertools import chain, groupby
+
+from database import FileDAO, ProjectDAO, TransferSampleDAO
+from helpers.transfer_options import TRANSFER_ORDERS
+
+RATE_WINDOW = 15 * 60.0  # seconds of samples used for rate estimates
+RATE_HALF_LIFE = 5 * 60.0  # a sample this old counts half as much as a fresh one
+SAMPLE_RETENTION = 24 * 3600.0  # older samples are dropped when new ones are recorded
+
+
+class TransferQueue:
+    """
+    Orders pending files for transfer.
+
+    Projects are taken by priority (highest first). Within one priority, every site
+    works through its projects in cutover-date order, and batches alternate between
+    sites so that each site's throttle always has work. Within a project files follow
+    `order` (see TRANSFER_ORDERS). Rows are fetched per project and status with keyset
+    queries, so nothing is sorted at the start and memory holds about one batch per site.
+
+    Priorities are read when the queue starts; a job started later picks up changes.
+    """
+
+    def __init__(self, migration_id, statuses=("pending",), order="priority", batch_size=500):
+        if order not in TRANSFER_ORDERS:
+            raise ValueError(f"Unknown transfer order: {order}. Expected one of: {', '.join(TRANSFER_ORDERS)}")
+        self.migration_id = migration_id
+        self.statuses = tuple(statuses)
+        self.order = order
+        self.batch_size = batch_size
+
+    def _project_rows(self, project_id):
+        return chain.from_iterable(
+            FileDAO.iter_project_files(project_id, status, self.order, self.batch_size) for status in self.statuses
+        )
+
+    def batches(self):
+        """Yields lists of at most `batch_size` file rows in transfer order."""
+        projects = ProjectDAO.get_transfer_order(self.migration_id)
+        for _, tier in groupby(projects, key=lambda project: project["priority"]):
+            sites = {}
+            for project in tier:
+                sites.setdefault(project["site_id"], []).append(project["id"])
+            streams = deque(chain.from_iterable(self._project_rows(pid) for pid in ids) for ids in sites.values())
+            batch = []
+            while streams:
+                stream = streams.popleft()
+                row = next(stream, None)
+                if row is None:
+                    continue
+                batch.append(row)
+                streams.append(stream)
+                if len(batch) == self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+
+def record_samples(migration_id, project_sites, rows, results, started, finished):
+    """Records the bytes each project copied in one batch (from `started` to `finished`, epoch seconds)."""
+    totals = {}
+    for row, result in zip(rows, results):
+        if result["status"] == "copied":
+            files, size = totals.get(row["project_id"], (0, 0))
+            totals[row["project_id"]] = (files + 1, size + (row["size"] or 0))
+    TransferSampleDAO.add_many([
+        {"site_id": project_sites[project_id], "project_id": project_id, "recorded_at": finished,
+         "elapsed": finished - started, "files": files, "bytes": size}
+        for project_id, (files, size) in totals.items()
+    ], migration_id=migration_id)
+    TransferSampleDAO.delete_before(migration_id, finished - SAMPLE_RETENTION)
+
+
+def decayed_rate(samples, now, half_life=RATE_HALF_LIFE):
+    """
+    Exponentially weighted moving average of bytes per second over `samples`.
+
+    Every sample is weighted by its age; the weighted bytes are divided by the weighted
+    time since the first sample started, so idle gaps (outside transfer windows, between
+    jobs) lower the estimate the same way they delay the work. None without samples.
+    """
+    if not samples:
+        return None
+    decay = math.log(2) / half_life
+    # A batch's bytes were copied over its whole duration; weigh them at its midpoint.
+    weighted_bytes = sum(s["bytes"] * math.exp(-decay * (now - s["recorded_at"] + s["elapsed"] / 2)) for s in samples)
+    start = min(s["recorded_at"] - s["elapsed"] for s in samples)
+    weighted_time = (1 - math.exp(-decay * (now - start))) / decay
+    return weighted_bytes / weighted_time if weighted_time > 0 else None
+
+
+def _eta(remaining_bytes, rate, now):
+    if not remaining_bytes:
+        return now
+    if not rate:
+        return None
+    eta = now + remaining_bytes / rate
+    try:
+        datetime.fromtimestamp(eta)
+    except (OverflowError, OSError, ValueError):
+        return None  # a rate this low gives no date worth showing (or representable)
+    return eta
+
+
+def _timestamp(epoch):
+    return datetime.fromtimestamp(epoch).isoformat(timespec="seconds") if epoch is not None else None
+
+
+def forecast(migration, window=RATE_WINDOW, half_life=RATE_HALF_LIFE, now=None):
+    """
+    Throughput, remaining work and ETA per project, site and for the whole migration.
+
+    Rates are moving averages over the transfer samples of the last `window` seconds.
+    Sites transfer in parallel and each works through its projects in queue order, so a
+    project's ETA is when its site will have copied the bytes remaining in it and in the
+    projects queued before it. Projects whose ETA falls after their cutover date are late.
+
+    Returns:
+        dict: Migration rate (bytes/s), remaining files and bytes and ETA, plus per-site
+              and per-project breakdowns. ETAs are None until a rate is known, and while
+              it is too low to give a representable date.
+    """
+    now = time.time() if now is None else now
+    remaining = FileDAO.remaining_by_project(migration["id"])
+    samples = TransferSampleDAO.get_since(migration["id"], now - window)
+
+    site_rates, project_rates, queued, projects, sites = {}, {}, {}, [], {}
+    for site_id in {s["site_id"] for s in samples}:
+        site_rates[site_id] = decayed_rate([s for s in samples if s["site_id"] == site_id], now, half_life)
+    for project_id in {s["project_id"] for s in samples}:
+        project_rates[project_id] = decayed_rate([s for s in samples if s["project_id"] == project_id], now, half_life)
+
+    for project in ProjectDAO.get_transfer_order(migration["id"]):
+        site_id = project["site_id"]
+        files, size = remaining.get(project["id"], (0, 0))
+        queued[site_id] = queued.get(site_id, 0) + size
+        eta = _eta(queued[site_id], site_rates.get(site_id), now) if files else None
+        cutover = date.fromisoformat(project["cutover_date"]) if project["cutover_date"] else None
+        projects.append({
+            "id": project["id"],
+            "name": project["name"],
+            "priority": project["priority"],
+            "cutover_date": project["cutover_date"] or None,
+            "remaining_files": files,
+            "remaining_bytes": size,
+            "rate": project_rates.get(project["id"]) or 0.0,
+            "eta": _timestamp(eta),
+            "late": bool(files and cutover and eta is not None and datetime.fromtimestamp(eta).date() > cutover),
+        })
+        site = sites.setdefault(site_id, {"id": site_id, "remaining_files": 0, "remaining_bytes": 0})
+        site["remaining_files"] += files
+        site["remaining_bytes"] += size
+
+    eta = now  # the migration is done when its slowest site is
+    for site_id, site in sites.items():
+        site["rate"] = site_rates.get(site_id) or 0.0
+        site_eta = _eta(site["remaining_bytes"], site_rates.get(site_id), now)
+        site["eta"] = _timestamp(site_eta)
+        eta = max(eta, site_eta) if eta is not None and site_eta is not None else None
+    return {
+        "rate": sum(rate or 0.0 for rate in site_rates.values()),
+        "remaining_files": sum(site["remaining_files"] for site in sites.values()),
+        "remaining_bytes": sum(site["remaining_bytes"] for site in sites.values()),
+        "eta": _timestamp(eta),
+        "sites": list(sites.values()),
+        "projects": projects,
+    }
@@ -0,0 +1,138 @@
+import errno
+import os
+import time
+from concurrent.futures import as_completed, wait
+
+from database import FileRangeDAO
+from helpers.metrics import COPIED_BYTES
+
+RANGE_MIN_SIZE = 1024 * 1024 * 1024  # smaller files are copied whole by one worker
+RANGE_SIZE = 256 * 1024 * 1024
+CHUNK_SIZE = 8 * 1024 * 1024  # bytes per copy_file_range/pread call, and per throttle charge
+
+_UNSUPPORTED = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP)
+_copy_file_range = getattr(os, "copy_file_range", None)  # dropped after the first "not supported" error
+
+
+def data_extents(fd, start, end):
+    """
+    Yields (offset, length) of the parts of [start, end) that hold data, skipping holes
+    with SEEK_DATA/SEEK_HOLE. Without hole support the whole span is one extent.
+    Moves the file offset of `fd`.
+    """
+    if not hasattr(os, "SEEK_DATA"):
+        if end > start:
+            yield start, end - start
+        return
+    offset = start
+    while offset < end:
+        try:
+            data = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                return  # only a hole is left
+            if e.errno in _UNSUPPORTED:
+                yield offset, end - offset
+                return
+            raise
+        if data >= end:
+            return
+        hole = min(os.lseek(fd, data, os.SEEK_HOLE), end)
+        yield data, hole - data
+        offset = hole
+
+
+def plan_ranges(fd, size, range_size=RANGE_SIZE):
+    """(start, length) of every `range_size` slice of the file that holds any data."""
+    return [
+        (start, min(range_size, size - start))
+        for start in range(0, size, range_size)
+        if next(data_extents(fd, start, min(start + range_size, size)), None) is not None
+    ]
+
+
+def _copy_chunk(src, dst, offset, count):
+    """Copies up to `count` bytes at `offset` in the kernel if possible. Returns the bytes copied."""
+    global _copy_file_range
+    if _copy_file_range is not None:
+        try:
+            return _copy_file_range(src, dst, count, offset, offset)
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            _copy_file_range = None  # e.g. across filesystems on older kernels; use pread/pwrite from now on
+    data = os.pread(src, count, offset)
+    written = 0
+    while written < len(data):
+        written += os.pwrite(dst, data[written:], offset + written)
+    return len(data)
+
+
+def copy_range(source, partial, start, length, throttle):
+    """Copies the data extents of one range from `source` to the same offsets of `partial`."""
+    src = os.open(source, os.O_RDONLY)
+    try:
+        dst = os.open(partial, os.O_WRONLY)
+        try:
+            with throttle.slots:
+                for offset, extent in list(data_extents(src, start, start + length)):
+                    end = offset + extent
+                    while offset < end:
+                        began = time.monotonic()
+                        count = min(CHUNK_SIZE, end - offset)
+                        throttled = throttle.io(count)
+                        copied = _copy_chunk(src, dst, offset, count)
+                        if not copied:
+                            raise OSError(errno.EIO, f"{source} shrank while being copied")
+                        COPIED_BYTES.inc(copied)
+                        throttle.record(copied, time.monotonic() - began, throttled)
+                        offset += copied
+        finally:
+            os.close(dst)
+    finally:
+        os.close(src)
+
+
+def copy_ranges(file_id, source, destination, throttle, pool, range_size=None):
+    """
+    Copies one large file as concurrent ranges on `pool`, resuming an interrupted copy.
+
+    The file is cut into `range_size` slices; slices that are all hole are skipped and
+    within a slice only the data extents are copied, so sparse files stay sparse. The
+    ranges are written with copy_file_range (pread/pwrite where unsupported) into
+    `destination`.odie-part, which has the source's size from the start, and every
+    finished range is recorded in file_ranges from the calling thread. A later call for
+    the same, unchanged source copies only the ranges not recorded as done; a changed
+    source, or a lost partial file, starts over. The partial file replaces `destination`
+    once every range is done.
+    """
+    partial = f"{destination}.odie-part"
+    info = os.stat(source)
+    ranges = FileRangeDAO.get_for_file(file_id)
+    if not ranges or not os.path.exists(partial) or any(
+        (row["source_size"], row["source_mtime_ns"]) != (info.st_size, info.st_mtime_ns) for row in ranges[:1]
+    ):
+        fd = os.open(source, os.O_RDONLY)
+        try:
+            planned = plan_ranges(fd, info.st_size, range_size or RANGE_SIZE)
+        finally:
+            os.close(fd)
+        with open(partial, "wb") as f:
+            f.truncate(info.st_size)  # one hole the size of the file; ranges fill in the data
+        FileRangeDAO.replace_for_file(file_id, info.st_size, info.st_mtime_ns, planned)
+        ranges = FileRangeDAO.get_for_file(file_id)
+
+    futures = {
+        pool.submit(copy_range, source, partial, row["start"], row["length"], throttle): row["start"]
+        for row in ranges if not row["done"]
+    }
+    try:
+        for future in as_completed(futures):
+            future.result()
+            FileRangeDAO.mark_done(file_id, futures[future])
+    finally:
+        for future in futures:
+            future.cancel()
+        wait(futures)  # a failed range must not leave others writing after we return
+    os.replace(partial, destination)
+    FileRangeDAO.delete_for_file(file_id)
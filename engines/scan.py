@@ -0,0 +1,104 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from database import DirectoryDAO, FileDAO, MigrationDAO
+from engines.metadata import capture
+from engines.snapshot import take_snapshot
+from helpers.metrics import ERRORS, QUEUE_DEPTH, counter
+
+_FILES = counter("odie_scan_files_total", "Files inventoried by scans")
+_BYTES = counter("odie_scan_bytes_total", "Bytes of the files inventoried by scans")
+_DIRECTORIES = counter("odie_scan_directories_total", "Directories listed by scans")
+_ERRORS = ERRORS.labels("scan")
+_PENDING = QUEUE_DEPTH.labels("scan")
+
+
+def list_directory(root, relpath, xattrs=True):
+    """
+    Lists one directory. Returns (file rows, sub-directory rows, errors); sub-directory
+    rows are (relpath, mtime, mode, uid, gid, xattrs), the columns of the directories table.
+    """
+    files, subdirs, errors = [], [], []
+    directory = os.path.join(root, relpath) if relpath else root
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                entry_relpath = f"{relpath}/{entry.name}" if relpath else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        subdirs.append((entry_relpath, stat.st_mtime, *capture(entry.path, stat, xattrs)))
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        files.append((entry.name, entry_relpath, stat.st_size, stat.st_mtime,
+                                      *capture(entry.path, stat, xattrs)))
+                except OSError as e:
+                    errors.append({"path": entry_relpath, "error": str(e)})
+    except OSError as e:
+        errors.append({"path": relpath or ".", "error": str(e)})
+    return files, subdirs, errors
+
+
+def scan_migration(migration, workers=4, batch_size=1000, snapshot=True, xattrs=True):
+    """
+    Inventories every regular file under the migration's old_root into the files table,
+    and every directory into the directories table.
+
+    Directories are listed concurrently by `workers` threads (listing is I/O bound, so
+    this pays off on network shares), while file and directory rows are written from the
+    calling thread in transactions of `batch_size`. Files that disappeared since the
+    previous scan are removed, unless some directory could not be read. A complete scan is kept as an
+    immutable snapshot generation (see engines.snapshot) unless `snapshot` is False.
+
+    Modes, owners and, unless `xattrs` is False, extended attributes are captured along
+    with mtimes, for engines.metadata to replay on the copies.
+
+    Returns:
+        dict: Summary with files/bytes seen, removed rows, unreadable paths and the
+              snapshot generation written (None if the scan was incomplete).
+    """
+    root = migration["old_root"]
+    scanned_at = time.time()
+    summary = {"files": 0, "bytes": 0, "directories": 0, "removed": 0, "errors": []}
+    rows, directories = [], []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(list_directory, root, "", xattrs)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs, errors = future.result()
+                summary["directories"] += 1
+                summary["errors"].extend(errors)
+                pending.update(pool.submit(list_directory, root, subdir[0], xattrs) for subdir in subdirs)
+                _DIRECTORIES.inc()
+                _FILES.inc(len(files))
+                _BYTES.inc(sum(row[2] for row in files))
+                _ERRORS.inc(len(errors))
+                directories.extend(subdirs)
+                if len(directories) >= batch_size:
+                    DirectoryDAO.upsert_scanned(migration["id"], directories, scanned_at)
+                    directories = []
+                rows.extend(files)
+                if len(rows) >= batch_size:
+                    FileDAO.upsert_scanned(migration["id"], rows, scanned_at)
+                    summary["files"] += len(rows)
+                    summary["bytes"] += sum(row[2] for row in rows)
+                    rows = []
+            _PENDING.set(len(pending))
+
+    if rows:
+        FileDAO.upsert_scanned(migration["id"], rows, scanned_at)
+        summary["files"] += len(rows)
+        summary["bytes"] += sum(row[2] for row in rows)
+    DirectoryDAO.upsert_scanned(migration["id"], directories, scanned_at)
+
+    if not summary["errors"]:
+        summary["removed"] = FileDAO.delete_unseen(migration["id"], scanned_at)
+        DirectoryDAO.delete_unseen(migration["id"], scanned_at)
+    MigrationDAO.bump_scan_generation(migration["id"])
+    summary["snapshot"] = None
+    if snapshot and not summary["errors"]:
+        summary["snapshot"] = take_snapshot(migration)["generation"]
+    return summary
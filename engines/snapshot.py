@@ -0,0 +1,352 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from pathlib import Path
+
+from database import DatabaseManager, FileDAO, MigrationDAO
+
+SNAPSHOT_ROOT = None  # defaults to a snapshots directory next to the database
+LABELS_FILE = "labels.json"
+
+MAGIC = b"ODIESNAP"
+VERSION = 1
+_TRAILER = struct.Struct("<Q8s")  # footer offset, magic
+
+# Blocks end after a row whose path hash has the low bits below clear, so boundaries depend
+# only on the paths around them: after files are added or removed, the blocks of two
+# generations line up again at the next boundary and identical blocks are skipped unread.
+BLOCK_MASK = 4096 - 1  # about 4096 rows per block
+MAX_BLOCK_ROWS = 65536
+COMPRESSION_LEVEL = 6
+DIGEST_SIZE = 32  # sha256, as stored in files.digest
+_NO_DIGEST = bytes(DIGEST_SIZE)
+
+CHANGE_KINDS = ("added", "removed", "changed")
+
+
+def snapshot_directory(migration):
+    """Directory holding the migration's snapshot files, one per generation."""
+    root = Path(SNAPSHOT_ROOT) if SNAPSHOT_ROOT else Path(DatabaseManager().db_path).parent / "snapshots"
+    return root / str(migration["id"])
+
+
+def _column(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _column_bytes(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _encode_block(rows):
+    """Lays out one block column by column: sizes, mtimes, digests, path lengths, paths."""
+    paths = [row[0].encode("utf-8", "surrogateescape") for row in rows]
+    return b"".join((
+        _column_bytes(array("q", (row[1] for row in rows))),
+        _column_bytes(array("d", (row[2] for row in rows))),
+        b"".join(bytes.fromhex(row[3]) if row[3] else _NO_DIGEST for row in rows),
+        _column_bytes(array("I", map(len, paths))),
+        *paths,
+    ))
+
+
+def _decode_block(payload, count):
+    view = memoryview(payload)
+    sizes = _column("q", view[:8 * count])
+    mtimes = _column("d", view[8 * count:16 * count])
+    digests_at = 16 * count
+    lengths = _column("I", view[digests_at + DIGEST_SIZE * count:(20 + DIGEST_SIZE) * count])
+    rows, offset = [], (20 + DIGEST_SIZE) * count
+    for i, length in enumerate(lengths):
+        digest = payload[digests_at + DIGEST_SIZE * i:digests_at + DIGEST_SIZE * (i + 1)]
+        path = payload[offset:offset + length].decode("utf-8", "surrogateescape")
+        rows.append((path, sizes[i], mtimes[i], digest.hex() if digest != _NO_DIGEST else None))
+        offset += length
+    return rows
+
+
+class Snapshot:
+    """
+    One immutable generation of a migration's inventory, read through mmap.
+
+    The file holds (path, size, mtime, digest) for every file, sorted by path, in
+    zlib-compressed blocks laid out column by column, followed by a JSON footer with
+    the generation's metadata and each block's offset, row count and content digest.
+    Only the block being read is decompressed.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        footer_at, magic = _TRAILER.unpack(self._map[-_TRAILER.size:])
+        if self._map[:len(MAGIC)] != MAGIC or magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"Not a snapshot file: {self.path}")
+        self.meta = json.loads(self._map[footer_at:-_TRAILER.size])
+        self.blocks = [tuple(block) for block in self.meta.pop("blocks")]  # (offset, length, rows, digest)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._map.close()
+
+    @property
+    def generation(self):
+        return self.meta["generation"]
+
+    def read_block(self, index):
+        """Returns the rows of one block as (path, size, mtime, digest) tuples."""
+        offset, length, count, _ = self.blocks[index]
+        return _decode_block(zlib.decompress(self._map[offset:offset + length]), count)
+
+    def __iter__(self):
+        for index in range(len(self.blocks)):
+            yield from self.read_block(index)
+
+
+def _write_snapshot(target, rows, meta):
+    """Writes `rows` (sorted by path) to `target` through a temporary file and makes it read-only."""
+    temp = target.with_name(f".{target.name}.tmp")
+    blocks, block, total = [], [], 0
+    with open(temp, "wb") as f:
+        f.write(MAGIC)
+
+        def flush():
+            payload = _encode_block(block)
+            data = zlib.compress(payload, COMPRESSION_LEVEL)
+            blocks.append((f.tell(), len(data), len(block), hashlib.blake2b(payload, digest_size=16).hexdigest()))
+            f.write(data)
+
+        for row in rows:
+            block.append(row)
+            total += row[1]
+            boundary = zlib.crc32(row[0].encode("utf-8", "surrogateescape")) & BLOCK_MASK == 0
+            if boundary or len(block) == MAX_BLOCK_ROWS:
+                flush()
+                block = []
+        if block:
+            flush()
+        footer_at = f.tell()
+        meta = {**meta, "files": sum(b[2] for b in blocks), "bytes": total, "blocks": blocks}
+        f.write(json.dumps(meta).encode())
+        f.write(_TRAILER.pack(footer_at, MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(temp, 0o444)
+    os.replace(temp, target)
+
+
+def take_snapshot(migration, label=None, chunk_rows=100000):
+    """
+    Writes the migration's current inventory as the snapshot of its scan generation.
+
+    Rows are streamed from the files table in path order and written block by block, so
+    memory use does not grow with the inventory. A generation is written once; taking a
+    snapshot again before the inventory changes reuses it. `label` (e.g. "signoff")
+    names the generation for later diffs.
+
+    Returns:
+        dict: The snapshot's metadata (generation, labels, created_at, files, bytes, disk_bytes).
+    """
+    generation = MigrationDAO.get_scan_generation(migration["id"])
+    directory = snapshot_directory(migration)
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / f"{generation:08d}.snap"
+    if not target.exists():
+        selected = ("COALESCE(size, 0)", "COALESCE(mtime, 0.0)", "digest")
+        rows = (row for chunk in FileDAO.iter_path_order(migration["id"], selected, chunk_rows) for row in chunk)
+        meta = {"version": VERSION, "migration_id": migration["id"], "generation": generation,
+                "created_at": time.time()}
+        _write_snapshot(target, rows, meta)
+    if label:
+        labels = _read_labels(directory)
+        labels[label] = generation
+        temp = directory / f".{LABELS_FILE}.tmp"
+        temp.write_text(json.dumps(labels, indent=2, sort_keys=True))
+        os.replace(temp, directory / LABELS_FILE)
+    return _describe(target, directory)
+
+
+def _read_labels(directory):
+    labels_path = directory / LABELS_FILE
+    return json.loads(labels_path.read_text()) if labels_path.exists() else {}
+
+
+def _describe(path, directory, labels=None):
+    labels = _read_labels(directory) if labels is None else labels
+    with Snapshot(path) as snapshot:
+        meta = dict(snapshot.meta)
+    meta["labels"] = sorted(label for label, generation in labels.items() if generation == meta["generation"])
+    meta["disk_bytes"] = path.stat().st_size
+    return meta
+
+
+def list_snapshots(migration):
+    """Metadata of the migration's snapshots, oldest generation first."""
+    directory = snapshot_directory(migration)
+    if not directory.exists():
+        return []
+    labels = _read_labels(directory)
+    return [_describe(path, directory, labels) for path in sorted(directory.glob("*.snap"))]
+
+
+def open_snapshot(migration, ref=None):
+    """
+    Opens a snapshot by generation number or label; the latest one if `ref` is None or "latest".
+
+    Raises:
+        ValueError: If no such snapshot exists.
+    """
+    directory = snapshot_directory(migration)
+    if ref is None or ref == "latest":
+        paths = sorted(directory.glob("*.snap")) if directory.exists() else []
+        if not paths:
+            raise ValueError(f"No snapshots for {migration['name']}. Run a scan first.")
+        return Snapshot(paths[-1])
+    if str(ref).isdigit():
+        generation = int(ref)
+    else:
+        generation = _read_labels(directory).get(ref) if directory.exists() else None
+    path = directory / f"{generation:08d}.snap" if generation is not None else None
+    if path is None or not path.exists():
+        raise ValueError(f"No snapshot {ref} for {migration['name']}.")
+    return Snapshot(path)
+
+
+class _Cursor:
+    """Position in a snapshot during a merge; decompresses a block only when one of its rows is compared."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.block = 0
+        self.rows = None
+        self.row = 0
+
+    def block_start(self):
+        """The current block's metadata while positioned on its first row, else None."""
+        if self.row == 0 and self.block < len(self.snapshot.blocks):
+            return self.snapshot.blocks[self.block]
+        return None
+
+    def skip_block(self):
+        self.block, self.rows = self.block + 1, None
+
+    def peek(self):
+        if self.rows is None:
+            if self.block == len(self.snapshot.blocks):
+                return None
+            self.rows = self.snapshot.read_block(self.block)
+        return self.rows[self.row]
+
+    def advance(self):
+        self.row += 1
+        if self.row == len(self.rows):
+            self.block, self.rows, self.row = self.block + 1, None, 0
+
+
+class SnapshotDiff:
+    """
+    Files added, removed and changed between two snapshots, in one streaming merge-join.
+
+    Both snapshots are sorted by path, so they are walked side by side. Whenever both
+    sides are at the start of blocks with the same content digest, the blocks are skipped
+    without being decompressed; unchanged parts of a tree cost one comparison per block.
+    A file changed if its size or mtime differ, or both generations have a digest and
+    the digests differ.
+    """
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self.unchanged = 0
+        self.skipped_blocks = 0
+
+    def changes(self):
+        """Yields (kind, path, changed fields, old row, new row); rows are (path, size, mtime, digest) or None."""
+        old, new = _Cursor(self.old), _Cursor(self.new)
+        while True:
+            old_block, new_block = old.block_start(), new.block_start()
+            if old_block and new_block and old_block[3] == new_block[3]:
+                old.skip_block()
+                new.skip_block()
+                self.unchanged += old_block[2]
+                self.skipped_blocks += 1
+                continue
+            a, b = old.peek(), new.peek()
+            if a is None and b is None:
+                return
+            if b is None or (a is not None and a[0] < b[0]):
+                yield "removed", a[0], (), a, None
+                old.advance()
+            elif a is None or b[0] < a[0]:
+                yield "added", b[0], (), None, b
+                new.advance()
+            else:
+                fields = tuple(
+                    name for name, i in (("size", 1), ("mtime", 2), ("digest", 3))
+                    if a[i] != b[i] and (i != 3 or (a[i] and b[i]))
+                )
+                if fields:
+                    yield "changed", a[0], fields, a, b
+                else:
+                    self.unchanged += 1
+                old.advance()
+                new.advance()
+
+
+def _entry(kind, path, fields, old, new):
+    entry = {"change": kind, "path": path}
+    if fields:
+        entry["fields"] = list(fields)
+    for side, row in (("old", old), ("new", new)):
+        if row is not None:
+            entry[side] = {"size": row[1], "mtime": row[2], "digest": row[3]}
+    return entry
+
+
+def diff_generations(migration, old_ref, new_ref=None, limit=100, output=None):
+    """
+    Compares two snapshots of the migration (generation numbers or labels; `new_ref`
+    defaults to the latest one).
+
+    Returns:
+        dict: Counts per change kind and unchanged files, plus the first `limit` changes.
+              Every change is also written to `output` as JSON lines when given.
+    """
+    with open_snapshot(migration, old_ref) as old, open_snapshot(migration, new_ref) as new:
+        diff = SnapshotDiff(old, new)
+        summary = {"from": old.generation, "to": new.generation, **{kind: 0 for kind in CHANGE_KINDS}}
+        sample = []
+        out = open(output, "w", encoding="utf-8") if output else None
+        try:
+            for change in diff.changes():
+                summary[change[0]] += 1
+                if out is not None or len(sample) < limit:
+                    entry = _entry(*change)
+                    if len(sample) < limit:
+                        sample.append(entry)
+                    if out is not None:
+                        out.write(json.dumps(entry) + "\n")
+        finally:
+            if out is not None:
+                out.close()
+        summary.update(unchanged=diff.unchanged, skipped_blocks=diff.skipped_blocks, changes=sample)
+    return summary
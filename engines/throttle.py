@@ -0,0 +1,238 @@
+import threading
+import time
+from datetime import datetime
+
+from database import TransferScheduleDAO
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `consume` blocks until the requested tokens are available.
+
+    A rate of None means unlimited. A bucket starts full (at its burst size), also when a
+    limit replaces an unlimited rate, so the first requests of a run do not wait. Callers
+    may go into debt for large requests (e.g. a chunk bigger than the burst size); the
+    debt is paid off by waiting, which keeps the long-run rate exact without splitting
+    requests.
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self._lock = threading.Lock()
+        self._rate = None
+        self._burst = 0.0
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self.set_rate(rate, burst)
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def set_rate(self, rate, burst=None):
+        """Changes the refill rate (tokens per second) in place, e.g. when a schedule window starts."""
+        with self._lock:
+            self._refill()
+            was_unlimited = self._rate is None
+            self._rate = rate
+            self._burst = float(burst if burst is not None else (rate or 0))
+            self._tokens = self._burst if was_unlimited else min(self._tokens, self._burst)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self._rate is not None:
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def consume(self, amount=1):
+        """Takes `amount` tokens, sleeping as long as needed. Returns the time waited in seconds."""
+        with self._lock:
+            if self._rate is None:
+                return 0.0
+            self._refill()
+            self._tokens -= amount
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class ConcurrencyLimiter:
+    """A semaphore whose limit can be raised or lowered while holders are active."""
+
+    def __init__(self, limit):
+        self._condition = threading.Condition()
+        self._limit = max(1, limit)
+        self._active = 0
+
+    @property
+    def limit(self):
+        return self._limit
+
+    def set_limit(self, limit):
+        with self._condition:
+            self._limit = max(1, limit)
+            self._condition.notify_all()
+
+    def __enter__(self):
+        with self._condition:
+            while self._active >= self._limit:
+                self._condition.wait()
+            self._active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+
+class AIMDController:
+    """
+    Additive-increase/multiplicative-decrease control of a worker count.
+
+    Observations are collected over a time window. At the end of each window the worker
+    count is halved if per-operation latency rose well above the best latency seen
+    (the storage or link is congested), increased by one if throughput kept up, and
+    left alone while a bandwidth/IOPS cap is what limits throughput.
+    """
+
+    def __init__(self, initial, maximum, window=5.0, congestion_factor=2.0):
+        self.workers = max(1, min(initial, maximum))
+        self.maximum = maximum
+        self.window = window
+        self.congestion_factor = congestion_factor
+        self._lock = threading.Lock()
+        self._baseline_latency = None
+        self._last_throughput = 0.0
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_start = time.monotonic()
+        self._bytes = 0
+        self._operations = 0
+        self._latency = 0.0
+        self._throttled = 0.0
+
+    def set_maximum(self, maximum):
+        with self._lock:
+            self.maximum = max(1, maximum)
+            self.workers = min(self.workers, self.maximum)
+            return self.workers
+
+    def record(self, nbytes, latency, throttled=0.0):
+        """
+        Records one completed I/O operation. Returns the new worker count when the window
+        closes, otherwise None.
+        """
+        with self._lock:
+            self._bytes += nbytes
+            self._operations += 1
+            self._latency += latency
+            self._throttled += throttled
+            elapsed = time.monotonic() - self._window_start
+            if elapsed < self.window:
+                return None
+
+            throughput = self._bytes / max(elapsed, 1e-9)
+            avg_latency = self._latency / self._operations
+            rate_limited = self._throttled > 0.1 * elapsed
+            if self._baseline_latency is None or avg_latency < self._baseline_latency:
+                self._baseline_latency = avg_latency
+
+            if avg_latency > self._baseline_latency * self.congestion_factor:
+                self.workers = max(1, self.workers // 2)
+                # Forget the old baseline slowly so a permanently slower link can recover.
+                self._baseline_latency *= 1.25
+            elif not rate_limited and throughput >= self._last_throughput * 0.95:
+                self.workers = min(self.maximum, self.workers + 1)
+
+            self._last_throughput = throughput
+            self._reset_window()
+            return self.workers
+
+
+def schedule_applies(schedule, now):
+    """True if `now` (a datetime.time) falls inside the schedule's [start, end) window."""
+    start = datetime.strptime(schedule["start_time"], "%H:%M").time()
+    end = datetime.strptime(schedule["end_time"], "%H:%M").time()
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end  # window wraps past midnight
+
+
+class SiteThrottle:
+    """Bandwidth, IOPS and concurrency limits for transfers to one site."""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.bandwidth = TokenBucket()
+        self.iops = TokenBucket()
+        self.controller = AIMDController(initial=max(1, max_workers // 2), maximum=max_workers)
+        self.slots = ConcurrencyLimiter(self.controller.workers)
+
+    def apply(self, schedule):
+        """Applies the limits of a schedule row, or removes all limits if `schedule` is None."""
+        schedule = schedule or {}
+        self.bandwidth.set_rate(schedule.get("bandwidth_limit"))
+        self.iops.set_rate(schedule.get("iops_limit"))
+        self.slots.set_limit(self.controller.set_maximum(schedule.get("max_workers") or self.max_workers))
+
+    def io(self, nbytes):
+        """Waits for bandwidth and IOPS tokens for one I/O operation. Returns the time spent waiting."""
+        return self.iops.consume(1) + (self.bandwidth.consume(nbytes) if nbytes else 0.0)
+
+    def record(self, nbytes, latency, throttled=0.0):
+        workers = self.controller.record(nbytes, latency, throttled)
+        if workers is not None:
+            self.slots.set_limit(workers)
+
+
+class TransferScheduler:
+    """
+    Hands out per-site throttles for a migration and keeps them in line with its schedules.
+
+    The job calls `refresh` between batches; schedules are re-read at most every
+    `refresh_interval` seconds, so edits and time-of-day windows take effect in running
+    jobs without restarting them. A site-specific schedule takes precedence over a
+    migration-wide one (site_id NULL); among overlapping windows the newest wins.
+    `for_site` never touches the database and is safe to call from worker threads.
+    """
+
+    def __init__(self, migration_id, max_workers, refresh_interval=60.0, clock=datetime.now):
+        self.migration_id = migration_id
+        self.max_workers = max_workers
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._throttles = {}
+        self._schedules = []
+        self._refreshed = None
+
+    def _active_schedule(self, site_id, now):
+        matching = [s for s in self._schedules if schedule_applies(s, now) and s["site_id"] in (site_id, None)]
+        matching.sort(key=lambda s: (s["site_id"] is None, -s["id"]))
+        return dict(matching[0]) if matching else None
+
+    def refresh(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._refreshed is not None and now - self._refreshed < self.refresh_interval:
+                return
+            self._refreshed = now
+            self._schedules = TransferScheduleDAO.get_all_for_migration(self.migration_id)
+            current = self._clock().time()
+            for site_id, throttle in self._throttles.items():
+                throttle.apply(self._active_schedule(site_id, current))
+
+    def for_site(self, site_id):
+        with self._lock:
+            throttle = self._throttles.get(site_id)
+            if throttle is None:
+                throttle = self._throttles[site_id] = SiteThrottle(self.max_workers)
+                throttle.apply(self._active_schedule(site_id, self._clock().time()))
+            return throttle
+
+    def workers(self):
+        """Current concurrency per site, for reporting."""
+        with self._lock:
+            return {site_id: throttle.slots.limit for site_id, throttle in self._throttles.items()}
@@ -0,0 +1,107 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from database import FileDAO, MigrationDAO
+from engines.lease import WorkLease
+from engines.paths import project_directories, source_path, target_path
+from helpers.metrics import ERRORS, counter
+
+_FILES = counter("odie_verify_files_total", "Files verified")
+_HASHED = counter("odie_hashed_bytes_total", "Bytes read for sha256 digests")
+_ERRORS = ERRORS.labels("verify")
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+            _HASHED.inc(len(chunk))
+    return digest.hexdigest()
+
+
+def _verify_renamed(destination, row, use_hash, result):
+    """A renamed file has no source left; check it against what the scan recorded instead."""
+    target_size = destination.stat().st_size
+    if target_size != row["size"]:
+        result["error"] = f"size mismatch: {row['size']} != {target_size}"
+        return result
+    if use_hash:
+        target_digest = file_digest(destination)
+        if row["digest"] and row["digest"] != target_digest:
+            result["error"] = "content mismatch"
+            return result
+        result["digest"] = target_digest
+    result["status"] = "verified"
+    return result
+
+
+def _verify_one(migration, project_dir, row, use_hash):
+    source = source_path(migration, row["path"])
+    destination = target_path(migration, project_dir, row["path"])
+    result = {"id": row["id"], "status": "failed", "error": None, "digest": row["digest"]}
+    try:
+        if row["transfer_method"] == "rename":
+            return _verify_renamed(destination, row, use_hash, result)
+        if row["transfer_method"] == "hardlink" and source.samefile(destination):
+            result["status"] = "verified"  # one inode, nothing to compare
+            return result
+        source_size, target_size = source.stat().st_size, destination.stat().st_size
+        if source_size != target_size:
+            result["error"] = f"size mismatch: {source_size} != {target_size}"
+            return result
+        if use_hash:
+            source_digest = file_digest(source)
+            target_digest = file_digest(destination)
+            if source_digest != target_digest:
+                result["error"] = "content mismatch"
+                return result
+            result["digest"] = source_digest
+        result["status"] = "verified"
+    except OSError as e:
+        result["error"] = str(e)
+    return result
+
+
+def verify_files(migration, workers=4, batch_size=500, use_hash=True, lease=None):
+    """
+    Checks copied files against their source by size and (unless `use_hash` is False) sha256.
+
+    With `lease` (seconds), batches are claimed from the files table shared with other
+    worker processes, as in copy_files.
+
+    Digests recorded for the first time change the inventory, so they start a new scan
+    generation: the next snapshot (e.g. `snapshot --label signoff`) is written afresh
+    with them instead of reusing the scan's digest-less one.
+
+    Returns:
+        dict: Number of files verified and failed; with `lease`, also this worker's name
+              and the results dropped because their lease was lost.
+    """
+    project_dirs = project_directories(migration["id"])
+    summary = {"verified": 0, "failed": 0}
+    new_digests = 0
+    leased = WorkLease(migration["id"], ("copied",), batch_size, lease) if lease else None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, leased or nullcontext():
+        batches = leased.batches() if leased else FileDAO.iter_batches(migration["id"], ("copied",), batch_size)
+        for batch in batches:
+            results = list(pool.map(
+                lambda row: _verify_one(migration, project_dirs[row["project_id"]], row, use_hash), batch
+            ))
+            if leased:
+                leased.complete(results)
+            else:
+                FileDAO.update_many(results)
+            new_digests += sum(row["digest"] != result["digest"] for row, result in zip(batch, results))
+            for result in results:
+                summary[result["status"]] += 1
+                (_FILES if result["status"] == "verified" else _ERRORS).inc()
+    if new_digests:
+        MigrationDAO.bump_scan_generation(migration["id"])
+    if leased:
+        summary.update(worker=leased.owner, lost=leased.lost)
+    return summary
@@ -0,0 +1,297 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import signal
+import stat
+import struct
+import sys
+import threading
+import time
+
+from database import DirectoryDAO, FileDAO, MigrationDAO
+from engines.metadata import capture
+from engines.scan import list_directory
+from helpers.metrics import ERRORS, QUEUE_DEPTH, counter
+
+_UPSERTED = counter("odie_watch_upserted_total", "Files written to the inventory by the watcher")
+_ERRORS = ERRORS.labels("watch")
+_PENDING = QUEUE_DEPTH.labels("watch")
+
+# inotify(7) event bits.
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+    | IN_ONLYDIR | IN_DONT_FOLLOW
+)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+_READ_SIZE = 64 * 1024
+
+
+class Inotify:
+    """Minimal ctypes binding of the Linux inotify API."""
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            message = os.strerror(errno)
+            if errno == 28:  # ENOSPC
+                message += " (raise fs.inotify.max_user_watches)"
+            raise OSError(errno, message, path)
+        return wd
+
+    def remove_watch(self, wd):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout):
+        """Waits up to `timeout` seconds and returns the queued events as (wd, mask, cookie, name)."""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, _READ_SIZE)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class InventoryWatcher:
+    """
+    Keeps a migration's files table in step with changes under old_root, from inotify events.
+
+    Events only queue paths; `flush` stats what changed and writes the result in one batch,
+    so a file written in many chunks costs one upsert. New directories are watched and
+    listed (files may appear before the watch does). When the kernel queue overflows, the
+    directories whose mtime changed (entries created, removed or renamed) and those that
+    had pending events are listed again instead of re-walking the whole tree.
+
+    inotify only reports changes made through this host's kernel: on network shares,
+    changes made by other clients are not seen and periodic scans remain necessary.
+    """
+
+    def __init__(self, migration, batch_size=1000):
+        self.migration = migration
+        self.root = migration["old_root"]
+        self.batch_size = batch_size
+        self.summary = {"upserted": 0, "removed": 0, "directories": 0, "rescanned": 0, "overflows": 0, "errors": []}
+        self._inotify = None
+        self._watches = {}  # wd -> directory relpath ("" for old_root)
+        self._dir_mtimes = {}  # directory relpath -> mtime when last listed
+        self._changed = set()  # file relpaths to stat on the next flush
+        self._removed_dirs = set()
+        self._rescan = set()  # directory relpaths to list on the next flush
+
+    @property
+    def pending(self):
+        return len(self._changed) + len(self._removed_dirs) + len(self._rescan)
+
+    def _full_path(self, relpath):
+        return os.path.join(self.root, *relpath.split("/")) if relpath else self.root
+
+    def start(self):
+        """Watches every directory under old_root."""
+        self._inotify = Inotify()
+        for directory, subdirs, _ in os.walk(self.root):
+            relpath = os.path.relpath(directory, self.root).replace(os.sep, "/")
+            self._watch(relpath if relpath != "." else "")
+        return self
+
+    def _watch(self, relpath):
+        try:
+            wd = self._inotify.add_watch(self._full_path(relpath))
+        except FileNotFoundError:
+            return
+        self._watches[wd] = relpath
+        self._remember_mtime(relpath)
+        self.summary["directories"] = len(self._watches)
+
+    def _remember_mtime(self, relpath):
+        try:
+            self._dir_mtimes[relpath] = os.stat(self._full_path(relpath)).st_mtime
+        except FileNotFoundError:
+            self._dir_mtimes.pop(relpath, None)
+
+    def _unwatch_tree(self, relpath):
+        prefix = relpath + "/"
+        for wd, directory in list(self._watches.items()):
+            if directory == relpath or directory.startswith(prefix):
+                self._inotify.remove_watch(wd)
+                del self._watches[wd]
+                self._dir_mtimes.pop(directory, None)
+
+    def poll(self, timeout=1.0):
+        """Reads available events (waiting up to `timeout` seconds) into the pending sets."""
+        for wd, mask, _, name in self._inotify.read(timeout):
+            if mask & IN_Q_OVERFLOW:
+                self._overflowed()
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or mask & IN_IGNORED:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF) and not name:
+                continue  # reported as IN_DELETE/IN_MOVED_FROM by the parent as well
+            relpath = f"{directory}/{name}" if directory else name
+            if mask & IN_ISDIR:
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._unwatch_tree(relpath)
+                    self._removed_dirs.add(relpath)
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    self._rescan.add(relpath)  # listed after any removal of the same path is applied
+            else:
+                self._changed.add(relpath)
+        _PENDING.set(self.pending)
+
+    def _overflowed(self):
+        """Events were lost: list directories that changed structurally or were already busy."""
+        self.summary["overflows"] += 1
+        for relpath, mtime in list(self._dir_mtimes.items()):
+            try:
+                if os.stat(self._full_path(relpath)).st_mtime != mtime:
+                    self._rescan.add(relpath)
+            except FileNotFoundError:
+                self._removed_dirs.add(relpath)
+        self._rescan.update(path.rpartition("/")[0] for path in self._changed)
+        self._changed.clear()
+
+    def flush(self):
+        """Writes the pending changes to the files table in one batch per kind of change."""
+        if not self.pending:
+            return
+        migration_id = self.migration["id"]
+        now = time.time()
+
+        if self._removed_dirs:
+            for relpath in self._removed_dirs:
+                self.summary["removed"] += FileDAO.delete_under(migration_id, relpath)
+                DirectoryDAO.delete_under(migration_id, relpath)
+            self._removed_dirs.clear()
+
+        touched = set()  # directories whose entries changed, so their mtime moved
+        while self._rescan:
+            relpath = self._rescan.pop()
+            if not os.path.isdir(self._full_path(relpath)):
+                continue  # removed again before the flush
+            touched.add(relpath)
+            if relpath not in self._dir_mtimes:
+                self._watch(relpath)  # before listing, so nothing created in between is missed
+            else:
+                self._remember_mtime(relpath)
+            files, subdirs, errors = list_directory(self.root, relpath)
+            self.summary["errors"].extend(errors)
+            _ERRORS.inc(len(errors))
+            FileDAO.upsert_scanned(migration_id, files, now)
+            DirectoryDAO.upsert_scanned(migration_id, subdirs, now)
+            self.summary["upserted"] += len(files)
+            _UPSERTED.inc(len(files))
+            if not errors:
+                self.summary["removed"] += FileDAO.delete_unseen_in_directory(migration_id, relpath, now)
+            self._rescan.update(subdir for subdir, *_ in subdirs if subdir not in self._dir_mtimes)
+            self._changed.difference_update(f"{relpath}/{name}" if relpath else name for name, *_ in files)
+            self.summary["rescanned"] += 1
+
+        touched.update(relpath.rpartition("/")[0] for relpath in self._changed)
+        rows, gone = [], []
+        for relpath in self._changed:
+            try:
+                info = os.stat(self._full_path(relpath), follow_symlinks=False)
+            except FileNotFoundError:
+                gone.append(relpath)
+                continue
+            except OSError as e:
+                self.summary["errors"].append({"path": relpath, "error": str(e)})
+                _ERRORS.inc()
+                continue
+            if not stat.S_ISREG(info.st_mode):
+                gone.append(relpath)  # like scans, only regular files are inventoried
+                continue
+            path = self._full_path(relpath)
+            rows.append((relpath.rpartition("/")[2], relpath, info.st_size, info.st_mtime, *capture(path, info)))
+        self._changed.clear()
+        for start in range(0, len(rows), self.batch_size):
+            FileDAO.upsert_scanned(migration_id, rows[start:start + self.batch_size], now)
+        self.summary["upserted"] += len(rows)
+        _UPSERTED.inc(len(rows))
+        self.summary["removed"] += FileDAO.delete_paths(migration_id, gone)
+        DirectoryDAO.upsert_scanned(migration_id, self._directory_rows(touched - {""}), now)
+        MigrationDAO.bump_scan_generation(migration_id)
+        _PENDING.set(0)
+
+    def _directory_rows(self, relpaths):
+        rows = []
+        for relpath in relpaths:
+            path = self._full_path(relpath)
+            try:
+                info = os.stat(path, follow_symlinks=False)
+            except OSError:
+                continue  # removed meanwhile; its removal is queued
+            rows.append((relpath, info.st_mtime, *capture(path, info)))
+        return rows
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+def watch_migration(migration, interval=1.0, batch_size=1000, stop=None):
+    """
+    Streams changes under old_root into the files table until `stop` is set, or SIGINT/SIGTERM.
+
+    Events are coalesced for `interval` seconds (or until `batch_size` paths are pending)
+    and then written in one batch, so the inventory lags the share by about `interval`.
+
+    Returns:
+        dict: Files upserted and removed, directories watched and rescanned, queue overflows.
+    """
+    stop = stop or threading.Event()
+    handlers = {}
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            handlers[signum] = signal.signal(signum, lambda *_: stop.set())
+
+    watcher = InventoryWatcher(migration, batch_size)
+    try:
+        watcher.start()
+        deadline = time.monotonic() + interval
+        while not stop.is_set():
+            watcher.poll(timeout=max(0.0, min(deadline - time.monotonic(), 0.5)))
+            if time.monotonic() >= deadline or watcher.pending >= batch_size:
+                watcher.flush()
+                deadline = time.monotonic() + interval
+        watcher.flush()
+    finally:
+        watcher.close()
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+    return watcher.summary
@@ -0,0 +1,80 @@
+import os
+import select
+import sys
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows
+    termios = tty = None
+
+try:
+    import msvcrt
+except ImportError:  # everything but Windows
+    msvcrt = None
+
+KEY_ENTER = "enter"
+KEY_ESCAPE = "escape"
+KEY_BACKSPACE = "backspace"
+KEY_UP = "up"
+KEY_DOWN = "down"
+
+_ESCAPE_SEQUENCES = {"[A": KEY_UP, "[B": KEY_DOWN, "OA": KEY_UP, "OB": KEY_DOWN}
+_WINDOWS_KEYS = {"H": KEY_UP, "P": KEY_DOWN}
+
+
+def keystrokes_supported():
+    """True if single keypresses can be read, i.e. stdin is an interactive terminal."""
+    return sys.stdin.isatty() and (termios is not None or msvcrt is not None)
+
+
+def read_key():
+    """
+    Reads one keypress without waiting for Enter.
+
+    Returns:
+        str: The typed character, or one of the KEY_* names for Enter, Escape, Backspace
+             and the Up/Down arrows. Other control keys return an empty string.
+
+    Raises:
+        KeyboardInterrupt: On Ctrl-C, which raw mode would otherwise swallow.
+    """
+    key = _read_windows_key() if msvcrt is not None else _read_posix_key()
+    if key == "\x03":
+        raise KeyboardInterrupt
+    if key in ("\r", "\n"):
+        return KEY_ENTER
+    if key in ("\x7f", "\x08"):
+        return KEY_BACKSPACE
+    if key == "\x1b":
+        return KEY_ESCAPE
+    if len(key) == 1 and not key.isprintable():
+        return ""
+    return key
+
+
+def _read_posix_key():
+    fd = sys.stdin.fileno()
+    saved = termios.tcgetattr(fd)
+    try:
+        tty.setraw(fd)
+        data = os.read(fd, 1)
+        if data == b"\x1b":
+            # Arrow keys arrive as ESC [ A; a lone Escape has nothing following it.
+            if select.select([fd], [], [], 0.05)[0]:
+                sequence = os.read(fd, 2).decode(errors="ignore")
+                return _ESCAPE_SEQUENCES.get(sequence, "")
+            return "\x1b"
+        # Read the continuation bytes of a multi-byte UTF-8 character.
+        if data[0] >= 0xC0:
+            data += os.read(fd, 1 if data[0] < 0xE0 else 2 if data[0] < 0xF0 else 3)
+        return data.decode(errors="ignore")
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+
+def _read_windows_key():
+    key = msvcrt.getwch()
+    if key in ("\x00", "\xe0"):  # prefix of arrow and function keys
+        return _WINDOWS_KEYS.get(msvcrt.getwch(), "")
+    return key
@@ -0,0 +1,386 @@
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Upper bounds (in seconds) of the default histogram buckets.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+DEFAULT_INTERVAL = 15.0
+JSONL_FILE = "metrics.jsonl"
+PROMETHEUS_FILE = "odie.prom"  # for node_exporter's textfile collector
+
+
+class _ThreadCells:
+    """
+    One list of accumulators per thread. Only the owning thread writes to its list, so
+    updates take no lock; readers sum the lists (a reading may be a moment behind). The
+    lists of threads that have ended are folded into a base total, so short-lived worker
+    pools do not make the metric grow.
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._cells = []  # (thread, cell)
+        self._base = [0] * size
+        self._lock = threading.Lock()
+
+    def cell(self):
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = [0] * self._size
+            with self._lock:
+                self._fold()
+                self._cells.append((threading.current_thread(), cell))
+            return cell
+
+    def _fold(self):
+        """Adds the lists of ended threads (which no longer write) to the base; needs the lock."""
+        live = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                live.append((thread, cell))
+            else:
+                self._base = [total + value for total, value in zip(self._base, cell)]
+        self._cells = live
+
+    def totals(self):
+        with self._lock:
+            self._fold()
+            cells = [self._base] + [cell for _, cell in self._cells]
+        return [sum(column) for column in zip(*cells)]
+
+
+class _CounterChild:
+    def __init__(self):
+        self._cells = _ThreadCells(1)
+
+    def inc(self, amount=1):
+        self._cells.cell()[0] += amount
+
+    def value(self):
+        return self._cells.totals()[0]
+
+
+class _GaugeChild:
+    """Either `set` from one place, or moved by `inc`/`dec` from any thread (kept per thread)."""
+
+    def __init__(self):
+        self._value = 0
+        self._cells = _ThreadCells(1)
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, amount=1):
+        self._cells.cell()[0] += amount
+
+    def dec(self, amount=1):
+        self._cells.cell()[0] -= amount
+
+    def value(self):
+        return self._value + self._cells.totals()[0]
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._cells = _ThreadCells(len(buckets) + 3)  # per bucket, +Inf, sum, count
+
+    def observe(self, value):
+        cell = self._cells.cell()
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def value(self):
+        totals = self._cells.totals()
+        return {"buckets": totals[:-2], "sum": totals[-2], "count": totals[-1]}
+
+
+class Metric:
+    """
+    A named counter, gauge or histogram, optionally split by label values.
+
+    Without labels the metric is updated directly (`inc`, `set`, `observe`); with labels,
+    `labels(*values)` returns the child to update. Children are created once and should
+    be kept by callers in hot loops.
+    """
+
+    def __init__(self, kind, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._lock = threading.Lock()
+        self._default = self.labels() if not self.labelnames else None
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        if self.kind == "counter":
+            return _CounterChild()
+        if self.kind == "gauge":
+            return _GaugeChild()
+        return _HistogramChild(self.buckets)
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def value(self):
+        return self._default.value()
+
+    def samples(self):
+        """(label values, value) pairs; histogram values are dicts of buckets, sum and count."""
+        with self._lock:
+            children = list(self._children.items())
+        return [(values, child.value()) for values, child in children]
+
+
+class Registry:
+    """The process's metrics, by name. Metrics are created on first use and shared afterwards."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, help, labelnames, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = Metric(kind, name, help, labelnames, **kwargs)
+        if metric.kind != kind:
+            raise ValueError(f"{name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._get("counter", name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=()):
+        return self._get("gauge", name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get("histogram", name, help, labelnames, buckets=buckets)
+
+    def metrics(self):
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+# Shared by the engines, one label value per stage (scan, watch, copy, verify, metadata).
+ERRORS = counter("odie_errors_total", "Files or directories that failed, by stage", ("stage",))
+QUEUE_DEPTH = gauge("odie_queue_depth", "Work items queued or in flight, by stage", ("stage",))
+COPIED_BYTES = counter("odie_copy_bytes_total", "Bytes written by byte and range copies (fast paths move no data)")
+
+
+def _label_text(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _number(value):
+    return "+Inf" if value == math.inf else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def prometheus_text(registry=REGISTRY):
+    """The current values in the Prometheus text exposition format."""
+    lines = []
+    for metric in registry.metrics():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for values, value in metric.samples():
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_label_text(metric.labelnames, values)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*metric.buckets, math.inf), value["buckets"]):
+                cumulative += count
+                le = (("le", _number(bound)),)
+                lines.append(f"{metric.name}_bucket{_label_text(metric.labelnames, values, le)} {cumulative}")
+            labels = _label_text(metric.labelnames, values)
+            lines.append(f"{metric.name}_sum{labels} {_number(value['sum'])}")
+            lines.append(f"{metric.name}_count{labels} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot(registry=REGISTRY):
+    """
+    The current values as a JSON-serializable dict: {name: value} for unlabelled metrics,
+    {name: {"label=value,...": value}} for labelled ones. Histograms report count, sum and
+    the non-cumulative count per bucket bound.
+    """
+    result = {}
+    for metric in registry.metrics():
+        values = {}
+        for labels, value in metric.samples():
+            if metric.kind == "histogram":
+                bounds = (*map(str, metric.buckets), "+Inf")
+                value = {"count": value["count"], "sum": value["sum"], "buckets": dict(zip(bounds, value["buckets"]))}
+            values[",".join(f"{name}={v}" for name, v in zip(metric.labelnames, labels))] = value
+        result[metric.name] = values[""] if not metric.labelnames and "" in values else values
+    return result
+
+
+def _rates(counters, current, previous, elapsed):
+    """Per-second increase of every counter since the previous snapshot."""
+    rates = {}
+    for name in counters:
+        value, before = current.get(name), previous.get(name)
+        if isinstance(value, (int, float)) and isinstance(before, (int, float)):
+            rates[name] = (value - before) / elapsed
+        elif isinstance(value, dict) and isinstance(before, dict):
+            per_label = {
+                label: (v - before[label]) / elapsed for label, v in value.items()
+                if isinstance(v, (int, float)) and isinstance(before.get(label), (int, float))
+            }
+            if per_label:
+                rates[name] = per_label
+    return rates
+
+
+class MetricsExporter:
+    """
+    Publishes the registry while a long job runs, every `interval` seconds and once more
+    when stopped:
+
+    - appends a JSON line (time, values, and per-second rates of the counters since the
+      previous line) to `directory`/metrics.jsonl, for later analysis;
+    - rewrites `directory`/odie.prom in the Prometheus text format, for node_exporter's
+      textfile collector;
+    - if `port` is given, serves the same text at http://127.0.0.1:<port>/metrics.
+
+    Engines update the metrics from their hot loops; nothing here runs on their threads.
+    """
+
+    def __init__(self, directory, interval=DEFAULT_INTERVAL, port=None, registry=REGISTRY):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.port = port
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+        self._previous = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.port is not None:
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.port), self._handler())
+            self.port = self._server.server_address[1]  # the port picked for port 0
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        self._thread = threading.Thread(target=self._run, name="metrics-export", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        try:
+            self.write()
+        except OSError:
+            pass  # metrics are best effort; a failed last write must not fail the job that ran
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                pass  # a full or unmounted disk must not stop the job; the next interval retries
+
+    def write(self):
+        """Writes one JSON line and the Prometheus text file now."""
+        now = time.time()
+        values = snapshot(self.registry)
+        line = {"time": now, "metrics": values}
+        if self._previous is not None and now > self._previous[0]:
+            counters = [metric.name for metric in self.registry.metrics() if metric.kind == "counter"]
+            line["rates"] = _rates(counters, values, self._previous[1], now - self._previous[0])
+        self._previous = (now, values)
+        with open(self.directory / JSONL_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(line) + "\n")
+        target = self.directory / PROMETHEUS_FILE
+        temp = target.with_name(f".{target.name}.tmp")
+        temp.write_text(prometheus_text(self.registry), encoding="utf-8")
+        os.replace(temp, target)  # scrapers never see a half-written file
+
+    def _handler(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = prometheus_text(registry).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # keep stdout/stderr for the job's own output
+
+        return Handler
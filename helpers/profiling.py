@@ -0,0 +1,155 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from database.database import DB_PATH
+
+PROFILE_ENV = "ODIE_PROFILE"
+PROFILE_DIR = DB_PATH.parent / "profiles"
+PROFILE_MODES = ("timing", "cprofile", "tracemalloc")
+
+_profiler = None
+
+
+def parse_modes(value):
+    """
+    Parses a profiling mode string such as "1", "all" or "cprofile,tracemalloc".
+
+    Wall/CPU timing is always recorded; "cprofile" and "tracemalloc" add the
+    corresponding captures. An empty value disables profiling.
+    """
+    if not value or value.strip().lower() in ("0", "false", "no", "off"):
+        return None
+    modes = {"timing"}
+    for mode in (part.strip().lower() for part in value.split(",")):
+        if mode in ("1", "true", "yes", "on", "timing", ""):
+            continue
+        if mode == "all":
+            modes.update(PROFILE_MODES)
+        elif mode in PROFILE_MODES:
+            modes.add(mode)
+        else:
+            raise ValueError(f"Unknown profiling mode: {mode}. Expected one of: {', '.join(PROFILE_MODES)}, all")
+    return modes
+
+
+def configure_profiling(modes=None, output_dir=PROFILE_DIR):
+    """
+    Enables action profiling for the rest of the session.
+
+    Args:
+        modes (str | set | None): Mode string (see `parse_modes`) or a set of modes.
+                                  If None, the ODIE_PROFILE environment variable is used.
+        output_dir (Path): Directory the per-action reports are written to.
+
+    Returns:
+        ActionProfiler | None: The active profiler, or None if profiling is disabled.
+    """
+    global _profiler
+    if modes is None:
+        modes = os.environ.get(PROFILE_ENV)
+    if isinstance(modes, str):
+        modes = parse_modes(modes)
+    _profiler = ActionProfiler(modes, output_dir) if modes else None
+    return _profiler
+
+
+def get_action_profiler():
+    return _profiler
+
+
+def collapsed_stacks(stats):
+    """
+    Converts `pstats.Stats` into collapsed stack lines ("a;b <microseconds>") for flamegraph tools.
+
+    cProfile only records caller/callee edges, so stacks are collapsed one level deep:
+    every edge gives a "caller;callee" line with the callee's own time on that edge, and
+    every root a line of its own. Each second of self time is thus counted once, and the
+    output grows with the number of edges, not with the number of call paths.
+    """
+    def label(func):
+        filename, line, name = func
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    lines = []
+
+    def emit(stack, seconds):
+        micros = round(seconds * 1_000_000)
+        if micros > 0:
+            lines.append(f"{';'.join(stack)} {micros}")
+
+    for func, (_, _, tt, _, callers) in stats.stats.items():
+        if not callers:
+            emit([label(func)], tt)
+        for caller, (_, _, edge_tt, _) in callers.items():
+            emit([label(caller), label(func)], edge_tt)
+    return lines
+
+
+class ActionProfiler:
+    """Wraps `Action` execution with wall/CPU timing and optional cProfile/tracemalloc capture."""
+
+    def __init__(self, modes, output_dir=PROFILE_DIR):
+        self.modes = set(modes)
+        self.output_dir = Path(output_dir)
+        self._depth = 0  # nested actions (selection UIs) are timed but not re-profiled
+
+    def run(self, action):
+        owner = getattr(action.func, "__self__", None)
+        ui_name = type(owner).__name__ if owner is not None else "Action"
+        capture = self._depth == 0
+        profile = cProfile.Profile() if capture and "cprofile" in self.modes else None
+        trace_memory = capture and "tracemalloc" in self.modes and not tracemalloc.is_tracing()
+
+        self._depth += 1
+        if trace_memory:
+            tracemalloc.start()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            if profile is not None:
+                return profile.runcall(action.func)
+            return action.func()
+        finally:
+            wall_ms = (time.perf_counter() - wall_start) * 1000
+            cpu_ms = (time.process_time() - cpu_start) * 1000
+            snapshot = tracemalloc.take_snapshot() if trace_memory else None
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+            self._depth -= 1
+            self._write_report(ui_name, action, wall_ms, cpu_ms, profile, snapshot, peak)
+
+    def _write_report(self, ui_name, action, wall_ms, cpu_ms, profile, snapshot, peak):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", f"{ui_name}-{action.key}-{action.label}").strip("-")
+        stem = self.output_dir / f"{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}"
+
+        summary = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "ui": ui_name,
+            "key": action.key,
+            "label": action.label,
+            "wall_ms": round(wall_ms, 3),
+            "cpu_ms": round(cpu_ms, 3),
+        }
+        if profile is not None:
+            profile.dump_stats(f"{stem}.pstats")
+            stats = pstats.Stats(profile)
+            Path(f"{stem}.collapsed").write_text("\n".join(collapsed_stacks(stats)) + "\n")
+            summary["pstats"] = f"{stem.name}.pstats"
+            summary["collapsed"] = f"{stem.name}.collapsed"
+        if snapshot is not None:
+            summary["peak_bytes"] = peak
+            summary["top_allocations"] = [
+                {"where": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:10]
+            ]
+
+        with open(self.output_dir / "actions.jsonl", "a") as f:
+            f.write(json.dumps(summary) + "\n")
@@ -22,12 +22,16 @@ def prompt_for_fields(field_defs, current_values=None):
             selection_ui_class = config["selection_ui"]
             # Instantiate and run the selection UI.
             ui_instance = selection_ui_class()
-            # We assume that prompt_action() runs the UI and that the UI has a get_result() method.
-            ui_instance.display_table()
-            ui_instance.display_actions()
-            ui_instance.prompt_action()
+            # Run the UI's actions (paging, searching) until something is selected or the user leaves it.
+            while ui_instance.get_result() is None:
+                ui_instance.display_table()
+                ui_instance.display_actions()
+                if ui_instance.prompt_action() is not ui_instance:
+                    break
             # Use the result from the selection UI.
             value = ui_instance.get_result()
+            if value is None:
+                return
             results[field] = value["id"]
             continue
         label = config.get("label", field)
@@ -0,0 +1,68 @@
+import bisect
+import heapq
+import unicodedata
+from collections import Counter, defaultdict
+from itertools import islice
+
+
+def normalize(text):
+    """Case- and accent-insensitive form of `text` used for matching."""
+    text = unicodedata.normalize("NFKD", str(text)).casefold()
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def trigrams(text, pad_end=True):
+    """Trigrams of `text`, padded so that the start (and, with `pad_end`, the end) of the name count."""
+    padded = f"  {text} " if pad_end else f"  {text}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    In-memory prefix and trigram index over item names, built once per picker.
+
+    `search` ranks names that start with the query first (found by bisection in the
+    sorted names), then names sharing the most trigrams with it, which matches words
+    inside names and tolerates typos. Each query costs time proportional to the matches,
+    not to the number of items, so it can run on every keystroke.
+    """
+
+    def __init__(self, items, key="name"):
+        self.items = list(items)
+        self._names = [normalize(dict(item).get(key) or "") for item in self.items]
+        self._sorted = sorted((name, i) for i, name in enumerate(self._names))
+        self._postings = defaultdict(list)
+        for i, name in enumerate(self._names):
+            for gram in trigrams(name):
+                self._postings[gram].append(i)
+
+    def search(self, query, limit=10):
+        """Returns the `limit` best matching items; the first `limit` items for an empty query."""
+        query = normalize(query).strip()
+        if not query:
+            return self.items[:limit]
+        ranked = self._prefix_matches(query, limit)
+        if len(ranked) < limit:
+            seen = set(ranked)
+            more = (i for i in self._trigram_matches(query, limit + len(ranked)) if i not in seen)
+            ranked += islice(more, limit - len(ranked))
+        return [self.items[i] for i in ranked]
+
+    def _prefix_matches(self, query, limit):
+        start = bisect.bisect_left(self._sorted, (query,))
+        matches = []
+        for name, i in islice(self._sorted, start, None):
+            if len(matches) == limit or not name.startswith(query):
+                break
+            matches.append(i)
+        return matches
+
+    def _trigram_matches(self, query, limit):
+        grams = trigrams(query, pad_end=False)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._postings.get(gram, ()))
+        # Require about half of the query's trigrams, so one or two typos still match.
+        threshold = max(1, len(grams) // 2)
+        candidates = (i for i, count in counts.items() if count >= threshold)
+        return heapq.nlargest(limit, candidates, key=lambda i: (counts[i], -len(self._names[i])))
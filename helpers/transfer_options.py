@@ -0,0 +1,15 @@
+# Choices for a migration's transfer settings, kept free of engine imports so the UI
+# helpers can validate them without loading the engines.
+
+# How files reach new_root. Every mode falls back to a byte copy when its fast path is unavailable.
+#   copy - reflink (copy-on-write clone) on the same filesystem, otherwise a byte copy
+#   move - rename on the same filesystem; the source disappears from old_root
+#   link - hardlink on the same filesystem, for staged cutovers where both trees must stay in place
+#   delta - like copy, but large files that were copied before only get their changed blocks rewritten
+TRANSFER_MODES = ("copy", "move", "link", "delta")
+
+# Order of files within a project. Projects themselves always go by priority, then cutover date.
+#   priority - inventory order
+#   smallest - smallest files first, for quick wins (many files done early)
+#   largest  - largest files first, to keep the pipes full
+TRANSFER_ORDERS = ("priority", "smallest", "largest")
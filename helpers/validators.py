@@ -1,9 +1,11 @@
 import re
+from datetime import date
 from pathlib import Path
 
 from rich.prompt import Prompt
 
 from console_instance import console
+from helpers.transfer_options import TRANSFER_MODES, TRANSFER_ORDERS
 from helpers.validator import Validator
 
 
@@ -43,6 +45,24 @@ def _directory_exists_or_prompt(value: str) -> bool:
         return True
     return False
 
+def _is_transfer_mode(value: str) -> bool:
+    return value in TRANSFER_MODES
+
+def _is_transfer_order(value: str) -> bool:
+    return value in TRANSFER_ORDERS
+
+def _is_integer(value) -> bool:
+    return bool(re.fullmatch(r"-?\d+", str(value).strip()))
+
+def _is_date_or_empty(value) -> bool:
+    if not value:
+        return True
+    try:
+        date.fromisoformat(str(value))
+        return True
+    except ValueError:
+        return False
+
 def _create_directory(value: str) -> bool:
     path = Path(value)
     response = Prompt.ask(f"Directory {value} was not found. Create it?", choices=["Y", "N"], default="Y")
@@ -71,4 +91,27 @@ validate_and_create_directory = Validator(
             (_directory_exists_or_prompt, "Directory does not exist.")
         ),
     action_fn=_create_directory
-)
\ No newline at end of file
+)
+
+transfer_mode = Validator(
+    validator_fn=_compose_validation_fn_with_errors(
+        (_is_transfer_mode, f"Transfer mode must be one of: {', '.join(TRANSFER_MODES)}.")
+    )
+)
+transfer_order = Validator(
+    validator_fn=_compose_validation_fn_with_errors(
+        (_is_transfer_order, f"Transfer order must be one of: {', '.join(TRANSFER_ORDERS)}.")
+    )
+)
+
+integer = Validator(
+    validator_fn=_compose_validation_fn_with_errors(
+        (_is_integer, "Value must be a whole number.")
+    )
+)
+
+optional_date = Validator(
+    validator_fn=_compose_validation_fn_with_errors(
+        (_is_date_or_empty, "Date must be YYYY-MM-DD, or empty.")
+    )
+)
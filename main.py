@@ -1,17 +1,29 @@
-# main.py
 #!/usr/bin/env python3
-from console_instance import console  # Import the console from ui.py
+import argparse
+
+from helpers.profiling import configure_profiling
 from ui.migrations_list_ui import MigrationsListUI
+from ui.screen import screen
 
 
 def main_loop(starting_ui):
     current_ui = starting_ui
-    while current_ui:
-        console.clear()
-        current_ui.display_table()
-        current_ui.display_actions()
-        current_ui = current_ui.prompt_action()
+    with screen:
+        while current_ui:
+            # Only the lines that changed since the last loop are redrawn (see ui.screen).
+            screen.draw(current_ui.screen_parts())
+            current_ui = current_ui.prompt_action()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="odie file migration tool")
+    parser.add_argument(
+        "--profile",
+        metavar="MODES",
+        help="profile each action: 'timing', 'cprofile', 'tracemalloc' (comma-separated) or 'all'. "
+             "Defaults to the ODIE_PROFILE environment variable.",
+    )
+    args = parser.parse_args()
+    configure_profiling(args.profile)
+
     # start with migrations UI
     main_loop(MigrationsListUI())
\ No newline at end of file
@@ -0,0 +1,66 @@
+# test_aio.py
+import asyncio
+import sqlite3
+
+import pytest
+
+from database import DatabaseManager, aio
+from engines import classify_files
+from engines.aio import MigrationJob, start_copy, start_scan, start_verify
+
+
+@pytest.fixture
+def migration(tmp_path, monkeypatch):
+    """A migration in a database file, since jobs and the DB executor use connections from other threads."""
+    path = tmp_path / "odie.db"
+
+    def connect(self=None):
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA foreign_keys = ON;")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    monkeypatch.setattr(DatabaseManager, "get_connection", connect)
+    monkeypatch.setattr("engines.snapshot.SNAPSHOT_ROOT", tmp_path / "snapshots")
+    DatabaseManager().create_tables(connect())
+    old_root, new_root = tmp_path / "old", tmp_path / "new"
+    (old_root / "ProjA").mkdir(parents=True)
+    new_root.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (old_root / "ProjA" / name).write_text(name)
+
+    with connect() as conn:
+        migration_id = conn.execute(
+            "INSERT INTO migrations (name, old_root, new_root) VALUES ('Async', ?, ?)", (str(old_root), str(new_root))
+        ).lastrowid
+        site_id = conn.execute("INSERT INTO sites (name, migration_id) VALUES ('Site', ?)", (migration_id,)).lastrowid
+        client_id = conn.execute("INSERT INTO clients (name, migration_id) VALUES ('Client', ?)", (migration_id,)).lastrowid
+        conn.execute(
+            "INSERT INTO projects (name, site_id, client_id, migration_id) VALUES ('projA', ?, ?, ?)",
+            (site_id, client_id, migration_id),
+        )
+    return connect().execute("SELECT * FROM migrations WHERE id = ?", (migration_id,)).fetchone()
+
+def test_jobs_run_the_engines_and_stream_progress(migration, tmp_path):
+    async def run():
+        assert (await start_scan(migration, workers=2))["files"] == 3
+        await aio.run(classify_files, migration)
+        job = start_copy(migration, interval=0.01, batch_size=1)
+        updates = [update async for update in job.progress()]
+        assert updates[-1]["summary"]["copied"] == 3 and updates[-1]["counts"]["copied"][0] == 3
+        assert (await job)["copied"] == 3
+
+        assert (await start_verify(migration))["verified"] == 3
+        batches = [batch async for batch in aio.FileDAO.iter_batches(migration["id"], ("verified",), batch_size=2)]
+        assert [len(batch) for batch in batches] == [2, 1]
+        assert aio.FileDAO.count_by_status is aio.FileDAO.count_by_status  # wrapped once
+
+        failing = start_verify(migration, interval=0.01, workers=0)
+        assert "error" in [update async for update in failing.progress()][-1]
+        with pytest.raises(ValueError):
+            await failing
+
+    asyncio.run(run())
+    assert (tmp_path / "new" / "Site" / "Client" / "projA" / "c.txt").read_text() == "c.txt"
+    with pytest.raises(ValueError):
+        MigrationJob("plan", migration)
@@ -0,0 +1,47 @@
+# test_bulk_import.py
+import sqlite3
+
+import pytest
+
+from database import DatabaseManager
+from database.bulk_import import BulkImportError, import_clients, import_projects
+
+
+@pytest.fixture
+def migration_id(in_memory_db):
+    """Creates a migration with one site and one existing client."""
+    in_memory_db.row_factory = sqlite3.Row
+    DatabaseManager().create_tables(in_memory_db)
+    with in_memory_db as conn:
+        migration_id = conn.execute(
+            "INSERT INTO migrations (name, old_root, new_root) VALUES ('Bulk Import', '/old', '/new')"
+        ).lastrowid
+        conn.execute("INSERT INTO sites (name, migration_id) VALUES ('London', ?)", (migration_id,))
+        conn.execute("INSERT INTO clients (name, migration_id) VALUES ('Acme', ?)", (migration_id,))
+    yield migration_id
+    with in_memory_db as conn:
+        conn.execute("DELETE FROM migrations WHERE id = ?", (migration_id,))
+
+def test_import_clients_then_projects(migration_id, in_memory_db, tmp_path):
+    clients = tmp_path / "clients.csv"
+    clients.write_text("Client Name\nAcme\nGlobex\nInitech\n")
+    assert import_clients(clients, migration_id) == {"imported": 2, "skipped": 1}
+
+    projects = tmp_path / "projects.csv"
+    projects.write_text("project,site,client\nP1,London,acme\nP2,london,Globex\n")
+    assert import_projects(projects, migration_id) == {"imported": 2, "skipped": 0}
+    assert import_projects(projects, migration_id) == {"imported": 0, "skipped": 2}
+
+def test_import_reports_every_error_and_imports_nothing(migration_id, in_memory_db, tmp_path):
+    projects = tmp_path / "projects.csv"
+    projects.write_text("name,site,client\nP1,Paris,Acme\n,London,Nobody\nP3,London,Acme\nP3,London,Acme\n")
+    with pytest.raises(BulkImportError) as error:
+        import_projects(projects, migration_id)
+    assert error.value.errors == [
+        (2, "unknown site 'Paris'"),
+        (3, "project name is empty"),
+        (3, "unknown client 'Nobody'"),
+        (5, "duplicate project 'P3' (first on line 4)"),
+    ]
+    count = in_memory_db.execute("SELECT COUNT(*) FROM projects WHERE migration_id = ?", (migration_id,)).fetchone()[0]
+    assert count == 0
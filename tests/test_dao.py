@@ -1,6 +1,9 @@
 # test_dao.py
+import sqlite3
+
 import pytest
-from database import BaseDAO
+import database.database
+from database import BaseDAO, ConflictError
 
 class TestDAO(BaseDAO):
     """Mock DAO for testing BaseDAO functionality."""
@@ -89,4 +92,37 @@ def test_delete_non_existing_record(in_memory_db):
     try:
         TestDAO.delete(9999)
     except Exception as e:
-        pytest.fail(f"delete() raised an unexpected exception: {e}")
\ No newline at end of file
+        pytest.fail(f"delete() raised an unexpected exception: {e}")
+
+def test_update_with_stale_version_conflicts(in_memory_db):
+    class VersionedDAO(BaseDAO):
+        _table = "versioned_table"
+        _requires_migration = False
+
+    with in_memory_db as conn:
+        conn.execute("CREATE TABLE versioned_table (id INTEGER PRIMARY KEY, name TEXT, version INTEGER NOT NULL DEFAULT 0)")
+        conn.execute("INSERT INTO versioned_table (name) VALUES ('first')")
+    try:
+        VersionedDAO.update(1, expected_version=0, name="mine")
+        assert tuple(VersionedDAO.get(1)) == (1, "mine", 1)
+        with pytest.raises(ConflictError):
+            VersionedDAO.update(1, expected_version=0, name="theirs")
+        VersionedDAO.update(1, name="unchecked")
+        assert VersionedDAO.get(1)[2] == 2
+    finally:
+        with in_memory_db as conn:
+            conn.execute("DROP TABLE versioned_table")
+
+def test_retry_on_busy_backs_off_until_unlocked(monkeypatch):
+    monkeypatch.setattr(database.database, "RETRY_BASE_DELAY", 0)
+    attempts = []
+
+    @database.database.retry_on_busy
+    def write():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise sqlite3.OperationalError("database is locked")
+        return "done"
+
+    assert write() == "done"
+    assert len(attempts) == 3
@@ -0,0 +1,55 @@
+# test_delta.py
+import os
+
+import pytest
+
+import engines.delta
+from engines.delta import Signature, compute_delta, delta_transfer
+from engines.throttle import SiteThrottle
+
+BLOCK = 1024
+
+
+@pytest.fixture(params=["numpy", "python"])
+def rolling(request, monkeypatch):
+    """Runs each test with the NumPy rolling search and with the pure Python fallback."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(engines.delta, "numpy", None)
+
+
+@pytest.fixture
+def target(tmp_path):
+    path = tmp_path / "target.bin"
+    path.write_bytes(os.urandom(BLOCK * 8 + 100))
+    return path
+
+
+def sync(tmp_path, target, new_content):
+    source = tmp_path / "source.bin"
+    source.write_bytes(new_content)
+    signature, sent = delta_transfer(source, target, Signature.of_file(target, BLOCK), SiteThrottle(1))
+    assert target.read_bytes() == new_content
+    assert signature.to_row(1) == Signature.of_file(target, BLOCK).to_row(1)
+    return sent
+
+def test_in_place_edit_sends_changed_block(rolling, tmp_path, target):
+    content = bytearray(target.read_bytes())
+    content[3 * BLOCK + 10:3 * BLOCK + 20] = b"x" * 10
+    inode = target.stat().st_ino
+    assert sync(tmp_path, target, bytes(content)) == BLOCK
+    assert target.stat().st_ino == inode  # patched in place
+
+def test_insertion_resynchronises(rolling, tmp_path, target):
+    content = target.read_bytes()
+    assert sync(tmp_path, target, content[:2 * BLOCK + 7] + b"inserted" + content[2 * BLOCK + 7:]) == BLOCK + 8
+
+def test_truncate_and_append(rolling, tmp_path, target):
+    content = target.read_bytes()
+    assert sync(tmp_path, target, content[:5 * BLOCK]) == 0
+    assert sync(tmp_path, target, content[:5 * BLOCK] + b"tail") == 4
+
+def test_unrelated_content_is_all_literal(rolling, target):
+    data = os.urandom(BLOCK * 3)
+    assert compute_delta(data, Signature.of_file(target, BLOCK)) == [(0, len(data), None)]
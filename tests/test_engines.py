@@ -0,0 +1,400 @@
+# test_engines.py
+import errno
+import io
+import os
+import sqlite3
+import stat
+import sys
+import tarfile
+
+import pytest
+
+from database import DatabaseManager, FileDAO, FileRangeDAO, FileSignatureDAO, PathConflictDAO, PreflightFailureDAO
+from engines import (
+    bundle_files, classify_files, copy_files, plan_targets, replay_metadata, run_preflight, scan_migration,
+    unbundle_files, verify_files,
+)
+from engines.bundle import extract_bundle
+from engines.delta import Signature
+from engines.lease import WorkLease
+from engines.metadata import apply_metadata, pack_xattrs
+from engines.ranges import copy_range
+from engines.watch import InventoryWatcher
+
+
+@pytest.fixture
+def migration(in_memory_db, tmp_path, monkeypatch):
+    """Creates a migration with one site, client and project over a small source tree."""
+    in_memory_db.row_factory = sqlite3.Row  # the DAOs and engines access columns by name
+    monkeypatch.setattr("engines.snapshot.SNAPSHOT_ROOT", tmp_path / "snapshots")
+    DatabaseManager().create_tables(in_memory_db)
+    old_root, new_root = tmp_path / "old", tmp_path / "new"
+    (old_root / "ProjA" / "sub").mkdir(parents=True)
+    (old_root / "Unknown").mkdir()
+    new_root.mkdir()
+    (old_root / "ProjA" / "a.txt").write_text("alpha")
+    (old_root / "ProjA" / "sub" / "b.txt").write_text("beta")
+    (old_root / "Unknown" / "c.txt").write_text("gamma")
+
+    with in_memory_db as conn:
+        migration_id = conn.execute(
+            "INSERT INTO migrations (name, old_root, new_root) VALUES (?, ?, ?)",
+            ("Engine Test", str(old_root), str(new_root)),
+        ).lastrowid
+        site_id = conn.execute("INSERT INTO sites (name, migration_id) VALUES ('Site', ?)", (migration_id,)).lastrowid
+        client_id = conn.execute("INSERT INTO clients (name, migration_id) VALUES ('Client', ?)", (migration_id,)).lastrowid
+        conn.execute(
+            "INSERT INTO projects (name, site_id, client_id, migration_id) VALUES ('projA', ?, ?, ?)",
+            (site_id, client_id, migration_id),
+        )
+    yield in_memory_db.execute("SELECT * FROM migrations WHERE id = ?", (migration_id,)).fetchone()
+    with in_memory_db as conn:
+        conn.execute("DELETE FROM migrations WHERE id = ?", (migration_id,))
+
+def test_scan_classify_copy_verify(migration, tmp_path):
+    assert scan_migration(migration, workers=2, batch_size=2)["files"] == 3
+    assert classify_files(migration)["unclassified"] == 1
+    summary = copy_files(migration, workers=2, batch_size=1)
+    assert (summary["copied"], summary["failed"], summary["bytes"]) == (2, 0, 9)
+    assert (tmp_path / "new" / "Site" / "Client" / "projA" / "sub" / "b.txt").read_text() == "beta"
+    assert verify_files(migration)["verified"] == 2
+
+    counts = FileDAO.count_by_status(migration["id"])
+    assert counts["verified"][0] == 2
+    assert counts["unclassified"][0] == 1
+
+def test_rescan_resets_changed_and_removes_missing(migration, tmp_path):
+    scan_migration(migration)
+    classify_files(migration)
+    copy_files(migration)
+
+    (tmp_path / "old" / "ProjA" / "a.txt").write_text("alpha, edited")
+    (tmp_path / "old" / "ProjA" / "sub" / "b.txt").unlink()
+    summary = scan_migration(migration)
+
+    assert summary["removed"] == 1
+    counts = FileDAO.count_by_status(migration["id"])
+    assert counts["pending"][0] == 1
+    assert "copied" not in counts
+
+@pytest.mark.parametrize("mode,method", [("move", "rename"), ("link", "hardlink")])
+def test_same_filesystem_fast_paths(migration, tmp_path, mode, method):
+    scan_migration(migration)
+    classify_files(migration)
+    summary = copy_files(migration, mode=mode)
+    assert summary["methods"] == {method: 2}
+    assert (tmp_path / "new" / "Site" / "Client" / "projA" / "a.txt").read_text() == "alpha"
+    assert (tmp_path / "old" / "ProjA" / "a.txt").exists() == (mode == "link")
+    assert verify_files(migration)["verified"] == 2
+
+    # Moved files are gone from old_root on purpose; a rescan must not drop them from the inventory.
+    scan_migration(migration)
+    assert FileDAO.count_by_status(migration["id"])["verified"][0] == 2
+
+def test_unsupported_reflink_is_tried_once_per_filesystem(migration, tmp_path, monkeypatch):
+    clones = []
+
+    def ioctl(fd, request, arg):
+        clones.append(fd)
+        raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+    monkeypatch.setattr("engines.fastpath.fcntl.ioctl", ioctl)
+    scan_migration(migration)
+    classify_files(migration)
+    assert copy_files(migration, workers=1)["methods"] == {"copy": 2}
+    assert len(clones) == 1
+    assert not list((tmp_path / "new").rglob("*.odie-tmp"))
+
+@pytest.mark.parametrize("extract", [True, False])
+def test_bundle_small_files(migration, tmp_path, extract):
+    scan_migration(migration)
+    classify_files(migration)
+    summary = bundle_files(migration, bundle_size=4, extract=extract)
+    assert (summary["bundled"], summary["bundles"], summary["failed"]) == (2, 2, 0)
+    if not extract:
+        assert FileDAO.count_by_status(migration["id"])["bundled"][0] == 2
+        summary = unbundle_files(migration)
+    assert (summary["extracted"], summary["extract_errors"]) == (2, 0)
+    assert (tmp_path / "new" / "Site" / "Client" / "projA" / "sub" / "b.txt").read_text() == "beta"
+    assert not list((tmp_path / "new" / ".odie-bundles").iterdir())
+    assert verify_files(migration)["verified"] == 2
+
+@pytest.mark.parametrize("name", ["../outside/x.txt", "sub/../../outside/x.txt"])
+def test_extract_bundle_creates_nothing_outside_new_root(tmp_path, name):
+    new_root = tmp_path / "new"
+    new_root.mkdir()
+    archive = tmp_path / "evil.tar"
+    with tarfile.open(archive, "w") as tar:
+        info = tarfile.TarInfo(name)
+        info.size = 1
+        tar.addfile(info, io.BytesIO(b"x"))
+    with pytest.raises(tarfile.TarError):
+        extract_bundle(archive, new_root)
+    assert not (tmp_path / "outside").exists()
+
+def test_delta_mode_caches_signatures(migration, tmp_path, in_memory_db, monkeypatch):
+    monkeypatch.setattr("engines.copy.DELTA_MIN_SIZE", 0)
+    scan_migration(migration)
+    classify_files(migration)
+    assert copy_files(migration, mode="delta")["methods"] == {"copy": 2}
+    target = tmp_path / "new" / "Site" / "Client" / "projA" / "a.txt"
+    ids = {row["path"]: row["id"] for row in FileDAO.get_all_for_migration(migration["id"])}
+    cached = FileSignatureDAO.get_many(ids.values())
+    assert len(cached) == 2  # signed while copied, so the first sync need not hash the targets
+    assert dict(cached[ids["ProjA/a.txt"]]) == Signature.of_file(target).to_row(ids["ProjA/a.txt"])
+
+    (tmp_path / "old" / "ProjA" / "a.txt").write_text("alpha, edited")
+    scan_migration(migration)
+    monkeypatch.setattr("engines.delta.Signature.of_file", None)  # the first copy's signature is used
+    assert copy_files(migration, mode="delta")["methods"] == {"delta": 1}
+    assert target.read_text() == "alpha, edited"
+    assert in_memory_db.execute("SELECT COUNT(*) FROM file_signatures").fetchone()[0] == 2
+    assert verify_files(migration)["verified"] == 2
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_watcher_applies_events(migration, tmp_path):
+    scan_migration(migration)
+    old_root = tmp_path / "old"
+    watcher = InventoryWatcher(migration).start()
+    try:
+        (old_root / "ProjA" / "a.txt").write_text("alpha, edited")
+        (old_root / "ProjA" / "sub" / "b.txt").unlink()
+        (old_root / "ProjA" / "new" / "deep").mkdir(parents=True)
+        (old_root / "ProjA" / "new" / "deep" / "d.txt").write_text("delta")
+        (old_root / "Unknown").rename(old_root / "Renamed")
+        for _ in range(3):
+            watcher.poll(timeout=0.1)
+        watcher.flush()
+    finally:
+        watcher.close()
+
+    paths = {row["path"]: row["size"] for batch in FileDAO.iter_batches(migration["id"], None, classified_only=False)
+             for row in batch}
+    assert paths == {"ProjA/a.txt": 13, "ProjA/new/deep/d.txt": 5, "Renamed/c.txt": 5}
+
+def test_plan_finds_target_conflicts(migration, tmp_path):
+    old_root = tmp_path / "old"
+    (old_root / "proja").mkdir()
+    (old_root / "proja" / "a.txt").write_text("same target")       # both folders classify to projA
+    (old_root / "ProjA" / "A.TXT").write_text("case")
+    (old_root / "ProjA" / "caf\u00e9").write_text("nfc")
+    (old_root / "ProjA" / "cafe\u0301").write_text("nfd")
+    (old_root / "ProjA" / "SUB").write_text("file where a directory is")
+    (old_root / "ProjA" / "what?.txt").write_text("invalid")
+    (old_root / "ProjA" / ("l" * 40)).write_text("long")
+    scan_migration(migration)
+    classify_files(migration)
+
+    max_path = len(migration["new_root"]) + 1 + len("Site/Client/projA/") + 30
+    summary = plan_targets(migration, batch_size=3, max_path=max_path)
+
+    assert (summary["planned"], summary["unplanned"]) == (9, 1)
+    assert summary["kinds"] == {
+        "collision": 1, "case": 1, "normalization": 1, "directory": 1, "invalid_name": 1, "path_length": 1,
+    }
+    conflicts = PathConflictDAO.get_page(migration["id"], 0, 20)
+    assert len(conflicts) == 6
+    collision = next(c for c in conflicts if c["kind"] == "collision")
+    assert {collision["path"], collision["other_path"]} == {"ProjA/a.txt", "proja/a.txt"}
+    assert collision["target_path"] == "Site/Client/projA/a.txt"
+
+    # Planning again replaces the previous results.
+    assert plan_targets(migration, max_path=max_path)["conflicts"] == 6
+
+def test_inventory_report_is_cached_per_scan_generation(migration, tmp_path):
+    pytest.importorskip("numpy")
+    from engines.analytics import inventory_report
+    scan_migration(migration)
+    classify_files(migration)
+
+    report = inventory_report(migration, top=2)
+    assert (report["files"], report["bytes"], report["cached"]) == (3, 14, False)
+    assert {(row["path"], row["bytes"]) for row in report["largest_files"]} == {("Unknown/c.txt", 5), ("ProjA/a.txt", 5)}
+    assert report["largest_folders"][0] == {"path": "ProjA", "files": 2, "bytes": 9}
+    assert {row["extension"]: row["files"] for row in report["extensions"]} == {"txt": 3}
+    assert {row["project"]: row["bytes"] for row in report["projects"]} == {"projA": 9, None: 5}
+    assert report["age_buckets"][0]["files"] == 3
+    assert inventory_report(migration, top=2)["cached"]
+
+    (tmp_path / "old" / "ProjA" / "big.bin").write_bytes(b"x" * 100)
+    scan_migration(migration)
+    report = inventory_report(migration, top=2)
+    assert (report["files"], report["cached"]) == (4, False)
+    assert report["largest_files"][0] == {"path": "ProjA/big.bin", "bytes": 100}
+
+    (tmp_path / "old" / "readme.txt").write_bytes(b"x" * 1000)  # in old_root itself, so in no folder
+    scan_migration(migration)
+    assert [row["path"] for row in inventory_report(migration, top=2)["largest_folders"]] == ["ProjA", "Unknown"]
+
+def test_scans_are_kept_as_snapshot_generations(migration, tmp_path, monkeypatch):
+    from engines.snapshot import diff_generations, list_snapshots, take_snapshot
+    monkeypatch.setattr("engines.snapshot.BLOCK_MASK", 0)  # one file per block
+    first = scan_migration(migration)["snapshot"]
+    assert take_snapshot(migration, label="signoff")["generation"] == first
+
+    old = tmp_path / "old"
+    (old / "ProjA" / "a.txt").write_text("alpha, edited")
+    (old / "Unknown" / "c.txt").unlink()
+    (old / "ProjA" / "new.txt").write_text("new")
+    second = scan_migration(migration)["snapshot"]
+    assert [s["generation"] for s in list_snapshots(migration)] == [first, second]
+
+    diff = diff_generations(migration, "signoff", output=tmp_path / "changes.jsonl")
+    assert (diff["from"], diff["to"]) == (first, second)
+    assert (diff["added"], diff["removed"], diff["changed"], diff["unchanged"]) == (1, 1, 1, 1)
+    assert diff["skipped_blocks"] == 1  # ProjA/sub/b.txt is compared without being read
+    assert [(c["change"], c["path"]) for c in diff["changes"]] == [
+        ("changed", "ProjA/a.txt"), ("added", "ProjA/new.txt"), ("removed", "Unknown/c.txt"),
+    ]
+    assert diff["changes"][0]["fields"][0] == "size"
+    assert len((tmp_path / "changes.jsonl").read_text().splitlines()) == 3
+
+
+def test_signoff_snapshot_after_verify_has_digests(migration):
+    from engines.snapshot import open_snapshot, take_snapshot
+    scanned = scan_migration(migration)["snapshot"]
+    classify_files(migration)
+    copy_files(migration)
+    verify_files(migration)
+    signoff = take_snapshot(migration, label="signoff")["generation"]
+    assert signoff > scanned
+    with open_snapshot(migration, "signoff") as snapshot:
+        assert [path for path, _, _, digest in snapshot if digest] == ["ProjA/a.txt", "ProjA/sub/b.txt"]
+    verify_files(migration)  # nothing new to record, so no new generation
+    assert take_snapshot(migration)["generation"] == signoff
+
+
+def test_metadata_is_captured_by_scan_and_replayed(migration, tmp_path):
+    old = tmp_path / "old" / "ProjA"
+    os.chmod(old / "a.txt", 0o600)
+    os.utime(old / "a.txt", (1000000000, 1000000000))
+    try:
+        os.setxattr(old / "a.txt", "user.odie", b"kept")
+        xattrs = True
+    except OSError:
+        xattrs = False  # e.g. tmpfs without user xattrs
+    os.utime(old / "sub", (1100000000, 1100000000))
+    scan_migration(migration)
+    classify_files(migration)
+    copy_files(migration)
+
+    summary = replay_metadata(migration, workers=2, batch_size=1)
+    assert (summary["files"], summary["directories"], summary["failed"]) == (2, 2, 0)
+    assert summary["skipped"] == 1  # Unknown has no project, so no target
+    new = tmp_path / "new" / "Site" / "Client" / "projA"
+    assert (new / "a.txt").stat().st_mtime == 1000000000
+    assert stat.S_IMODE((new / "a.txt").stat().st_mode) == 0o600
+    assert (new / "sub").stat().st_mtime == 1100000000  # set after b.txt, so it stuck
+    if xattrs:
+        assert os.getxattr(new / "a.txt", "user.odie") == b"kept"
+
+
+def test_failed_xattrs_do_not_stop_mode_and_mtime(tmp_path, monkeypatch):
+    path = tmp_path / "f"
+    path.write_text("x")
+    attempted = []
+
+    def setxattr(path, name, value, follow_symlinks=True):
+        attempted.append(name)
+        raise PermissionError(1, "Operation not permitted")
+
+    monkeypatch.setattr("engines.metadata.os.setxattr", setxattr)
+    blob = pack_xattrs({"security.selinux": b"ctx", "user.odie": b"kept"})
+    row = {"uid": None, "gid": None, "xattrs": blob, "mode": 0o640, "mtime": 1000000000}
+    assert apply_metadata(path, row, False, privileged=False) == ["user.odie: [Errno 1] Operation not permitted"]
+    assert attempted == ["user.odie"]  # security.* is left alone without root
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640 and path.stat().st_mtime == 1000000000
+    assert len(apply_metadata(path, row, False, privileged=True)) == 2
+
+
+def test_preflight_records_capacity_and_permission_failures(migration, tmp_path, monkeypatch):
+    scan_migration(migration)
+    classify_files(migration)
+    summary = run_preflight(migration, workers=2, batch_size=1)
+    assert (summary["source_directories"], summary["failed"]) == (2, 0)  # ProjA and ProjA/sub
+    assert summary["filesystems"][0]["required_bytes"] == 9
+    assert summary["filesystems"][0]["required_inodes"] == 4  # 2 files, ProjA and ProjA/sub
+    linked = run_preflight({**dict(migration), "transfer_mode": "link"})["filesystems"][0]
+    assert (linked["required_bytes"], linked["required_inodes"]) == (0, 2)  # hardlinks reuse the source inodes
+
+    (tmp_path / "old" / "ProjA" / "sub" / "b.txt").unlink()
+    (tmp_path / "old" / "ProjA" / "sub").rmdir()
+    full = os.statvfs_result((4096, 4096, 1000, 0, 0, 1000, 10, 10, 0, 255))
+    monkeypatch.setattr("engines.preflight.os.statvfs", lambda path: full)
+    summary = run_preflight(migration)
+    assert summary["kinds"] == {"unreadable": 1, "space": 1, "inodes": 1}
+    failures = PreflightFailureDAO.get_page(migration["id"], 0, 10)
+    assert [f["path"] for f in failures if f["kind"] == "unreadable"] == [str(tmp_path / "old" / "ProjA" / "sub")]
+
+
+def test_leases_split_files_between_workers(migration, tmp_path):
+    scan_migration(migration)
+    classify_files(migration)
+    first = WorkLease(migration["id"], ("pending",), batch_size=1, owner="first")
+    second = WorkLease(migration["id"], ("pending",), batch_size=1, owner="second", duration=-1)
+    [claimed] = next(second.batches())  # already expired, as if the worker had died
+    assert [row["id"] for row in next(first.batches())] == [claimed["id"]]  # reclaimed
+    assert [row["id"] for row in next(first.batches())] != [claimed["id"]]
+
+    second.complete([{"id": claimed["id"], "status": "copied"}])
+    assert second.lost == 1 and FileDAO.get(claimed["id"])["status"] == "pending"
+    FileDAO.release_leases("first")
+
+    summary = copy_files(migration, batch_size=1, lease=60)
+    assert (summary["copied"], summary["lost"]) == (2, 0)
+    assert verify_files(migration, lease=60)["verified"] == 2
+    assert not FileDAO.release_leases(summary["worker"])
+
+
+def test_large_files_are_copied_as_sparse_resumable_ranges(migration, tmp_path, monkeypatch):
+    monkeypatch.setattr("engines.copy.RANGE_MIN_SIZE", 4096)
+    monkeypatch.setattr("engines.ranges.RANGE_SIZE", 256 * 1024)
+    big = tmp_path / "old" / "ProjA" / "big.bin"
+    with open(big, "wb") as f:
+        f.truncate(1024 * 1024)
+        f.write(b"head")
+        f.seek(700 * 1024)
+        f.write(b"tail")
+    scan_migration(migration)
+    classify_files(migration)
+    copied = []
+
+    def interrupted(source, partial, start, length, throttle):
+        if copied:
+            raise OSError("interrupted")
+        copied.append(start)
+        copy_range(source, partial, start, length, throttle)
+
+    from engines import copy
+    copy_large, saved_before = copy._copy_large, []
+
+    def record_saved(*args):
+        saved_before.append(FileDAO.count_by_status(migration["id"]).get("copied", (0,))[0])
+        return copy_large(*args)
+
+    monkeypatch.setattr("engines.ranges.copy_range", interrupted)
+    monkeypatch.setattr("engines.copy._copy_large", record_saved)
+    assert copy_files(migration, workers=1)["failed"] == 1
+    assert saved_before == [2]  # the small files of the batch were recorded before the large copy started
+    [row] = next(FileDAO.iter_batches(migration["id"], ("failed",)))
+    assert [r["done"] for r in FileRangeDAO.get_for_file(row["id"])] == [1, 0]  # the holes at 256K and 768K are skipped
+
+    monkeypatch.setattr("engines.ranges.copy_range", lambda *args: copied.append(args[2]) or copy_range(*args))
+    summary = copy_files(migration, workers=2, retry_failed=True)
+    assert summary["methods"] == {"range": 1} and copied == [0, 512 * 1024]  # resumed at the unfinished range
+    target = tmp_path / "new" / "Site" / "Client" / "projA" / "big.bin"
+    assert target.read_bytes() == big.read_bytes()
+    assert target.stat().st_blocks * 512 < 1024 * 1024  # still sparse
+    assert not FileRangeDAO.get_for_file(row["id"])
+
+
+def test_leased_retry_does_not_reclaim_files_it_failed(migration, tmp_path):
+    scan_migration(migration)
+    classify_files(migration)
+    (tmp_path / "old" / "ProjA" / "a.txt").unlink()
+    for _ in range(2):  # the second round retries the failed file once more, and stops
+        summary = copy_files(migration, batch_size=1, retry_failed=True, lease=60)
+        assert summary["failed"] == 1
+    assert summary["copied"] == 0
+    assert not FileDAO.release_leases(summary["worker"])
+    assert FileDAO.count_by_status(migration["id"])["failed"][0] == 1
@@ -0,0 +1,51 @@
+# test_instrumentation.py
+import sqlite3
+
+import database.instrumentation
+from database.instrumentation import InstrumentedConnection, QueryStats, normalize_sql
+
+
+def make_connection(stats):
+    conn = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+    conn.query_stats = stats
+    conn.set_trace_callback(stats.trace)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    return conn
+
+def test_records_counts_and_rows():
+    stats = QueryStats()
+    conn = make_connection(stats)
+    conn.executemany("INSERT INTO items (name) VALUES (?)", [("a",), ("b",), ("c",)])
+    for _ in range(2):
+        conn.execute("SELECT * FROM items").fetchall()
+
+    by_sql = {s.sql: s for s in stats.top()}
+    select = by_sql["SELECT * FROM items"]
+    assert select.calls == 2
+    assert select.rows == 6
+    assert sum(select.histogram) == 2
+    assert by_sql["INSERT INTO items (name) VALUES (?)"].rows == 3
+    assert stats.verb_counts["SELECT"] == 2
+
+def test_slow_query_threshold():
+    stats = QueryStats(slow_query_ms=0)
+    conn = make_connection(stats)
+    conn.execute("SELECT 1").fetchone()
+    assert any(sql == "SELECT 1" for _, sql, _ in stats.slow_queries)
+
+def test_reset_and_normalize():
+    stats = QueryStats()
+    stats.record("SELECT  *\n FROM items", 1.0)
+    assert stats.top()[0].sql == normalize_sql("SELECT * FROM items")
+    stats.reset()
+    assert stats.top() == []
+
+def test_iterated_rows_reuse_the_statement_key(monkeypatch):
+    stats = QueryStats()
+    conn = make_connection(stats)
+    conn.executemany("INSERT INTO items (name) VALUES (?)", [(str(i),) for i in range(50)])
+    normalized = []
+    monkeypatch.setattr(database.instrumentation, "normalize_sql", lambda sql: normalized.append(sql) or sql)
+    assert len(list(conn.execute("SELECT * FROM items"))) == 50
+    assert normalized == ["SELECT * FROM items"]
+    assert {s.sql: s for s in stats.top()}["SELECT * FROM items"].rows == 50
@@ -0,0 +1,133 @@
+# test_inventory.py
+import sqlite3
+
+import pytest
+
+from database import DatabaseManager, MigrationDAO
+from database.inventory import export_inventory, import_inventory
+
+
+@pytest.fixture
+def migrations(in_memory_db):
+    """Creates a source migration with a small inventory and an empty target migration."""
+    in_memory_db.row_factory = sqlite3.Row
+    DatabaseManager().create_tables(in_memory_db)
+    with in_memory_db as conn:
+        source_id = conn.execute(
+            "INSERT INTO migrations (name, old_root, new_root) VALUES ('Inventory Source', '/old', '/new')"
+        ).lastrowid
+        target_id = conn.execute(
+            "INSERT INTO migrations (name, old_root, new_root) VALUES ('Inventory Target', '/old', '/new')"
+        ).lastrowid
+        site_id = conn.execute("INSERT INTO sites (name, migration_id) VALUES ('Site', ?)", (source_id,)).lastrowid
+        client_id = conn.execute("INSERT INTO clients (name, migration_id) VALUES ('Client', ?)", (source_id,)).lastrowid
+        project_id = conn.execute(
+            "INSERT INTO projects (name, site_id, client_id, migration_id) VALUES ('Proj', ?, ?, ?)",
+            (site_id, client_id, source_id),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO files (name, path, size, mtime, project_id, migration_id) VALUES (?, ?, ?, ?, ?, ?)",
+            [(f"f{i}.txt", f"Proj/f{i}.txt", i, 1.5, project_id, source_id) for i in range(5)],
+        )
+    source = in_memory_db.execute("SELECT * FROM migrations WHERE id = ?", (source_id,)).fetchone()
+    yield source, target_id
+    with in_memory_db as conn:
+        conn.execute("DELETE FROM migrations WHERE id IN (?, ?)", (source_id, target_id))
+
+@pytest.mark.parametrize("fmt,compress,chunk_rows", [("csv", False, 0), ("csv", True, 2), ("jsonl", True, 0)])
+def test_export_import_round_trip(migrations, in_memory_db, tmp_path, fmt, compress, chunk_rows):
+    source, target_id = migrations
+    exported = export_inventory(source, tmp_path, fmt=fmt, compress=compress, chunk_rows=chunk_rows, batch_size=2)
+    assert exported["files"]["rows"] == 5
+    assert len(exported["files"]["parts"]) == (3 if chunk_rows else 1)
+
+    assert import_inventory(tmp_path, target_id) == {"sites": 1, "clients": 1, "projects": 1, "files": 5}
+    # Importing again updates in place instead of duplicating.
+    import_inventory(tmp_path, target_id)
+
+    files = in_memory_db.execute(
+        "SELECT f.path, f.size, f.mtime, p.name FROM files f JOIN projects p ON p.id = f.project_id "
+        "WHERE f.migration_id = ? ORDER BY f.path", (target_id,)
+    ).fetchall()
+    assert [tuple(row) for row in files] == [(f"Proj/f{i}.txt", i, 1.5, "Proj") for i in range(5)]
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_metadata_and_directories_round_trip(migrations, in_memory_db, tmp_path, fmt):
+    source, target_id = migrations
+    xattrs = b"\x06\x00user.a\x00\x03\x00\x00\x00\xff\n,"
+    with in_memory_db as conn:
+        conn.execute("UPDATE files SET mode = 33188, xattrs = ? WHERE migration_id = ?", (xattrs, source["id"]))
+        conn.execute(
+            "INSERT INTO directories (path, depth, mode, xattrs, migration_id) VALUES ('Proj/sub', 1, 16877, ?, ?)",
+            (xattrs, source["id"]),
+        )
+    assert export_inventory(source, tmp_path, fmt=fmt)["directories"]["rows"] == 1
+    assert import_inventory(tmp_path, target_id)["directories"] == 1
+
+    files = in_memory_db.execute("SELECT mode, xattrs FROM files WHERE migration_id = ?", (target_id,)).fetchall()
+    assert {tuple(row) for row in files} == {(33188, xattrs)}
+    directory = in_memory_db.execute(
+        "SELECT path, depth, mode, xattrs FROM directories WHERE migration_id = ?", (target_id,)
+    ).fetchone()
+    assert tuple(directory) == ("Proj/sub", 1, 16877, xattrs)
+
+def test_import_rolls_back_on_error(migrations, in_memory_db, tmp_path):
+    _, target_id = migrations
+    (tmp_path / "files.jsonl").write_text('{"path": "a.txt", "size": 1}\n{"size": 2}\n')
+    with pytest.raises(ValueError):
+        import_inventory(tmp_path, target_id)
+    count = in_memory_db.execute("SELECT COUNT(*) FROM files WHERE migration_id = ?", (target_id,)).fetchone()[0]
+    assert count == 0
+
+def test_import_rejects_projects_of_other_migrations_sites(migrations, in_memory_db, tmp_path):
+    source, target_id = migrations
+    export_inventory(source, tmp_path, fmt="jsonl", tables=["projects"])
+    with pytest.raises(ValueError, match="sites id"):
+        import_inventory(tmp_path, target_id)  # the source migration's site ids, without the sites
+    count = in_memory_db.execute("SELECT COUNT(*) FROM projects WHERE migration_id = ?", (target_id,)).fetchone()[0]
+    assert count == 0
+    assert import_inventory(tmp_path, source["id"])["projects"] == 1  # the migration's own ids are kept
+
+@pytest.mark.parametrize("include_files", [False, True])
+def test_clone_migration_remaps_ids(migrations, in_memory_db, include_files):
+    source, _ = migrations
+    with in_memory_db as conn:
+        conn.execute("UPDATE files SET status = 'copied' WHERE migration_id = ?", (source["id"],))
+        conn.execute("UPDATE projects SET priority = 3 WHERE migration_id = ?", (source["id"],))
+        conn.execute(
+            "INSERT INTO transfer_schedules (migration_id, site_id, start_time, end_time) "
+            "SELECT migration_id, id, '20:00', '06:00' FROM sites WHERE migration_id = ?", (source["id"],)
+        )
+        conn.execute("UPDATE files SET mode = 416, uid = 7, xattrs = x'00' WHERE migration_id = ?", (source["id"],))
+        conn.execute(
+            "INSERT INTO directories (migration_id, path, depth, mode) VALUES (?, 'Proj/sub', 1, 488)", (source["id"],)
+        )
+
+    clone_id = MigrationDAO.clone(source["id"], "Inventory Clone", new_root="/phase2", include_files=include_files)
+    clone = MigrationDAO.get(clone_id)
+    assert (clone["old_root"], clone["new_root"]) == ("/old", "/phase2")
+    project = in_memory_db.execute(
+        "SELECT p.name, p.priority, s.migration_id, c.migration_id FROM projects p "
+        "JOIN sites s ON s.id = p.site_id JOIN clients c ON c.id = p.client_id WHERE p.migration_id = ?", (clone_id,)
+    ).fetchall()
+    assert [tuple(row) for row in project] == [("Proj", 3, clone_id, clone_id)]
+    schedule = in_memory_db.execute(
+        "SELECT s.migration_id FROM transfer_schedules t JOIN sites s ON s.id = t.site_id WHERE t.migration_id = ?",
+        (clone_id,),
+    ).fetchall()
+    assert [row[0] for row in schedule] == [clone_id]
+    files = in_memory_db.execute(
+        "SELECT f.status, p.migration_id FROM files f JOIN projects p ON p.id = f.project_id WHERE f.migration_id = ?",
+        (clone_id,),
+    ).fetchall()
+    assert [tuple(row) for row in files] == ([("pending", clone_id)] * 5 if include_files else [])
+    metadata = in_memory_db.execute(
+        "SELECT DISTINCT mode, uid, xattrs FROM files WHERE migration_id = ?", (clone_id,)
+    ).fetchall()
+    assert [tuple(row) for row in metadata] == ([(416, 7, b"\x00")] if include_files else [])
+    directories = in_memory_db.execute(
+        "SELECT path, depth, mode FROM directories WHERE migration_id = ?", (clone_id,)
+    ).fetchall()
+    assert [tuple(row) for row in directories] == ([("Proj/sub", 1, 488)] if include_files else [])
+    with in_memory_db as conn:
+        conn.execute("DELETE FROM migrations WHERE id = ?", (clone_id,))
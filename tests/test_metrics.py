@@ -0,0 +1,54 @@
+# test_metrics.py
+import json
+import threading
+import urllib.request
+
+from helpers.metrics import MetricsExporter, Registry, prometheus_text, snapshot
+
+
+def test_per_thread_counters_and_histograms_add_up():
+    registry = Registry()
+    files = registry.counter("test_files_total", "Files", ("stage",)).labels("copy")
+    latency = registry.histogram("test_seconds", "Latency", buckets=(0.1, 1))
+
+    def work():
+        for _ in range(1000):
+            files.inc()
+        latency.observe(0.05)
+        latency.observe(5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert files.value() == 4000
+    assert len(files._cells._cells) <= 1  # the ended threads were folded into the base total
+    text = prometheus_text(registry)
+    assert 'test_files_total{stage="copy"} 4000' in text
+    assert 'test_seconds_bucket{le="0.1"} 4' in text
+    assert 'test_seconds_bucket{le="+Inf"} 8' in text
+    assert "test_seconds_count 8" in text
+    assert snapshot(registry)["test_files_total"] == {"stage=copy": 4000}
+
+def test_exporter_writes_jsonl_and_serves_prometheus_text(tmp_path):
+    registry = Registry()
+    registry.counter("test_bytes_total", "Bytes").inc(10)
+    registry.gauge("test_depth", "Depth").set(3)
+    with MetricsExporter(tmp_path, interval=3600, port=0, registry=registry) as exporter:
+        with urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/metrics") as response:
+            assert "test_bytes_total 10" in response.read().decode()
+        exporter.write()
+        registry.counter("test_bytes_total", "Bytes").inc(5)
+
+    lines = [json.loads(line) for line in (tmp_path / "metrics.jsonl").read_text().splitlines()]
+    assert [line["metrics"]["test_bytes_total"] for line in lines] == [10, 15]
+    assert lines[1]["rates"]["test_bytes_total"] > 0 and "test_depth" not in lines[1]["rates"]
+    assert "test_depth 3" in (tmp_path / "odie.prom").read_text()
+
+def test_failed_final_write_is_ignored(tmp_path):
+    exporter = MetricsExporter(tmp_path / "metrics", interval=3600, registry=Registry()).start()
+    (tmp_path / "metrics").rename(tmp_path / "gone")
+    (tmp_path / "metrics").write_text("not a directory")
+    exporter.stop()
@@ -0,0 +1,94 @@
+# test_priority.py
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from database import DatabaseManager
+from engines.priority import TransferQueue, decayed_rate, forecast
+
+
+@pytest.fixture
+def migration(in_memory_db):
+    """A migration with two sites; site A has an urgent and a normal project, site B one normal project."""
+    in_memory_db.row_factory = sqlite3.Row
+    DatabaseManager().create_tables(in_memory_db)
+    with in_memory_db as conn:
+        migration_id = conn.execute(
+            "INSERT INTO migrations (name, old_root, new_root) VALUES ('Priority Test', '/old', '/new')"
+        ).lastrowid
+        client_id = conn.execute("INSERT INTO clients (name, migration_id) VALUES ('C', ?)", (migration_id,)).lastrowid
+        projects = {}
+        site_projects = {"A": [("a1", 0, "2026-02-28"), ("urgent", 5, None)], "B": [("b1", 0, None)]}
+        for site, rows in site_projects.items():
+            site_id = conn.execute("INSERT INTO sites (name, migration_id) VALUES (?, ?)", (site, migration_id)).lastrowid
+            for name, priority, cutover in rows:
+                projects[name] = conn.execute(
+                    "INSERT INTO projects (name, site_id, client_id, migration_id, priority, cutover_date) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (name, site_id, client_id, migration_id, priority, cutover),
+                ).lastrowid
+        for name, sizes in {"a1": [30, 10, None, 20], "urgent": [5, 1], "b1": [7, 3, 9]}.items():
+            conn.executemany(
+                "INSERT INTO files (name, path, size, status, project_id, migration_id) VALUES (?, ?, ?, 'pending', ?, ?)",
+                [(f"{name}-{i}", f"{name}/{i}", size, projects[name], migration_id) for i, size in enumerate(sizes)],
+            )
+    yield in_memory_db.execute("SELECT * FROM migrations WHERE id = ?", (migration_id,)).fetchone(), projects
+    with in_memory_db as conn:
+        conn.execute("DELETE FROM files WHERE migration_id = ?", (migration_id,))
+        conn.execute("DELETE FROM migrations WHERE id = ?", (migration_id,))
+
+@pytest.mark.parametrize("order,expected", [
+    ("priority", ["urgent/0", "urgent/1", "a1/0", "b1/0", "a1/1", "b1/1", "a1/2", "b1/2", "a1/3"]),
+    ("smallest", ["urgent/1", "urgent/0", "a1/1", "b1/1", "a1/3", "b1/0", "a1/0", "b1/2", "a1/2"]),
+    ("largest", ["urgent/0", "urgent/1", "a1/0", "b1/2", "a1/3", "b1/0", "a1/1", "b1/1", "a1/2"]),
+])
+def test_queue_orders_by_priority_and_interleaves_sites(migration, order, expected):
+    migration, _ = migration
+    batches = list(TransferQueue(migration["id"], order=order, batch_size=2).batches())
+    assert [row["path"] for batch in batches for row in batch] == expected
+    assert all(len(batch) <= 2 for batch in batches)
+
+def test_decayed_rate_of_a_steady_stream():
+    samples = [{"recorded_at": t, "elapsed": 10.0, "bytes": 1000} for t in range(10, 1001, 10)]
+    assert decayed_rate(samples, now=1000.0) == pytest.approx(100.0, rel=0.01)
+    assert decayed_rate([], now=1000.0) is None
+
+def test_forecast_queues_projects_per_site(migration, in_memory_db):
+    migration, projects = migration
+    now = datetime(2026, 3, 1, 12, 0).timestamp()
+    site_a = in_memory_db.execute("SELECT site_id FROM projects WHERE id = ?", (projects["a1"],)).fetchone()[0]
+    with in_memory_db as conn:
+        conn.executemany(
+            "INSERT INTO transfer_samples (migration_id, site_id, project_id, recorded_at, elapsed, files, bytes) "
+            "VALUES (?, ?, ?, ?, 60, 1, 6)",
+            [(migration["id"], site_a, projects["urgent"], now - age) for age in range(0, 900, 60)],
+        )
+
+    result = forecast(migration, now=now)
+    by_name = {project["name"]: project for project in result["projects"]}
+    site_rate = next(site["rate"] for site in result["sites"] if site["id"] == site_a)
+    assert site_rate == pytest.approx(0.1, rel=0.05)
+    assert result["remaining_bytes"] == 6 + 60 + 19
+    # a1 waits for the urgent project on the same site: (6 + 60) bytes at the site's rate.
+    assert datetime.fromisoformat(by_name["a1"]["eta"]).timestamp() == pytest.approx(now + 66 / site_rate, abs=1)
+    assert by_name["a1"]["late"]
+    assert by_name["b1"]["eta"] is None and result["eta"] is None  # no rate known for site B yet
+
+def test_forecast_without_a_date_at_a_tiny_rate(migration, in_memory_db):
+    migration, projects = migration
+    now = datetime(2026, 3, 1, 12, 0).timestamp()
+    site_a = in_memory_db.execute("SELECT site_id FROM projects WHERE id = ?", (projects["a1"],)).fetchone()[0]
+    with in_memory_db as conn:
+        conn.execute("UPDATE files SET size = 500000000000 WHERE path = 'a1/0'")
+        conn.execute(
+            "INSERT INTO transfer_samples (migration_id, site_id, project_id, recorded_at, elapsed, files, bytes) "
+            "VALUES (?, ?, ?, ?, 60, 1, 1)",
+            (migration["id"], site_a, projects["a1"], now - 890),
+        )
+
+    result = forecast(migration, now=now)
+    by_name = {project["name"]: project for project in result["projects"]}
+    assert by_name["urgent"]["eta"] is not None
+    assert by_name["a1"]["eta"] is None and not by_name["a1"]["late"]
+    assert result["eta"] is None
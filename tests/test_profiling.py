@@ -0,0 +1,50 @@
+# test_profiling.py
+import cProfile
+import json
+import pstats
+
+import pytest
+
+from helpers.profiling import ActionProfiler, collapsed_stacks, parse_modes
+from ui.action import Action
+
+
+def test_parse_modes():
+    assert parse_modes("") is None
+    assert parse_modes("1") == {"timing"}
+    assert parse_modes("cprofile") == {"timing", "cprofile"}
+    assert parse_modes("all") == {"timing", "cprofile", "tracemalloc"}
+    with pytest.raises(ValueError):
+        parse_modes("perf")
+
+def test_profiler_writes_reports(tmp_path):
+    profiler = ActionProfiler({"timing", "cprofile", "tracemalloc"}, tmp_path)
+    action = Action("G", "Go", lambda: sum(range(1000)))
+    assert profiler.run(action) == sum(range(1000))
+
+    summary = json.loads((tmp_path / "actions.jsonl").read_text().splitlines()[0])
+    assert summary["key"] == "G"
+    assert summary["wall_ms"] >= 0
+    assert (tmp_path / summary["pstats"]).exists()
+    assert (tmp_path / summary["collapsed"]).exists()
+    assert "peak_bytes" in summary
+
+def test_collapsed_stacks_add_up_to_profiled_time():
+    def leaf(n):
+        return sum(range(n))
+
+    def shared(n):
+        return [leaf(n) for _ in range(20)]
+
+    def branch():
+        return [shared(2000) for _ in range(5)]
+
+    profile = cProfile.Profile()
+    profile.runcall(lambda: [branch(), branch(), shared(2000)])
+    stats = pstats.Stats(profile)
+    lines = collapsed_stacks(stats)
+
+    total = sum(int(line.rsplit(" ", 1)[1]) for line in lines)
+    edges = sum(len(callers) or 1 for *_, callers in stats.stats.values())
+    assert abs(total - stats.total_tt * 1_000_000) <= edges  # each edge is rounded to a microsecond
+    assert not any(line.count(";") > 1 for line in lines)
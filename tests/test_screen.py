@@ -0,0 +1,41 @@
+# test_screen.py
+import io
+
+from rich.console import Console
+
+from ui.screen import Screen
+
+
+def make_screen(height=20):
+    console = Console(file=io.StringIO(), force_terminal=True, color_system=None, width=40, height=height)
+    return Screen(console), console.file
+
+def test_redraw_rewrites_only_changed_lines():
+    screen, out = make_screen()
+    renders = []
+
+    def part(text):
+        renders.append(text)
+        return text
+
+    with screen:
+        screen.draw([("title", lambda: part("Title")), (None, lambda: part("row 1\nrow 2"))])
+        assert out.getvalue().startswith("\x1b[2J")
+        screen.console.print("a message below the frame")
+        out.seek(0)
+        out.truncate()
+
+        screen.draw([("title", lambda: part("Title")), (None, lambda: part("row 1\nrow two"))])
+        assert out.getvalue() == "\x1b[3;1Hrow two\x1b[K\x1b[4;1H\x1b[J"
+        assert renders.count("Title") == 1  # keyed parts are rendered once
+
+def test_full_repaint_once_the_frame_scrolled_away():
+    screen, out = make_screen(height=5)
+    with screen:
+        screen.draw([("frame", lambda: "one\ntwo")])
+        for _ in range(3):
+            screen.console.print("output")
+        out.seek(0)
+        out.truncate()
+        screen.draw([("frame", lambda: "one\ntwo")])
+        assert out.getvalue() == "\x1b[2J\x1b[Hone\ntwo\n"
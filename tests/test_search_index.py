@@ -0,0 +1,24 @@
+# test_search_index.py
+from helpers.search_index import SearchIndex
+
+CLIENTS = [{"id": i, "name": name} for i, name in enumerate([
+    "Acme Corporation", "Acme Holdings", "Société Générale", "Globex", "Initech", "Umbrella Acme Labs",
+])]
+
+
+def names(items):
+    return [item["name"] for item in items]
+
+def test_prefix_matches_rank_first():
+    assert names(SearchIndex(CLIENTS).search("acme", limit=3)) == ["Acme Corporation", "Acme Holdings", "Umbrella Acme Labs"]
+
+def test_case_and_accent_insensitive():
+    assert names(SearchIndex(CLIENTS).search("SOCIETE", limit=1)) == ["Société Générale"]
+
+def test_tolerates_typos_and_matches_inside_names():
+    index = SearchIndex(CLIENTS)
+    assert names(index.search("initehc", limit=1)) == ["Initech"]
+    assert names(index.search("holdings", limit=1)) == ["Acme Holdings"]
+
+def test_empty_query_returns_first_items():
+    assert names(SearchIndex(CLIENTS).search("", limit=2)) == ["Acme Corporation", "Acme Holdings"]
@@ -0,0 +1,30 @@
+# test_throttle.py
+import time
+from datetime import time as clock_time
+
+from engines.throttle import AIMDController, TokenBucket, schedule_applies
+
+
+def test_token_bucket_enforces_rate():
+    bucket = TokenBucket(rate=1000, burst=100)
+    start = time.monotonic()
+    assert bucket.consume(100) == 0.0  # starts full
+    for _ in range(3):
+        bucket.consume(100)
+    assert time.monotonic() - start >= 0.25
+
+def test_token_bucket_unlimited():
+    assert TokenBucket().consume(10 ** 9) == 0.0
+
+def test_schedule_window_wraps_midnight():
+    night = {"start_time": "18:00", "end_time": "07:30"}
+    assert schedule_applies(night, clock_time(23, 0))
+    assert schedule_applies(night, clock_time(7, 0))
+    assert not schedule_applies(night, clock_time(12, 0))
+
+def test_aimd_increases_then_backs_off():
+    controller = AIMDController(initial=2, maximum=4, window=0)
+    assert controller.record(1000, 0.01) == 3
+    assert controller.record(1000, 0.01) == 4
+    assert controller.record(1000, 0.01) == 4
+    assert controller.record(1000, 0.5) == 2
@@ -1,3 +1,6 @@
+from helpers.profiling import get_action_profiler
+
+
 class Action:
     def __init__(self, key, label, func, condition=lambda: True):
         """
@@ -13,4 +16,11 @@ class Action:
         self.condition = condition
 
     def is_enabled(self):
-        return self.condition()
\ No newline at end of file
+        return self.condition()
+
+    def run(self):
+        """Executes the action, through the action profiler when profiling is enabled."""
+        profiler = get_action_profiler()
+        if profiler is None:
+            return self.func()
+        return profiler.run(self)
\ No newline at end of file
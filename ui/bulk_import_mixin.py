@@ -0,0 +1,62 @@
+# ui/bulk_import_mixin.py
+from pathlib import Path
+
+from rich.prompt import Prompt
+from rich.table import Table
+
+from console_instance import console
+from database import MigrationDAO
+from database.bulk_import import BulkImportError
+
+MAX_ERRORS_SHOWN = 50
+
+
+class BulkImportMixin:
+    """Adds a CSV import action to a list UI. Subclasses provide `bulk_importer` and `bulk_import_columns`."""
+
+    @property
+    def bulk_importer(self):
+        """Callable (path, migration_id) -> {"imported": int, "skipped": int}."""
+        raise NotImplementedError("Subclasses must provide bulk_importer.")
+
+    @property
+    def bulk_import_columns(self):
+        """Column names to mention when asking for the file."""
+        raise NotImplementedError("Subclasses must provide bulk_import_columns.")
+
+    def bulk_import(self):
+        console.print(f"[bold blue]Importing {self._name} from CSV (columns: {self.bulk_import_columns})...[/bold blue]")
+        path = Path(Prompt.ask("CSV file")).expanduser()
+        if not path.is_file():
+            console.print(f"[bold red]File not found: {path}[/bold red]")
+            return self
+        migration_id = MigrationDAO.get_active_migration_id()
+        if migration_id is None:
+            console.print("[bold red]No active migration.[/bold red]")
+            return self
+        try:
+            summary = self.bulk_importer(path, migration_id)
+        except BulkImportError as e:
+            self.display_import_errors(e.errors)
+            Prompt.ask("Nothing was imported. Press Enter to continue", default="")
+            return self
+        except Exception as e:
+            console.print(f"[bold red]Error importing {self._name}: {e}[/bold red]")
+            return self
+        console.print(
+            f"[bold green]Imported {summary['imported']} {self._name.lower()}, "
+            f"skipped {summary['skipped']} that already exist.[/bold green]"
+        )
+        self.refresh_items()
+        return self
+
+    @staticmethod
+    def display_import_errors(errors):
+        table = Table(title=f"{len(errors)} validation error(s)")
+        table.add_column("Line", justify="right", style="cyan")
+        table.add_column("Error", style="red")
+        for line, message in errors[:MAX_ERRORS_SHOWN]:
+            table.add_row(str(line), message)
+        if len(errors) > MAX_ERRORS_SHOWN:
+            table.caption = f"{len(errors) - MAX_ERRORS_SHOWN} more not shown"
+        console.print(table)
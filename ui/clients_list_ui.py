@@ -1,13 +1,15 @@
 from rich.table import Table
 
 from database import ClientDAO
+from database.bulk_import import import_clients
 from helpers.validators import non_empty
 from ui import Action
+from ui.bulk_import_mixin import BulkImportMixin
 from ui.paginated_list_ui import PaginatedListUI
 from ui.crud_mixin import CRUDMixin
 
 
-class ClientsListUI(CRUDMixin, PaginatedListUI):
+class ClientsListUI(CRUDMixin, BulkImportMixin, PaginatedListUI):
     CLIENT_FIELD_DEFS = {
         "name": {
             "label": "Client Name",
@@ -26,6 +28,7 @@ class ClientsListUI(CRUDMixin, PaginatedListUI):
             Action("C", "Create Client", self.create_item),
             Action("E", "Edit Client", self.edit_item, condition=self.is_item_modification_enabled),
             Action("D", "Delete Client", self.delete_item, condition=self.is_item_modification_enabled),
+            Action("I", "Import Clients", self.bulk_import),
         ]
         return client_actions + super().default_actions
 
@@ -39,4 +42,12 @@ class ClientsListUI(CRUDMixin, PaginatedListUI):
 
     @property
     def dao(self):
-        return ClientDAO
\ No newline at end of file
+        return ClientDAO
+
+    @property
+    def bulk_importer(self):
+        return import_clients
+
+    @property
+    def bulk_import_columns(self):
+        return "name"
@@ -0,0 +1,51 @@
+from rich.markup import escape
+
+from console_instance import console
+from database import PathConflictDAO
+from engines.plan import plan_targets
+from ui.action import Action
+from ui.db_paged_list_ui import DBPagedListUI
+
+
+class ConflictsListUI(DBPagedListUI):
+    """Pages through the target path conflicts the planner found for the active migration."""
+
+    noun = "conflicts"
+    empty_hint = "No conflicts recorded. Run the planner after classifying files."
+
+    @property
+    def _name(self):
+        return "Path Conflicts"
+
+    @property
+    def dao(self):
+        return PathConflictDAO
+
+    @property
+    def default_actions(self):
+        conflict_actions = [
+            Action("R", "Re-plan", self.replan, condition=lambda: self.migration is not None),
+        ]
+        return conflict_actions + super().default_actions
+
+    table_columns = (
+        ("Kind", {"style": "red"}),
+        ("Source", {"style": "magenta", "overflow": "fold"}),
+        ("Target", {"style": "green", "overflow": "fold"}),
+        ("Detail", {"style": "yellow", "overflow": "fold"}),
+    )
+
+    def format_row(self, conflict):
+        return (
+            conflict["kind"], escape(conflict["path"]), escape(conflict["target_path"]), escape(conflict["detail"] or ""),
+        )
+
+    def replan(self):
+        console.print("[bold blue]Planning target paths...[/bold blue]")
+        summary = plan_targets(self.migration)
+        console.print(
+            f"[bold green]{summary['planned']} files planned, {summary['conflicts']} conflicts.[/bold green]"
+        )
+        self.page = 1
+        self.refresh_items()
+        return self
@@ -1,6 +1,7 @@
 # ui/crud_mixin.py
 from rich.prompt import Prompt
 
+from database import ConflictError
 from helpers.prompt_helper import prompt_for_fields
 from console_instance import console
 from ui.retrieval_mixin import RetrievalMixin
@@ -18,7 +19,7 @@ class CRUDMixin(RetrievalMixin):
 
     def create_item(self):
         console.print(f"[bold blue]Creating new {self._name}...[/bold blue]")
-        data = prompt_for_fields(self.field_labels)
+        data = self.convert_fields(prompt_for_fields(self.field_labels))
         try:
             # Each subclass should implement self.dao_add() to add the item.
             self.dao_add(**data)
@@ -39,7 +40,7 @@ class CRUDMixin(RetrievalMixin):
             return self
 
         # Prompt for new values, using current_item as defaults
-        updated_data = prompt_for_fields(self.field_labels, current_values=current_item)
+        updated_data = self.convert_fields(prompt_for_fields(self.field_labels, current_values=current_item))
         self.display_table([updated_data])
 
         # Only include fields that have changed
@@ -54,10 +55,14 @@ class CRUDMixin(RetrievalMixin):
             return self
 
         try:
-            # Each subclass should implement self.dao_update() for updating.
-            self.dao_update(current_item["id"], **changes)
+            # Each subclass should implement self.dao_update() for updating. The version read with the
+            # item makes the update fail instead of overwriting another session's edit.
+            self.dao_update(current_item["id"], expected_version=current_item.get("version"), **changes)
             console.print(f"[bold green]{self._name} updated successfully.[/bold green]")
             self.refresh_items()
+        except ConflictError as e:
+            console.print(f"[bold red]{e}[/bold red]")
+            self.refresh_items()
         except Exception as e:
             console.print(f"[bold red]Error editing {self._name}: {e}[/bold red]")
         return self
@@ -83,11 +88,15 @@ class CRUDMixin(RetrievalMixin):
         return len(self.items) > 0
 
     # The following methods can be implemented by subclasses:
+    def convert_fields(self, data):
+        """Turns prompted text into the values stored (and compared against the stored ones)."""
+        return data
+
     def dao_add(self, **data):
         self.dao.add(**data)
 
-    def dao_update(self, item_id, **changes):
-        self.dao.update(item_id, **changes)
+    def dao_update(self, item_id, expected_version=None, **changes):
+        self.dao.update(item_id, expected_version=expected_version, **changes)
 
     def dao_delete(self, item_id):
         self.dao.delete(item_id)
\ No newline at end of file
@@ -5,6 +5,9 @@ from ui.migrations_list_ui import MigrationsListUI
 from ui.clients_list_ui import ClientsListUI
 from ui.projects_list_ui import ProjectsListUI
 from ui.sites_list_ui import SitesListUI
+from ui.diagnostics_list_ui import DiagnosticsListUI
+from ui.conflicts_list_ui import ConflictsListUI
+from ui.preflight_list_ui import PreflightListUI
 from console_instance import console
 
 class DashboardUI(ListUI):
@@ -19,6 +22,9 @@ class DashboardUI(ListUI):
             {"name": "Go To Sites"},
             {"name": "Go To Clients"},
             {"name": "Go To Projects"},
+            {"name": "Go To Diagnostics"},
+            {"name": "Go To Path Conflicts"},
+            {"name": "Go To Preflight"},
             {"name": "Quit Application"}
         ]
         super().__init__("Dashboard", items)
@@ -31,6 +37,9 @@ class DashboardUI(ListUI):
             Action("2", "Sites", self.goto_sites),
             Action("3", "Clients", self.goto_clients),
             Action("4", "Projects", self.goto_projects),
+            Action("5", "Diagnostics", self.goto_diagnostics),
+            Action("6", "Path Conflicts", self.goto_conflicts),
+            Action("7", "Preflight", self.goto_preflight),
             Action("Q", "Quit", self.quit)
         ]
 
@@ -50,6 +59,18 @@ class DashboardUI(ListUI):
         console.print("[bold blue]Loading Projects UI...[/bold blue]")
         return ProjectsListUI()
 
+    def goto_diagnostics(self):
+        console.print("[bold blue]Loading Diagnostics UI...[/bold blue]")
+        return DiagnosticsListUI()
+
+    def goto_conflicts(self):
+        console.print("[bold blue]Loading Path Conflicts UI...[/bold blue]")
+        return ConflictsListUI()
+
+    def goto_preflight(self):
+        console.print("[bold blue]Loading Preflight UI...[/bold blue]")
+        return PreflightListUI()
+
     def quit(self):
         console.print("[bold red]Exiting application...[/bold red]")
         return None
\ No newline at end of file
@@ -0,0 +1,69 @@
+import math
+
+from rich.console import Group
+
+from database import MigrationDAO
+from ui.paginated_list_ui import PaginatedListUI
+
+
+class DBPagedListUI(PaginatedListUI):
+    """
+    Pages through rows of the active migration that stay in the database: only the
+    counts per kind and the current page are loaded. Subclasses provide the DAO (with
+    `count_by_kind` and `get_page`), the name of the rows and a hint for when there are none.
+    """
+
+    noun = "rows"
+    empty_hint = "Nothing recorded."
+
+    def __init__(self, page=1):
+        self.migration = MigrationDAO.get_active_migration()
+        self.counts = {}
+        super().__init__(self._name, [], page)
+        self.refresh_items()
+
+    @property
+    def dao(self):
+        raise NotImplementedError("Subclasses must provide dao.")
+
+    @property
+    def total_rows(self):
+        return sum(self.counts.values())
+
+    @property
+    def total_pages(self):
+        return math.ceil(self.total_rows / self.page_size)
+
+    def refresh_items(self):
+        """Loads the counts and the rows of the current page only."""
+        if self.migration is None:
+            self.counts, self.items = {}, []
+            return
+        self.counts = self.dao.count_by_kind(self.migration["id"])
+        self.page = min(self.page, max(self.total_pages, 1))
+        offset = (self.page - 1) * self.page_size
+        self.items = self.dao.get_page(self.migration["id"], offset, self.page_size)
+
+    def prev_page(self):
+        super().prev_page()
+        self.refresh_items()
+        return self
+
+    def next_page(self):
+        super().next_page()
+        self.refresh_items()
+        return self
+
+    def visible_items(self):
+        """The items are the current page already."""
+        return (self.page - 1) * self.page_size + 1, self.items
+
+    def render_table(self, items=None):
+        if self.migration is None:
+            return "[dim]No active migration.[/dim]"
+        if self.counts:
+            kinds = ", ".join(f"{kind}: {count}" for kind, count in sorted(self.counts.items()))
+            summary = f"[dim]{self.total_rows} {self.noun} — {kinds}[/dim]"
+        else:
+            summary = f"[dim]{self.empty_hint}[/dim]"
+        return Group(super().render_table(items), summary)
@@ -0,0 +1,122 @@
+from datetime import datetime
+
+from rich.console import Group
+from rich.markup import escape
+from rich.panel import Panel
+
+from console_instance import console
+from database import DatabaseManager
+from ui.action import Action
+from ui.paginated_list_ui import PaginatedListUI
+
+
+class DiagnosticsListUI(PaginatedListUI):
+    """Shows the SQL statements recorded by the database instrumentation, slowest first."""
+
+    def __init__(self, page=1):
+        self.show_slow = False
+        self.items = []
+        self.refresh_items()
+        super().__init__(self._name, self.items, page)
+
+    @property
+    def _name(self):
+        return "Diagnostics"
+
+    @property
+    def default_actions(self):
+        diagnostics_actions = [
+            Action("T", "Enable Tracing", self.enable_tracing, condition=lambda: not self.is_tracing_enabled()),
+            Action("X", "Disable Tracing", self.disable_tracing, condition=self.is_tracing_enabled),
+            Action("R", "Refresh", self.refresh, condition=self.is_tracing_enabled),
+            Action("Z", "Reset Statistics", self.reset_statistics, condition=self.is_tracing_enabled),
+            Action("S", "Toggle Slow Queries", self.toggle_slow_queries, condition=self.is_tracing_enabled),
+        ]
+        return diagnostics_actions + super().default_actions
+
+    @property
+    def query_stats(self):
+        return DatabaseManager().query_stats
+
+    def is_tracing_enabled(self):
+        return self.query_stats is not None
+
+    def refresh_items(self):
+        stats = self.query_stats
+        self.items = stats.top() if stats is not None else []
+
+    table_columns = (
+        ("Statement", {"style": "magenta", "overflow": "fold"}),
+        ("Calls", {"justify": "right", "style": "green"}),
+        ("Total ms", {"justify": "right", "style": "yellow"}),
+        ("Avg ms", {"justify": "right", "style": "yellow"}),
+        ("Max ms", {"justify": "right", "style": "red"}),
+        ("Rows", {"justify": "right", "style": "green"}),
+    )
+
+    def format_row(self, stat):
+        return (
+            escape(stat.sql),
+            str(stat.calls),
+            f"{stat.total_ms:.1f}",
+            f"{stat.avg_ms:.2f}",
+            f"{stat.max_ms:.1f}",
+            str(stat.rows),
+        )
+
+    @property
+    def table_title(self):
+        return self.title
+
+    @property
+    def table_key(self):
+        # The verb counts and slow queries below the table change without the items being replaced.
+        return None if self.query_stats is not None else (self._items_version, self.page)
+
+    def render_table(self, items=None):
+        parts = [super().render_table(items)]
+        if self.query_stats is None:
+            parts.append("[dim]SQL tracing is disabled. Enable it to start collecting statistics.[/dim]")
+        else:
+            verbs = ", ".join(f"{verb}: {count}" for verb, count in sorted(self.query_stats.verb_counts.items()))
+            parts.append(f"[dim]Statements traced by SQLite — {verbs or 'none yet'}[/dim]")
+            if self.show_slow:
+                parts.append(self.render_slow_queries())
+        return Group(*parts)
+
+    def enable_tracing(self):
+        DatabaseManager().enable_instrumentation()
+        console.print("[bold green]SQL tracing enabled.[/bold green]")
+        self.refresh_items()
+        return self
+
+    def disable_tracing(self):
+        DatabaseManager().disable_instrumentation()
+        console.print("[bold yellow]SQL tracing disabled.[/bold yellow]")
+        self.refresh_items()
+        self.page = 1
+        return self
+
+    def refresh(self):
+        self.refresh_items()
+        return self
+
+    def reset_statistics(self):
+        self.query_stats.reset()
+        console.print("[bold yellow]Query statistics cleared.[/bold yellow]")
+        self.refresh_items()
+        self.page = 1
+        return self
+
+    def toggle_slow_queries(self):
+        self.show_slow = not self.show_slow
+        return self
+
+    def render_slow_queries(self):
+        stats = self.query_stats
+        lines = [
+            f"{datetime.fromtimestamp(ts):%H:%M:%S}  {elapsed_ms:8.1f} ms  {escape(sql)}"
+            for ts, sql, elapsed_ms in reversed(stats.slow_queries)
+        ]
+        body = "\n".join(lines) if lines else "[dim]No slow queries recorded.[/dim]"
+        return Panel(body, title=f"Slow Queries (>= {stats.slow_query_ms:g} ms)", expand=False)
@@ -23,6 +23,9 @@ class ListUI:
         """The name of a list module. Must be implemented."""
         return None
 
+    # Columns after the index: (header, rich Table.add_column options). Rows come from format_row.
+    table_columns = (("Name", {"style": "magenta"}),)
+
     def __init__(self, title, items):
         """
         Args:
@@ -32,6 +35,17 @@ class ListUI:
         self.title = title
         self.items = items
 
+    @property
+    def items(self):
+        return self._items
+
+    @items.setter
+    def items(self, items):
+        # Formatted rows and rendered tables are cached per page until the items are replaced.
+        self._items = items
+        self._items_version = getattr(self, "_items_version", 0) + 1
+        self._rows = {}
+
     @property
     def default_actions(self):
         return [
@@ -43,17 +57,46 @@ class ListUI:
         """Return only actions whose conditions are met."""
         return [action for action in self.default_actions if action.is_enabled()]
 
-    def display_table(self, items=None):
-        if items is None:
-            items = self.items
+    def format_row(self, item):
+        """The cells of one item's row (after the index), as strings or renderables."""
+        return (dict(item).get("name", "N/A"),)
+
+    def visible_items(self):
+        """Returns (index of the first item, items) of what the table shows."""
+        return 1, self.items
+
+    @property
+    def table_title(self):
+        return self.title
+
+    @property
+    def table_key(self):
+        """Changes whenever render_table would show something else (None if it cannot tell); see ui.screen."""
+        return self._items_version, self.visible_items()[0]
 
-        table = Table(title=self.title)
+    def render_table(self, items=None):
+        """
+        Builds the table of the visible items, or of `items` (numbered from 1). The rows of
+        the visible items are formatted once per page and reused until the items change.
+        """
+        if items is None:
+            start, visible = self.visible_items()
+            rows = self._rows.get(start)
+            if rows is None:
+                rows = self._rows[start] = [self.format_row(item) for item in visible]
+        else:
+            start, rows = 1, [self.format_row(item) for item in items]
+
+        table = Table(title=self.table_title)
         table.add_column("Index", justify="right", style="cyan")
-        table.add_column("Name", style="magenta")
-        for index, item in enumerate(items, start=1):
-            item_dict = dict(item)
-            table.add_row(str(index), item_dict.get("name", "N/A"))
-        console.print(table)
+        for header, options in self.table_columns:
+            table.add_column(header, **options)
+        for index, row in enumerate(rows, start=start):
+            table.add_row(str(index), *row)
+        return table
+
+    def display_table(self, items=None):
+        console.print(self.render_table(items))
 
     def prompt_action(self):
         enabled_actions = self.get_enabled_actions()
@@ -61,7 +104,7 @@ class ListUI:
         # Execute the function associated with the selected action.
         for action in enabled_actions:
             if action.key == choice:
-                result = action.func()
+                result = action.run()
                 if action.key == "Q":
                     return result
                 return result if result is not None else self
@@ -76,14 +119,29 @@ class ListUI:
         )
         return int(choice) - 1
 
+    def render_actions(self, actions=None):
+        """
+        Shows all actions, but formats enabled actions differently from disabled ones.
+        """
+        actions = self.default_actions if actions is None else actions
+        formatted = "\n".join(format_action(action) for action in actions)
+        return Panel(formatted, title="Actions", expand=False)
+
     def display_actions(self):
+        console.print(self.render_actions())
+
+    def screen_parts(self):
         """
-        Overrides the default display_actions to show all actions,
-        but formats enabled actions differently from disabled ones.
+        The (key, render) parts of this UI's screen for ui.screen.Screen.draw: the table, and
+        the actions panel, which is re-rendered only when an action is enabled or disabled.
         """
-        formatted = "\n".join(format_action(action) for action in self.default_actions)
-        panel = Panel(formatted, title="Actions", expand=False)
-        console.print(panel)
+        actions = self.default_actions
+        enabled = tuple((action.key, action.label, action.is_enabled()) for action in actions)
+        table_key = self.table_key
+        return [
+            ((self, "table", table_key) if table_key is not None else None, self.render_table),
+            (("actions", enabled), lambda: self.render_actions(actions)),
+        ]
 
     def home(self):
         from ui.dashboard_list_ui import DashboardUI
@@ -1,10 +1,12 @@
 from pathlib import Path
 
-from rich.table import Table
+from rich.prompt import Prompt
 
 from console_instance import console
 from database import MigrationDAO
-from helpers.validators import non_empty, validate_and_create_directory
+from helpers.prompt_helper import prompt_for_fields
+from helpers.transfer_options import TRANSFER_MODES, TRANSFER_ORDERS
+from helpers.validators import non_empty, transfer_mode, transfer_order, validate_and_create_directory
 from ui.action import Action
 from ui.crud_mixin import CRUDMixin
 from ui.paginated_list_ui import PaginatedListUI
@@ -29,6 +31,16 @@ class MigrationsListUI(CRUDMixin, PaginatedListUI):
             "default": str(Path.cwd()),
             "is_path": True,
         },
+        "transfer_mode": {
+            "label": f"Transfer Mode ({'/'.join(TRANSFER_MODES)})",
+            "validator": transfer_mode,
+            "default": "copy",
+        },
+        "transfer_order": {
+            "label": f"Transfer Order ({'/'.join(TRANSFER_ORDERS)})",
+            "validator": transfer_order,
+            "default": "priority",
+        },
     }
 
     def __init__(self, page=1):
@@ -41,6 +53,7 @@ class MigrationsListUI(CRUDMixin, PaginatedListUI):
         migration_actions = [
             Action("A", "Activate Migration", self.activate_migration, condition=self.is_item_modification_enabled),
             Action("C", "Create Migration", self.create_item),
+            Action("L", "Clone Migration", self.clone_migration, condition=self.is_item_modification_enabled),
             Action("E", "Edit Migration", self.edit_item, condition=self.is_item_modification_enabled),
             Action("D", "Delete Migration", self.delete_item, condition=self.is_item_modification_enabled),
         ]
@@ -58,35 +71,30 @@ class MigrationsListUI(CRUDMixin, PaginatedListUI):
     def dao(self):
         return MigrationDAO
 
-    def display_table(self, items=None):
-        """Renders the migrations list in a detailed table."""
-        if items is None:       # allows user to override display table to display lists of items; full is default
-            items = self.items
+    table_columns = (
+        ("Migration Name", {"style": "magenta"}),
+        ("Old Root", {"style": "green"}),
+        ("New Root", {"style": "yellow"}),
+        ("Mode", {"style": "blue"}),
+        ("Order", {"style": "blue"}),
+        ("Active", {"style": "red"}),
+    )
 
-        table = Table(title=self.title)
-        table.add_column("Index", justify="right", style="cyan")
-        table.add_column("Migration Name", style="magenta")
-        table.add_column("Old Root", style="green")
-        table.add_column("New Root", style="yellow")
-        table.add_column("Active", style="red")
-
-        for index, migration in enumerate(items, start=1):
-            migration_dict = dict(migration)
-            is_active = migration_dict.get("is_active")
-            active_str = "Yes" if is_active else "No"
-            # Choose style based on active status:
-            active_style = "green" if is_active else "red"
+    def format_row(self, migration):
+        migration_dict = dict(migration)
+        is_active = migration_dict.get("is_active")
+        active_str = "Yes" if is_active else "No"
+        # Choose style based on active status:
+        active_style = "green" if is_active else "red"
+        return (
+            migration_dict.get("name", "N/A"),
+            migration_dict.get("old_root", "N/A"),
+            migration_dict.get("new_root", "N/A"),
+            migration_dict.get("transfer_mode") or "copy",
+            migration_dict.get("transfer_order") or "priority",
             # Wrap the active text with the chosen style markup
-            active_display = f"[{active_style}]{active_str}[/{active_style}]"
-
-            table.add_row(
-                str(index),
-                migration_dict.get("name", "N/A"),
-                migration_dict.get("old_root", "N/A"),
-                migration_dict.get("new_root", "N/A"),
-                active_display
-            )
-        console.print(table)
+            f"[{active_style}]{active_str}[/{active_style}]",
+        )
 
     def activate_migration(self):
         console.print("[bold blue]Activating migration...[/bold blue]")
@@ -102,4 +110,26 @@ class MigrationsListUI(CRUDMixin, PaginatedListUI):
             self.refresh_items()
         except Exception as e:
             console.print(f"[bold red]Error activating migration: {e}[/bold red]")
-        return self
\ No newline at end of file
+        return self
+
+    def clone_migration(self):
+        """Creates a migration with the sites, clients, projects and settings (and optionally files) of another."""
+        console.print("[bold blue]Cloning migration...[/bold blue]")
+        index = self.prompt_for_item("clone")
+        try:
+            source = dict(self.items[index])
+        except IndexError:
+            console.print("[bold red]Invalid selection![/bold red]")
+            return self
+        field_defs = {field: self.MIGRATION_FIELD_DEFS[field] for field in ("name", "old_root", "new_root")}
+        data = prompt_for_fields(field_defs, current_values={**source, "name": f"{source['name']} (copy)"})
+        if not data:
+            return self
+        include_files = Prompt.ask("Copy the file inventory too?", default="N", choices=["Y", "N"]).upper() == "Y"
+        try:
+            self.dao.clone(source["id"], include_files=include_files, **data)
+            console.print(f"[bold green]Migration '{data['name']}' cloned from '{source['name']}'.[/bold green]")
+            self.refresh_items()
+        except Exception as e:
+            console.print(f"[bold red]Error cloning migration: {e}[/bold red]")
+        return self
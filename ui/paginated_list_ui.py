@@ -23,4 +23,17 @@ class PaginatedListUI(PaginationMixin, ListUI):
 
     @property
     def total_pages(self):
-        return math.ceil(len(self.items) / self.page_size)
\ No newline at end of file
+        return math.ceil(len(self.items) / self.page_size)
+
+    def visible_items(self):
+        """The current page only; indexes stay global so items can be selected from any page."""
+        start = (self.page - 1) * self.page_size
+        return start + 1, self.items[start:start + self.page_size]
+
+    @property
+    def table_title(self):
+        return f"{self.title} (page {self.page}/{max(self.total_pages, 1)})"
+
+    @property
+    def table_key(self):
+        return self._items_version, self.page, self.total_pages
\ No newline at end of file
@@ -0,0 +1,49 @@
+from rich.markup import escape
+
+from console_instance import console
+from database import PreflightFailureDAO
+from engines.preflight import run_preflight
+from ui.action import Action
+from ui.db_paged_list_ui import DBPagedListUI
+
+
+class PreflightListUI(DBPagedListUI):
+    """Pages through the problems the last preflight run found for the active migration."""
+
+    noun = "failures"
+    empty_hint = "No failures recorded. Run preflight after scanning and classifying files."
+
+    @property
+    def _name(self):
+        return "Preflight"
+
+    @property
+    def dao(self):
+        return PreflightFailureDAO
+
+    @property
+    def default_actions(self):
+        preflight_actions = [
+            Action("R", "Run Preflight", self.run_preflight, condition=lambda: self.migration is not None),
+        ]
+        return preflight_actions + super().default_actions
+
+    table_columns = (
+        ("Kind", {"style": "red"}),
+        ("Path", {"style": "magenta", "overflow": "fold"}),
+        ("Detail", {"style": "yellow", "overflow": "fold"}),
+    )
+
+    def format_row(self, failure):
+        return failure["kind"], escape(failure["path"]), escape(failure["detail"] or "")
+
+    def run_preflight(self):
+        console.print("[bold blue]Checking capacity and permissions...[/bold blue]")
+        summary = run_preflight(self.migration)
+        console.print(
+            f"[bold green]{summary['source_directories']} source and {summary['target_directories']} target "
+            f"directories checked, {summary['failed']} failures.[/bold green]"
+        )
+        self.page = 1
+        self.refresh_items()
+        return self
@@ -1,14 +1,13 @@
-from rich.table import Table
-
-from console_instance import console
 from database import ProjectDAO, SiteDAO, ClientDAO
-from helpers.validators import non_empty
+from database.bulk_import import import_projects
+from helpers.validators import integer, non_empty, optional_date
 from ui import Action
+from ui.bulk_import_mixin import BulkImportMixin
 from ui.paginated_list_ui import PaginatedListUI
 from ui.crud_mixin import CRUDMixin
 
 
-class ProjectsListUI( PaginatedListUI, CRUDMixin):
+class ProjectsListUI( PaginatedListUI, CRUDMixin, BulkImportMixin):
     PROJECT_FIELD_DEFS = {
         "name": {
             "label": "Project Name",
@@ -22,6 +21,16 @@ class ProjectsListUI( PaginatedListUI, CRUDMixin):
         "client_id": {
             "label": "Client",
             "selection_ui": lambda: __import__("ui.client_selection_ui", fromlist=["ClientSelectionUI"]).ClientSelectionUI(),
+        },
+        "priority": {
+            "label": "Priority (higher transfers first)",
+            "validator": integer,
+            "default": "0"
+        },
+        "cutover_date": {
+            "label": "Cutover Date (YYYY-MM-DD, optional)",
+            "validator": optional_date,
+            "default": ""
         }
     }
 
@@ -38,6 +47,7 @@ class ProjectsListUI( PaginatedListUI, CRUDMixin):
             Action("C", "Create Project", self.create_item),
             Action("E", "Edit Project", self.edit_item, condition=self.is_item_modification_enabled),
             Action("D", "Delete Project", self.delete_item, condition=self.is_item_modification_enabled),
+            Action("I", "Import Projects", self.bulk_import),
         ]
         return project_actions + super().default_actions
 
@@ -53,26 +63,40 @@ class ProjectsListUI( PaginatedListUI, CRUDMixin):
     def dao(self):
         return ProjectDAO
 
-    def display_table(self, items=None):
-        if items is None:
-            items = self.items
+    def convert_fields(self, data):
+        if data is None:
+            return data
+        if data.get("priority") not in (None, ""):
+            data["priority"] = int(data["priority"])
+        if data.get("cutover_date") == "":
+            data["cutover_date"] = None
+        return data
 
-        table = Table(title=self.title)
-        table.add_column("Index", justify="right", style="cyan")
-        table.add_column("Project Name", style="magenta")
-        table.add_column("Site", style="green")
-        table.add_column("Client", style="yellow")
+    @property
+    def bulk_importer(self):
+        return import_projects
+
+    @property
+    def bulk_import_columns(self):
+        return "name, site, client"
 
-        for index, item in enumerate(items, start=1):
-            project_dict = dict(item)
-            table.add_row(
-                str(index),
-                project_dict["name"],
-                self.site_lookup.get(project_dict["site_id"], ""),
-                self.client_lookup.get(project_dict["client_id"], ""),
-            )
+    table_columns = (
+        ("Project Name", {"style": "magenta"}),
+        ("Site", {"style": "green"}),
+        ("Client", {"style": "yellow"}),
+        ("Priority", {"justify": "right", "style": "cyan"}),
+        ("Cutover", {"style": "red"}),
+    )
 
-        console.print(table)
+    def format_row(self, item):
+        project_dict = dict(item)
+        return (
+            project_dict["name"],
+            self.site_lookup.get(project_dict["site_id"], ""),
+            self.client_lookup.get(project_dict["client_id"], ""),
+            str(project_dict.get("priority") or 0),
+            project_dict.get("cutover_date") or "",
+        )
 
     # overrides implementation in retrieval_mixin.py
     def refresh_items(self):
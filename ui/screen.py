@@ -0,0 +1,121 @@
+from rich.console import Group
+
+from console_instance import console
+
+CACHE_SIZE = 256  # rendered parts kept for reuse
+
+_CLEAR_SCREEN = "\x1b[2J"
+
+
+class _LineCountingFile:
+    """Passes writes through to the terminal, counting the lines output below the frame."""
+
+    def __init__(self, file, screen):
+        self._file = file
+        self._screen = screen
+
+    def write(self, text):
+        if _CLEAR_SCREEN in text:
+            self._screen.invalidate()
+        self._screen.lines_below += text.count("\n")
+        return self._file.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class Screen:
+    """
+    Draws the current UI as a frame at the top of the terminal, rewriting only the lines
+    that changed since the previous frame.
+
+    A frame is a list of (key, render) parts, e.g. the page's table and the actions
+    panel. A part is rendered to lines once per key and console width and reused while
+    its key stays the same (None renders every time), so paging back or redrawing after
+    a prompt costs no table layout. The lines are then compared with the frame on screen
+    and only the rows that differ are rewritten, followed by clearing whatever was printed
+    below it (prompts, messages). Moving the selection or enabling an action rewrites one
+    or two rows instead of repainting the whole screen, which is slow over SSH.
+
+    While active (`with screen:`), console output is counted; once it has scrolled the
+    frame off the top of the terminal, or something cleared the screen, the next frame
+    is painted in full. Outside a terminal every frame is simply printed.
+    """
+
+    def __init__(self, console):
+        self.console = console
+        self.lines_below = 0  # lines output (including echoed input) since the frame was drawn
+        self._frame = None  # lines of the frame on screen, None to paint the next one in full
+        self._cache = {}
+        self._file = None
+        self._input = None
+
+    def __enter__(self):
+        self._file = self.console.file
+        self.console.file = _LineCountingFile(self._file, self)
+        self._input = self.console.input
+
+        def counting_input(*args, **kwargs):
+            try:
+                return self._input(*args, **kwargs)
+            finally:
+                self.lines_below += 1  # the Enter that ends the answer is echoed by the terminal
+
+        self.console.input = counting_input
+        return self
+
+    def __exit__(self, *exc):
+        self.console.file = self._file
+        del self.console.input  # back to the Console method
+        self._file = self._input = None
+        self.invalidate()
+
+    @property
+    def active(self):
+        return self._file is not None
+
+    def invalidate(self):
+        """Paints the next frame in full."""
+        self._frame = None
+
+    def _render_lines(self, renderable):
+        with self.console.capture() as capture:
+            self.console.print(renderable)
+        return capture.get().splitlines()
+
+    def _render(self, key, render):
+        if key is None:
+            return self._render_lines(render())
+        key = (key, self.console.width)
+        lines = self._cache.get(key)
+        if lines is None:
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.clear()
+            lines = self._cache[key] = self._render_lines(render())
+        return lines
+
+    def draw(self, parts):
+        """Shows a frame made of (key, render callable) parts, top to bottom."""
+        if not self.active or not self.console.is_terminal:
+            self.console.clear()
+            self.console.print(Group(*(render() for _, render in parts)))
+            return
+        lines = [line for key, render in parts for line in self._render(key, render)]
+        height = self.console.height
+        previous = self._frame
+        if previous is None or len(previous) + self.lines_below >= height or len(lines) >= height:
+            output = [_CLEAR_SCREEN, "\x1b[H", *(f"{line}\n" for line in lines)]
+        else:
+            output = [
+                f"\x1b[{row + 1};1H{line}\x1b[K"
+                for row, line in enumerate(lines)
+                if row >= len(previous) or previous[row] != line
+            ]
+            output.append(f"\x1b[{len(lines) + 1};1H\x1b[J")  # below the frame: old rows, prompts, messages
+        self._file.write("".join(output))
+        self._file.flush()
+        self._frame = lines if len(lines) < height else None
+        self.lines_below = 0
+
+
+screen = Screen(console)
@@ -1,15 +1,24 @@
+from rich.prompt import Prompt
+from rich.table import Table
+
 from console_instance import console
+from helpers.keyboard import KEY_BACKSPACE, KEY_DOWN, KEY_ENTER, KEY_ESCAPE, KEY_UP, keystrokes_supported, read_key
+from helpers.search_index import SearchIndex
 from ui.action import Action
 from ui.paginated_list_ui import PaginatedListUI
 from ui.retrieval_mixin import RetrievalMixin
+from ui.screen import screen
 
 
 class SelectionUI(PaginatedListUI, RetrievalMixin):
+    search_limit = 10  # matches shown while searching
+
     def __init__(self, title=None, page=1):
         if title is None:
             title = self._name
 
         self.items = self.dao.get_all()
+        self._search_index = None
         super().__init__(title, self.items, page)
 
     @property
@@ -18,17 +27,92 @@ class SelectionUI(PaginatedListUI, RetrievalMixin):
 
     @property
     def default_actions(self):
+        search_action = Action("F", "Find", self.find_item)
         selection_action = Action("S", "Select", self.select_item)
-        return [selection_action] + super().default_actions
+        return [search_action, selection_action] + super().default_actions
+
+    @property
+    def search_index(self):
+        """Prefix/trigram index over the item names, built on first use."""
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.items)
+        return self._search_index
+
+    def refresh_items(self):
+        super().refresh_items()
+        self._search_index = None
+
+    def prompt_for_item(self, action_label):
+        """Like ListUI.prompt_for_item, without listing every valid index in the prompt."""
+        console.print(f"\n[bold yellow]Select an item to {action_label.lower()}[/bold yellow]\n")
+        self.display_table()
+        choice = Prompt.ask(
+            f"Select an item to {action_label.lower()}",
+            choices=[str(i) for i in range(1, len(self.items) + 1)],
+            show_choices=False,
+        )
+        return int(choice) - 1
 
     def select_item(self):
         index = self.prompt_for_item("select")
         try:
-            self.result = dict(self.items[index])
-            console.print(f"[bold green]Selected item: {self.result.get('name', 'N/A')}[/bold green]")
+            self._choose(self.items[index])
         except IndexError:
             console.print(f"[bold red]Selected item not found[/bold red]")
         return self
 
+    def find_item(self):
+        """
+        Type-ahead search: the best matches are shown after every keystroke; Up/Down moves
+        the highlight, Enter picks it and Escape cancels. Without an interactive terminal
+        the query is entered as a line and the match is chosen by number.
+        """
+        if not keystrokes_supported():
+            return self._find_by_line()
+        query, cursor = "", 0
+        while True:
+            matches = self.search_index.search(query, self.search_limit)
+            cursor = min(cursor, max(len(matches) - 1, 0))
+            # Only the rows whose highlight changed (and the query in the title) are redrawn.
+            screen.draw([(None, lambda: self._render_matches(query, matches, cursor))])
+            key = read_key()
+            if key == KEY_ENTER and matches:
+                self._choose(matches[cursor])
+                return self
+            if key == KEY_ESCAPE:
+                return self
+            if key == KEY_UP:
+                cursor = max(cursor - 1, 0)
+            elif key == KEY_DOWN:
+                cursor = min(cursor + 1, len(matches) - 1)
+            elif key == KEY_BACKSPACE:
+                query, cursor = query[:-1], 0
+            elif len(key) == 1:
+                query, cursor = query + key, 0
+
+    def _find_by_line(self):
+        query = Prompt.ask("Search")
+        matches = self.search_index.search(query, self.search_limit)
+        if not matches:
+            console.print(f"[bold red]No matches for '{query}'[/bold red]")
+            return self
+        console.print(self._render_matches(query, matches))
+        choice = Prompt.ask("Select a match", choices=[str(i) for i in range(1, len(matches) + 1)], default="1")
+        self._choose(matches[int(choice) - 1])
+        return self
+
+    def _render_matches(self, query, matches, cursor=None):
+        caption = "Type to filter, Up/Down to move, Enter to select, Esc to cancel" if cursor is not None else None
+        table = Table(title=f"{self.title} - search: {query}", caption=caption)
+        table.add_column("Index", justify="right", style="cyan")
+        table.add_column("Name", style="magenta")
+        for index, item in enumerate(matches, start=1):
+            table.add_row(str(index), dict(item).get("name", "N/A"), style="reverse" if index - 1 == cursor else None)
+        return table
+
+    def _choose(self, item):
+        self.result = dict(item)
+        console.print(f"[bold green]Selected item: {self.result.get('name', 'N/A')}[/bold green]")
+
     def get_result(self):
-        return getattr(self, "result", None)
\ No newline at end of file
+        return getattr(self, "result", None)
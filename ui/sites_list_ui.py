@@ -43,7 +43,6 @@ class SitesListUI(CRUDMixin, PaginatedListUI):
     def populate_sites(self):
         """Adds the five default file destinations to a migration."""
         site_names = ["Measure", "Dustin & Partners", "Dustin Engineers", "DB2", "Hotie Holdings"]
-        for site_name in site_names:
-            self.dao.add(name=site_name)
+        self.dao.add_many({"name": site_name} for site_name in site_names)
         self.refresh_items()
         return self
\ No newline at end of file